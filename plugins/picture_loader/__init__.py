@@ -0,0 +1 @@
+from .picture_loader import PictureLoader
@@ -0,0 +1,220 @@
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+from PIL import Image
+import numpy as np
+import re
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+from .quantize import Dither, nearest_colors, palette_indices
+from .merging import merge_key_rectangles
+
+
+# /fill refuses to change more blocks at once
+MAX_FILL_VOLUME = 32768
+
+# Textures of a single face, or of a block state, they don't name a block
+FACE_SUFFIX = re.compile(
+    r"_(top|bottom|sides?\d*|front|back|end|inner|outer|inside|outside|on|off|lit|powered|occupied|open|empty|partial|tip|base|particle|stage_?\d+|\d+)$"
+)
+
+# Full cubes that fall, melt, spread, explode, react to players or aren't obtainable
+EXCLUDED_BLOCKS = [
+    "sand", "gravel", "concrete_powder", "suspicious", "tnt",
+    "command_block", "structure_block", "jigsaw", "barrier", "spawner", "debug",
+    "ice", "snow", "slime", "honey", "sculk", "budding", "farmland", "dirt_path",
+    "observer", "piston", "dispenser", "dropper", "furnace", "smoker", "crafter",
+    "respawn_anchor", "reinforced", "dragon_egg", "frogspawn", "magma", "infested",
+    "destroy", "water", "lava", "fire", "portal", "grass_block", "mycelium", "podzol",
+    "leaves", "glass", "vine", "carpet", "target", "trial", "vault",
+    # Not full cubes, or textures of a single face
+    "shelf", "trapdoor", "anvil", "stalk", "beacon", "chorus", "comparator", "repeater", "bulb",
+    "creaking", "dried_ghast", "item_frame", "hopper", "lectern", "shulker", "test_",
+    "carved_pumpkin", "jack_o_lantern"
+]
+
+
+def block_id(texture: str) -> str:
+    """
+    Returns the block placed for a texture, copper blocks are waxed so they keep their colour
+    """
+
+    if "copper" in texture and not texture.endswith("_ore") and not texture.startswith("raw_"):
+        return f"waxed_{texture}"
+
+    return texture
+
+
+class BlockPalette:
+    """
+    The average colours of the full-cube blocks found in a texture folder,
+    with a KD-tree over them (when scipy is installed) to pick the closest block of every pixel
+    """
+
+
+    names: List[str]
+    colors: np.ndarray
+
+
+    def __init__(
+        self,
+        names: List[str],
+        colors: np.ndarray
+    ) -> "BlockPalette":
+
+        self.names = names
+        self.colors = np.asarray(colors, dtype=np.float32)
+        self.__tree = None if cKDTree is None else cKDTree(self.colors)
+
+
+    @classmethod
+    def from_textures(cls, texture_path: Path) -> "BlockPalette":
+        """
+        Averages every opaque, square (not animated) texture named after a block
+        """
+
+        colors: Dict[str, np.ndarray] = {}
+
+        for path in sorted(Path(texture_path).glob("*.png")):
+
+            name = path.stem
+
+            if FACE_SUFFIX.search(name) or any(e in name for e in EXCLUDED_BLOCKS):
+                continue
+
+            # Living coral dies out of water
+            if name.endswith("coral_block") and not name.startswith("dead_"):
+                continue
+
+            with Image.open(path) as image:
+
+                if image.width != image.height:
+                    continue
+
+                pixels = np.asarray(image.convert("RGBA"), dtype=np.float32)
+
+            if np.any(pixels[..., 3] < 255):
+                continue
+
+            colors[f"minecraft:{block_id(name)}"] = pixels[..., :3].reshape(-1, 3).mean(axis=0)
+
+        if len(colors) == 0:
+            raise ValueError(f"No full block texture inside {texture_path}")
+
+        return cls(list(colors.keys()), np.array(list(colors.values())))
+
+
+    def nearest(
+        self,
+        pixels: np.ndarray,
+        palette: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Returns the index of the closest block of every (n, 3) pixel
+        """
+
+        if self.__tree is None:
+            return nearest_colors(pixels, self.colors)
+
+        _distances, indices = self.__tree.query(pixels)
+
+        return indices
+
+
+    def match(
+        self,
+        image_arr: np.ndarray,
+        dither: Dither = Dither.NONE
+    ) -> np.ndarray:
+        """
+        Returns the (h, w) index of the block drawing every pixel, -1 for the transparent ones
+        """
+
+        image_arr = np.asarray(image_arr)
+
+        if image_arr.shape[2] == 4:
+            mask = image_arr[..., 3] >= 128
+        else:
+            mask = np.ones(image_arr.shape[:2], dtype=bool)
+
+        indices = palette_indices(image_arr[..., :3], self.colors, mask, dither, self.nearest)
+
+        return np.where(mask, indices, -1)
+
+
+Vector = Tuple[int, int, int]
+
+
+def fill_commands(
+    blocks: np.ndarray,
+    names: List[str],
+    origin: Vector,
+    right: Vector,
+    up: Vector
+) -> Tuple[List[str], List[int]]:
+    """
+    Builds the `fill` commands (without the leading `/`) placing the (h, w) block indices,
+    `[0, 0]` going at `origin` and the rows going along `up`. Equal blocks are merged into rectangles.
+
+    Returns the commands with the number of blocks each one places
+    """
+
+    rectangles = merge_key_rectangles(blocks, MAX_FILL_VOLUME)
+    block_names = [names[i] for i in blocks[rectangles[:, 1], rectangles[:, 0]].tolist()]
+
+    volumes = (rectangles[:, 2] * rectangles[:, 3]).tolist()
+
+    return _fill_rectangles(rectangles, block_names, origin, right, up), volumes
+
+
+def block_area(blocks: np.ndarray) -> np.ndarray:
+    """
+    Returns the rectangles covering every placed block of the (h, w) block indices, whatever the block,
+    so clearing a picture takes far fewer fills than building it
+    """
+
+    return merge_key_rectangles(np.where(blocks == -1, -1, 0), MAX_FILL_VOLUME)
+
+
+def clear_commands(
+    rectangles: np.ndarray,
+    origin: Vector,
+    right: Vector,
+    up: Vector
+) -> List[str]:
+    """
+    Builds the `fill ... air` commands (without the leading `/`) removing the rectangles of `block_area`
+    """
+
+    rectangles = np.asarray(rectangles, dtype=np.int64).reshape(-1, 4)
+
+    return _fill_rectangles(rectangles, ["minecraft:air"] * len(rectangles), origin, right, up)
+
+
+def _fill_rectangles(
+    rectangles: np.ndarray,
+    block_names: List[str],
+    origin: Vector,
+    right: Vector,
+    up: Vector
+) -> List[str]:
+
+    if len(rectangles) == 0:
+        return []
+
+    origin = np.asarray(origin, dtype=np.int64)
+    right = np.asarray(right, dtype=np.int64)
+    up = np.asarray(up, dtype=np.int64)
+
+    x, y, width, height = rectangles.T
+
+    first = origin + x[:, None] * right + y[:, None] * up
+    last = first + (width - 1)[:, None] * right + (height - 1)[:, None] * up
+
+    return [
+        "fill %d %d %d %d %d %d %s" % (*start, *end, name)
+        for start, end, name in zip(first.tolist(), last.tolist(), block_names)
+    ]
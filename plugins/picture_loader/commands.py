@@ -0,0 +1,98 @@
+from typing import List, Tuple
+import numpy as np
+
+from .merging import pack_colors
+
+
+Vector = Tuple[float, float, float]
+
+# Size of a font pixel of an unscaled text_display, in blocks. The background of an empty text is one font pixel wide
+FONT_PIXEL = 0.025
+
+
+def rectangle_positions(
+    rectangles: np.ndarray,
+    corner: Vector,
+    right: Vector,
+    up: Vector,
+    spacing: float
+) -> np.ndarray:
+    """
+    Returns the (n, 3) world positions of the entities drawing the given rectangles.
+
+    The background of a text_display grows sideways from the middle of the entity
+    and upwards from its bottom, and the transformation scales it around the entity, so each entity
+    stands at the bottom middle of its rectangle whatever its scale. A pixel `(x, y)` then covers
+    `[x - 0.5, x + 0.5]` sideways and `[y, y + 1]` upwards, in units of `spacing`
+    """
+
+    offsets = np.empty((len(rectangles), 2), dtype=np.float64)
+    offsets[:, 0] = rectangles[:, 0] + (rectangles[:, 2] - 1) / 2
+    offsets[:, 1] = rectangles[:, 1]
+
+    axes = np.array((right, up), dtype=np.float64)
+
+    return np.asarray(corner, dtype=np.float64) + (offsets * spacing) @ axes
+
+
+def rectangle_scales(
+    rectangles: np.ndarray,
+    spacing: float
+) -> np.ndarray:
+    """
+    Returns the (n, 2) transformation scales making the backgrounds exactly as big as their rectangles,
+    single pixels included, so neighbouring entities touch without overlapping (overlaps z-fight)
+    """
+
+    return rectangles[:, 2:].astype(np.float64) * (spacing / FONT_PIXEL)
+
+
+def rectangle_colors(
+    image_arr: np.ndarray,
+    rectangles: np.ndarray
+) -> np.ndarray:
+    """
+    Returns the ARGB colour of every rectangle as the signed 32 bits int read by the `background` NBT
+    """
+
+    colors = pack_colors(image_arr)[rectangles[:, 1], rectangles[:, 0]]
+
+    return colors.astype(np.uint32).view(np.int32)
+
+
+def summon_commands(
+    image_arr: np.ndarray,
+    rectangles: np.ndarray,
+    corner: Vector,
+    right: Vector,
+    up: Vector,
+    spacing: float,
+    yaw: float,
+    pitch: float,
+    tag_name: str
+) -> List[str]:
+    """
+    Builds the `summon text_display` commands (without the leading `/`) drawing the given rectangles
+    """
+
+    if len(rectangles) == 0:
+        return []
+
+    positions = rectangle_positions(rectangles, corner, right, up, spacing).tolist()
+    colors = rectangle_colors(image_arr, rectangles).tolist()
+    # Floats only keep about 7 digits anyway, rounding keeps the commands short
+    scales = np.round(rectangle_scales(rectangles, spacing), 6).tolist()
+
+    # Everything that doesn't change between two entities is formatted once
+    rotation = f"Rotation:[{yaw}F, {pitch}F]".replace("%", "%%")
+    tags = f"Tags:[{tag_name}]".replace("%", "%%")
+
+    template = (
+        "summon text_display %r %r %r {" + rotation + ", background: %d, " + tags + ", transformation:{"
+        "left_rotation:[0F, 0F, 0F, 1F], right_rotation:[0F, 0F, 0F, 1F], translation:[0F, 0F, 0F], scale:[%rF, %rF, 1F]}}"
+    )
+
+    return [
+        template % (x, y, z, color, scale_x, scale_y)
+        for (x, y, z), color, (scale_x, scale_y) in zip(positions, colors, scales)
+    ]
@@ -0,0 +1,163 @@
+from typing import Iterable, List, Optional, Tuple
+from pathlib import Path
+import shutil
+import json
+import re
+
+
+DATAPACK_NAME = "conduit_picture_loader"
+NAMESPACE = "picture_loader"
+PACK_FORMAT = 15
+
+# Well below the default `maxCommandChainLength` (65536), so a function is never cut short
+MAX_FUNCTION_LENGTH = 10000
+
+# Functions live in `function/` since 1.21 and in `functions/` before
+FUNCTION_FOLDERS = ("function", "functions")
+
+
+def function_name(tag: str) -> str:
+    """
+    Returns a valid function path for the given tag
+    """
+
+    return re.sub(r"[^a-z0-9_.-]", "_", tag.lower())
+
+
+def split_costs(
+    costs: List[int],
+    budget: int
+) -> List[Tuple[int, int]]:
+    """
+    Splits the commands into consecutive `(start, end)` slices costing at most `budget` each,
+    a command costing more than the budget getting a slice of its own
+    """
+
+    slices = []
+    start = 0
+    total = 0
+
+    for i, cost in enumerate(costs):
+
+        if total + cost > budget and i > start:
+            slices.append((start, i))
+            start, total = i, 0
+
+        total += cost
+
+    if start < len(costs):
+        slices.append((start, len(costs)))
+
+    return slices
+
+
+class Datapack:
+    """
+    The datapack managed by picture_loader inside the world folder.
+
+    Pictures are written as functions holding their summon commands,
+    so the server runs them in a few `/function` calls instead of one RCON round trip per pixel
+    """
+
+
+    path: Path
+
+
+    def __init__(self, world_path: Path) -> "Datapack":
+
+        self.path = Path(world_path) / "datapacks" / DATAPACK_NAME
+
+
+    @property
+    def pack_id(self) -> str:
+        return f"file/{DATAPACK_NAME}"
+
+
+    def ensure(self) -> None:
+        """
+        Creates the datapack if it doesn't exist yet
+        """
+
+        mcmeta = self.path / "pack.mcmeta"
+
+        if mcmeta.exists():
+            return
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        mcmeta.write_text(json.dumps({
+            "pack": {
+                "pack_format": PACK_FORMAT,
+                "supported_formats": {"min_inclusive": 12, "max_inclusive": 1000},
+                "description": "Pictures drawn by the picture_loader plugin"
+            }
+        }, indent=4), encoding="utf-8")
+
+
+    def write_functions(
+        self,
+        tag: str,
+        commands: Iterable[str],
+        length: int = MAX_FUNCTION_LENGTH,
+        nonce: str = "",
+        costs: Optional[List[int]] = None
+    ) -> List[Tuple[str, int]]:
+        """
+        Writes the commands (without the leading `/`) of a picture into functions costing at most `length`
+        and returns their ids with their costs. Every command costs 1 unless `costs` are given.
+
+        An empty `<tag>/ready_<nonce>` function is written along them, see `ready_function`
+        """
+
+        self.ensure()
+        self.remove_functions(tag)
+
+        name = function_name(tag)
+        commands = list(commands)
+        costs = [1] * len(commands) if costs is None else list(costs)
+        length = min(max(1, length), MAX_FUNCTION_LENGTH)
+        functions = []
+
+        # A command costs at least 1, so no function is longer than `MAX_FUNCTION_LENGTH` commands
+        slices = split_costs([max(1, cost) for cost in costs], length)
+
+        files = [(f"{part}", commands[start:end], sum(costs[start:end])) for part, (start, end) in enumerate(slices)]
+        ready = f"ready_{nonce}"
+        files.append((ready, ["# Tells the picture was loaded, see Datapack.ready_function"], 0))
+
+        for file, lines, cost in files:
+
+            content = "\n".join(lines) + "\n"
+
+            for folder in FUNCTION_FOLDERS:
+
+                path = self.path / "data" / NAMESPACE / folder / name / f"{file}.mcfunction"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(content, encoding="utf-8")
+
+            if file != ready:
+                functions.append((f"{NAMESPACE}:{name}/{file}", cost))
+
+        return functions
+
+
+    def ready_function(self, tag: str, nonce: str = "") -> str:
+        """
+        Id of a function doing nothing, which can be ran to know whether the functions of a picture are loaded.
+
+        A tag is reused once its picture is cleared, while the server keeps the old functions until the next `/reload`:
+        every write takes a new `nonce`, so only the functions it wrote can answer for it
+        """
+
+        return f"{NAMESPACE}:{function_name(tag)}/ready_{nonce}"
+
+
+    def remove_functions(self, tag: str) -> None:
+        """
+        Deletes the functions of a picture
+        """
+
+        name = function_name(tag)
+
+        for folder in FUNCTION_FOLDERS:
+            shutil.rmtree(self.path / "data" / NAMESPACE / folder / name, ignore_errors=True)
@@ -0,0 +1,210 @@
+from typing import Dict, Iterable, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, Future
+from requests.adapters import HTTPAdapter
+from pathlib import Path
+from PIL import Image
+from io import BytesIO
+import numpy as np
+import requests
+import math
+
+
+class FetchError(Exception):
+    """
+    A picture couldn't be downloaded, read or decoded
+    """
+
+
+class ImageTooLarge(FetchError, ValueError):
+    pass
+
+
+class ImageFetcher:
+    """
+    Downloads and decodes pictures with bounded memory.
+
+    Urls are streamed through a pooled session and dropped as soon as they go past `max_bytes`,
+    pictures with more than `max_pixels` pixels are downscaled while decoding
+    (through the JPEG draft mode, then `Image.reduce`) instead of being decoded at full size.
+
+    `submit` and `fetch_many` fetch several pictures at once on a small thread pool
+    """
+
+
+    max_bytes: int
+    max_pixels: int
+    timeout: Tuple[float, float]
+    workers: int
+    session: requests.Session
+    __pool: Optional[ThreadPoolExecutor]
+
+
+    def __init__(
+        self,
+        max_bytes: int = 32 * 1024 * 1024,
+        max_pixels: int = 4096 * 4096,
+        timeout: Tuple[float, float] = (5.0, 30.0),
+        workers: int = 4
+    ) -> "ImageFetcher":
+        """
+        `timeout` is the (connect, read) timeout of the requests, in seconds
+        """
+
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.timeout = timeout
+        self.workers = workers
+        self.__pool = None
+
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+
+    def close(self) -> None:
+        """
+        Waits for the running fetches, then closes the pool and the session
+        """
+
+        if self.__pool is not None:
+            self.__pool.shutdown(wait=True, cancel_futures=True)
+            self.__pool = None
+
+        self.session.close()
+
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+
+        if self.__pool is None:
+            self.__pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="picture-fetch")
+
+        return self.__pool
+
+
+    def download(self, url: str) -> bytes:
+        """
+        Returns the body of the url, or raises `ImageTooLarge` once it's bigger than `max_bytes`
+        """
+
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+
+            response.raise_for_status()
+
+            length = response.headers.get("Content-Length")
+
+            if length is not None and length.isdigit() and int(length) > self.max_bytes:
+                raise ImageTooLarge(f"The picture is {int(length)} bytes, more than the {self.max_bytes} allowed")
+
+            data = bytearray()
+
+            for block in response.iter_content(64 * 1024):
+
+                data += block
+
+                if len(data) > self.max_bytes:
+                    raise ImageTooLarge(f"The picture is more than the {self.max_bytes} bytes allowed")
+
+        return bytes(data)
+
+
+    def read_file(self, path: Union[str, Path]) -> bytes:
+
+        path = Path(path)
+
+        if path.stat().st_size > self.max_bytes:
+            raise ImageTooLarge(f"The picture is {path.stat().st_size} bytes, more than the {self.max_bytes} allowed")
+
+        return path.read_bytes()
+
+
+    def decode(self, data: bytes) -> np.ndarray:
+        """
+        Decodes the picture into an RGBA array, downscaled to at most `max_pixels` pixels
+        """
+
+        # Only the header is read here, the pixels are decoded by `convert`
+        try:
+            image = Image.open(BytesIO(data))
+        except Image.DecompressionBombError as e:
+            raise ImageTooLarge(str(e))
+
+        width, height = image.size
+
+        if width * height > self.max_pixels:
+
+            factor = math.sqrt(width * height / self.max_pixels)
+            target = (max(1, int(width / factor)), max(1, int(height / factor)))
+
+            # Lets libjpeg decode straight at 1/2, 1/4 or 1/8 of the size, never below the target
+            if image.format == "JPEG":
+                image.draft("RGB", target)
+
+            # From the size left by the draft, if any
+            width, height = image.size
+            reduce = math.ceil(math.sqrt(width * height / self.max_pixels))
+
+            if reduce > 1:
+                image = image.reduce(reduce)
+
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+
+        return np.array(image)
+
+
+    def fetch(self, source: str) -> np.ndarray:
+        """
+        Fetches a picture from an url or a local .png/.jpg file, every failure is raised as a `FetchError`
+        """
+
+        try:
+            if source.startswith("http://") or source.startswith("https://"):
+                return self.decode(self.download(source))
+
+            return self.decode(self.read_file(source))
+
+        except FetchError:
+            raise
+
+        except requests.Timeout:
+            raise FetchError(f"`{source}` took more than {self.timeout[1]:g} seconds to answer")
+
+        except requests.HTTPError as e:
+            raise FetchError(f"`{source}` answered {e.response.status_code} {e.response.reason}")
+
+        except requests.RequestException as e:
+            raise FetchError(f"Couldn't download `{source}`: {e}")
+
+        except FileNotFoundError:
+            raise FetchError(f"There is no file `{source}`")
+
+        except (OSError, Image.UnidentifiedImageError) as e:
+            raise FetchError(f"Couldn't read the picture `{source}`: {e}")
+
+
+    def submit(self, source: str) -> "Future[np.ndarray]":
+        """
+        Fetches the picture on the pool
+        """
+
+        return self._get_pool().submit(self.fetch, source)
+
+
+    def fetch_many(self, sources: Iterable[str]) -> Dict[str, Union[np.ndarray, Exception]]:
+        """
+        Fetches all the pictures concurrently, returning either the picture or the error of every source
+        """
+
+        futures = {source: self.submit(source) for source in sources}
+        results = {}
+
+        for source, future in futures.items():
+
+            try:
+                results[source] = future.result()
+            except Exception as e:
+                results[source] = e
+
+        return results
@@ -0,0 +1,175 @@
+from typing import List, Tuple
+import numpy as np
+
+from .merging import pack_colors
+from .commands import FONT_PIXEL, rectangle_positions
+
+
+Vector = Tuple[float, float, float]
+
+# Full block glyph, one per pixel
+GLYPH = "█"
+
+# Font pixels from one glyph to the next of a line, and from one line to the next
+GLYPH_ADVANCE = 9
+LINE_HEIGHT = 10
+
+# Marks the end of a line in the runs of colours
+NEWLINE = -2
+
+# First version (1.21.5) reading text components as SNBT, the older ones read them as JSON strings
+SNBT_TEXT_DATA_VERSION = 4325
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the row, start and end (excluded) of every run of True in the rows of the mask
+    """
+
+    # +1 where a run starts, -1 right after it ends
+    edges = np.diff(mask.astype(np.int8), axis=1, prepend=0, append=0)
+    rows, starts = np.nonzero(edges == 1)
+    _rows, ends = np.nonzero(edges == -1)
+
+    return rows, starts, ends
+
+
+def glyph_rectangles(
+    image_arr: np.ndarray,
+    rows: int = 1
+) -> np.ndarray:
+    """
+    Splits the image into blocks of `rows` rows, and every block into the runs of columns
+    that are opaque on all its rows. The opaque pixels left in the other columns get one run per row,
+    so no entity ever covers a transparent pixel.
+
+    Each run is drawn by one entity, returned in the layout of `merge_rectangles`
+    """
+
+    rows = max(1, rows)
+    opaque = pack_colors(image_arr) != -1
+    height, width = opaque.shape
+
+    # The rows past the bottom of the image don't stop the last block from being full
+    blocks = -(-height // rows)
+    padded = np.ones((blocks * rows, width), dtype=bool)
+    padded[:height] = opaque
+
+    full = padded.reshape(blocks, rows, width).all(axis=1)
+    block_indices, starts, ends = _runs(full)
+
+    y = block_indices * rows
+    block_rectangles = np.stack((starts, y, ends - starts, np.minimum(rows, height - y)), axis=1)
+
+    partial = opaque & ~np.repeat(full, rows, axis=0)[:height]
+    row_indices, starts, ends = _runs(partial)
+
+    row_rectangles = np.stack((starts, row_indices, ends - starts, np.ones_like(starts)), axis=1)
+
+    return np.concatenate([block_rectangles, row_rectangles]).astype(np.int64).reshape(-1, 4)
+
+
+def glyph_text(colors: np.ndarray, snbt: bool = True) -> str:
+    """
+    Returns the text component drawing the (h, w) opaque packed colours as lines of glyphs, the last row on top.
+    It's written as SNBT, or as the JSON string read by the versions before 1.21.5 if `snbt` is unset.
+
+    Glyphs of the same colour in a row, even across lines, share one span
+    """
+
+    colors = colors[::-1]
+
+    # Each line followed by a newline, except the last one
+    tokens = np.full((colors.shape[0], colors.shape[1] + 1), NEWLINE, dtype=np.int64)
+    tokens[:, :-1] = colors & 0xFFFFFF
+    tokens = tokens.reshape(-1)[:-1]
+
+    starts = np.flatnonzero(np.concatenate(([True], tokens[1:] != tokens[:-1])))
+    lengths = np.diff(np.append(starts, len(tokens)))
+
+    spans: List[List] = []
+
+    for token, length in zip(tokens[starts].tolist(), lengths.tolist()):
+
+        if token == NEWLINE:
+            spans[-1][1] += "\\n" * length
+            continue
+
+        if len(spans) > 0 and spans[-1][0] == token:
+            spans[-1][1] += GLYPH * length
+        else:
+            spans.append([token, GLYPH * length])
+
+    if snbt:
+        return "[" + ",".join(f'{{text:"{span}",color:"#{color:06X}"}}' for color, span in spans) + "]"
+
+    # The backslash of the JSON newline is itself escaped inside the SNBT string
+    components = ",".join(f'{{"text":"{span}","color":"#{color:06X}"}}' for color, span in spans)
+
+    return "'[" + components.replace("\\", "\\\\") + "]'"
+
+
+def dominant_color(colors: np.ndarray) -> int:
+    """
+    Returns the most frequent packed colour
+    """
+
+    values, counts = np.unique(colors, return_counts=True)
+
+    return int(values[np.argmax(counts)])
+
+
+def glyph_commands(
+    image_arr: np.ndarray,
+    rectangles: np.ndarray,
+    corner: Vector,
+    right: Vector,
+    up: Vector,
+    spacing: float,
+    yaw: float,
+    pitch: float,
+    tag_name: str,
+    snbt: bool = True
+) -> List[str]:
+    """
+    Builds the `summon text_display` commands (without the leading `/`) drawing the rectangles of `glyph_rectangles`
+    with one glyph per pixel, `snbt` telling the format of the text (see `glyph_text`).
+
+    The glyphs are scaled so they are `spacing` apart like the pixels of `summon_commands`, and the background
+    takes the most frequent colour of the entity to fill the gaps the font leaves between glyphs
+    """
+
+    if len(rectangles) == 0:
+        return []
+
+    packed = pack_colors(image_arr)
+    positions = rectangle_positions(rectangles, corner, right, up, spacing).tolist()
+
+    scale_x = spacing / (GLYPH_ADVANCE * FONT_PIXEL)
+    scale_y = spacing / (LINE_HEIGHT * FONT_PIXEL)
+
+    # Everything that doesn't change between two entities is formatted once
+    rotation = f"Rotation:[{yaw}F, {pitch}F]".replace("%", "%%")
+    tags = f"Tags:[{tag_name}]".replace("%", "%%")
+
+    template = (
+        "summon text_display %r %r %r {" + rotation + ", background: %d, shadow: 0b, line_width: %d, text: %s, " + tags + ", "
+        "transformation:{left_rotation:[0F, 0F, 0F, 1F], right_rotation:[0F, 0F, 0F, 1F], translation:[0F, 0F, 0F], "
+        f"scale:[{scale_x!r}F, {scale_y!r}F, 1F]}}}}"
+    )
+
+    commands = []
+
+    for (x, y, z), (left, bottom, width, height) in zip(positions, rectangles.tolist()):
+
+        colors = packed[bottom:bottom + height, left:left + width]
+        background = dominant_color(colors)
+
+        text = glyph_text(colors, snbt)
+
+        # Signed 32 bits ARGB, like `rectangle_colors`
+        signed = background - (1 << 32) if background >= (1 << 31) else background
+
+        commands.append(template % (x, y, z, signed, width * GLYPH_ADVANCE, text))
+
+    return commands
@@ -0,0 +1,190 @@
+from typing import List, Optional, Tuple
+from pathlib import Path
+import numpy as np
+import gzip
+import re
+
+from plugins.world_cache.nbt import serialize
+from plugins.world_cache.world import get_data_version
+
+from .quantize import Dither, palette_indices
+
+
+MAP_SIZE = 128
+
+# Base colours of the map palette, index 0 is transparent
+MAP_BASE_COLORS = [
+    0x000000, 0x7FB238, 0xF7E9A3, 0xC7C7C7, 0xFF0000, 0xA0A0FF, 0xA7A7A7, 0x007C00,
+    0xFFFFFF, 0xA4A8B8, 0x976D4D, 0x707070, 0x4040FF, 0x8F7748, 0xFFFCF5, 0xD87F33,
+    0xB24CD8, 0x6699D8, 0xE5E533, 0x7FCC19, 0xF27FA5, 0x4C4C4C, 0x999999, 0x4C7F99,
+    0x7F3FB2, 0x334CB2, 0x664C33, 0x667F33, 0x993333, 0x191919, 0xFAEE4D, 0x5CDBD5,
+    0x4A80FF, 0x00D93A, 0x815631, 0x700200, 0xD1B1A1, 0x9F5224, 0x95576C, 0x706C8A,
+    0xBA8524, 0x677535, 0xA04D4E, 0x392923, 0x876B62, 0x575C5C, 0x7A4958, 0x4C3E5C,
+    0x4C3223, 0x4C522A, 0x8E3C2E, 0x251610, 0xBD3031, 0x943F61, 0x5C191D, 0x167E86,
+    0x3A8E8C, 0x562C3E, 0x14B485, 0x646464, 0xD8AF93, 0x7FA796
+]
+
+# Brightness of the 4 shades of every base colour, the map colour id being `base * 4 + shade`
+MAP_SHADES = (180, 220, 255, 135)
+
+# First version (1.20.5) storing the map id of an item in a component
+COMPONENTS_DATA_VERSION = 3837
+
+# Picture maps take their ids from here on, far above the ids the server hands out to crafted maps
+RESERVED_MAP_IDS = 1 << 20
+
+
+def map_palette() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the RGB colours of every opaque map colour with their map colour ids
+    """
+
+    bases = np.array(MAP_BASE_COLORS[1:], dtype=np.int64)
+    rgb = np.stack(((bases >> 16) & 0xFF, (bases >> 8) & 0xFF, bases & 0xFF), axis=1).astype(np.float32)
+
+    shades = np.array(MAP_SHADES, dtype=np.float32) / 255
+    colors = np.floor(rgb[:, None, :] * shades[None, :, None]).reshape(-1, 3)
+
+    ids = (np.arange(1, len(MAP_BASE_COLORS))[:, None] * 4 + np.arange(4)[None, :]).reshape(-1)
+
+    return colors, ids.astype(np.uint8)
+
+
+def match_map_colors(
+    image_arr: np.ndarray,
+    dither: Dither = Dither.NONE
+) -> np.ndarray:
+    """
+    Returns the (h, w) map colour ids drawing the image, 0 for the transparent pixels
+    """
+
+    colors, ids = map_palette()
+    image_arr = np.asarray(image_arr)
+
+    if image_arr.shape[2] == 4:
+        mask = image_arr[..., 3] >= 128
+    else:
+        mask = np.ones(image_arr.shape[:2], dtype=bool)
+
+    indices = palette_indices(image_arr[..., :3], colors, mask, dither)
+
+    return np.where(mask, ids[indices], 0).astype(np.uint8)
+
+
+def split_tiles(map_colors: np.ndarray) -> List[List[np.ndarray]]:
+    """
+    Splits the map colours into rows of 128x128 tiles, padding the last ones with transparent pixels
+    """
+
+    height, width = map_colors.shape
+    rows, columns = -(-height // MAP_SIZE), -(-width // MAP_SIZE)
+
+    padded = np.zeros((rows * MAP_SIZE, columns * MAP_SIZE), dtype=np.uint8)
+    padded[:height, :width] = map_colors
+
+    return [
+        [padded[r * MAP_SIZE:(r + 1) * MAP_SIZE, c * MAP_SIZE:(c + 1) * MAP_SIZE] for c in range(columns)]
+        for r in range(rows)
+    ]
+
+
+def _write_nbt(path: Path, value: dict) -> None:
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Written aside first, the server must never read half a file
+    temp = path.with_suffix(".tmp")
+    temp.write_bytes(gzip.compress(serialize(value)))
+    temp.replace(path)
+
+
+class MapWriter:
+    """
+    Writes locked maps into the `data` folder of a world.
+
+    The running server keeps its map id counter in memory and saves it over `idcounts.dat`,
+    so the ids can't be taken from there: new maps follow the highest `map_N.dat` of the reserved range
+    starting at `RESERVED_MAP_IDS`, and `idcounts.dat` is never touched
+    """
+
+
+    world_path: Path
+    data_version: Optional[int]
+
+
+    def __init__(self, world_path: Path) -> "MapWriter":
+
+        self.world_path = Path(world_path)
+        self.data_version = get_data_version(self.world_path)
+
+
+    @property
+    def data_path(self) -> Path:
+        return self.world_path / "data"
+
+
+    @property
+    def uses_components(self) -> bool:
+        return self.data_version is None or self.data_version >= COMPONENTS_DATA_VERSION
+
+
+    def next_map_id(self) -> int:
+
+        last = RESERVED_MAP_IDS - 1
+
+        for path in self.data_path.glob("map_*.dat"):
+
+            match = re.fullmatch(r"map_(\d+)\.dat", path.name)
+
+            if match is not None:
+                last = max(last, int(match.group(1)))
+
+        return last + 1
+
+
+    def write_maps(
+        self,
+        tiles: List[np.ndarray],
+        dimension: str = "minecraft:overworld"
+    ) -> List[int]:
+        """
+        Writes every 128x128 tile of map colours as a new locked map and returns their ids
+        """
+
+        first = self.next_map_id()
+        ids = list(range(first, first + len(tiles)))
+
+        for map_id, tile in zip(ids, tiles):
+
+            data = {
+                "scale": np.int8(0),
+                "dimension": dimension,
+                "trackingPosition": False,
+                "unlimitedTracking": False,
+                "locked": True,
+                "xCenter": 0,
+                "zCenter": 0,
+                "banners": [],
+                "frames": [],
+                "colors": np.ascontiguousarray(tile, dtype=np.uint8).reshape(-1).view(np.int8)
+            }
+
+            root = {"data": data}
+
+            if self.data_version is not None:
+                root["DataVersion"] = self.data_version
+
+            _write_nbt(self.data_path / f"map_{map_id}.dat", root)
+
+        return ids
+
+
+    def give_command(self, player: str, map_id: int) -> str:
+        """
+        Returns the command (without the leading `/`) giving the filled map to a player
+        """
+
+        if self.uses_components:
+            return f"give {player} minecraft:filled_map[minecraft:map_id={map_id}]"
+
+        return f"give {player} minecraft:filled_map{{map:{map_id}}}"
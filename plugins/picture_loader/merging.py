@@ -0,0 +1,92 @@
+from typing import Optional
+import numpy as np
+
+
+def pack_colors(image_arr: np.ndarray) -> np.ndarray:
+    """
+    Packs an RGBA image into one int64 per pixel, transparent pixels become -1
+    """
+
+    image_arr = np.asarray(image_arr).astype(np.int64)
+
+    if image_arr.shape[2] == 3:
+        alpha = np.full(image_arr.shape[:2], 255, dtype=np.int64)
+    else:
+        alpha = image_arr[..., 3]
+
+    r, g, b = image_arr[..., 0], image_arr[..., 1], image_arr[..., 2]
+    colors = (alpha << 24) | (r << 16) | (g << 8) | b
+
+    colors[alpha == 0] = -1
+
+    return colors
+
+
+def pixel_rectangles(image_arr: np.ndarray) -> np.ndarray:
+    """
+    Returns one 1x1 rectangle per opaque pixel, in the same layout as `merge_rectangles`
+    """
+
+    ys, xs = np.nonzero(pack_colors(image_arr) != -1)
+    ones = np.ones_like(xs)
+
+    return np.stack((xs, ys, ones, ones), axis=1).astype(np.int64)
+
+
+def merge_rectangles(image_arr: np.ndarray) -> np.ndarray:
+    """
+    Greedily covers the opaque pixels of the image with rectangles of identical colour,
+    returned as an (n, 4) array of `(x, y, width, height)` in pixels, `y` being the row index
+    """
+
+    return merge_key_rectangles(pack_colors(image_arr))
+
+
+def merge_key_rectangles(
+    keys: np.ndarray,
+    max_area: Optional[int] = None
+) -> np.ndarray:
+    """
+    Greedily covers the cells of a 2D array of keys with rectangles of identical keys, skipping the -1 cells.
+
+    Every row is split into runs of the same key, each run is then grown over the following rows
+    for as long as they hold the same key below it. Covered cells are skipped by the next rows.
+    No rectangle gets bigger than `max_area` cells if given
+    """
+
+    keys = np.array(keys, dtype=np.int64)
+    height, width = keys.shape
+
+    rectangles = []
+
+    for y in range(height):
+
+        row = keys[y]
+        starts = np.flatnonzero(np.concatenate(([True], row[1:] != row[:-1])))
+        ends = np.append(starts[1:], width)
+
+        for start, end in zip(starts.tolist(), ends.tolist()):
+
+            key = row[start]
+
+            if key == -1:
+                continue
+
+            step = end - start if max_area is None else max_area
+
+            for x1 in range(start, end, step):
+
+                x2 = min(end, x1 + step)
+                y2 = y + 1
+
+                while (
+                    y2 < height and
+                    (max_area is None or (y2 + 1 - y) * (x2 - x1) <= max_area) and
+                    np.all(keys[y2, x1:x2] == key)
+                ):
+                    y2 += 1
+
+                keys[y:y2, x1:x2] = -1
+                rectangles.append((x1, y, x2 - x1, y2 - y))
+
+    return np.array(rectangles, dtype=np.int64).reshape(-1, 4)
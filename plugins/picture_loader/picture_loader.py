@@ -1,22 +1,51 @@
-from typing import Optional, Union, Tuple
+from typing import Dict, List, Optional, Union, Tuple
+from pathlib import Path
 from PIL import Image
-from io import BytesIO
 import numpy as np
-import requests
+import hashlib
+import secrets
 import enum
 import time
 import math
 
 from mconduit import plugins, text, Context, Vec3d
-from mconduit.utils.color import rgb_to_argb
+
+from plugins.world_cache.world import get_world_path, get_data_version
+from plugins.world_cache.lru import LRUCache, MISSING
+
+from .datapack import Datapack
+from .merging import merge_rectangles, pixel_rectangles
+from .commands import summon_commands
+from .glyphs import SNBT_TEXT_DATA_VERSION, glyph_rectangles, glyph_commands
+from .quantize import QuantizeMethod, Dither, quantize
+from .store import PictureStore, PictureInfo
+from .fetch import ImageFetcher, FetchError
+from .scheduler import DrawScheduler, DrawJob
+from .blocks import BlockPalette, fill_commands, block_area, clear_commands
+from .maps import MAP_SIZE, MapWriter, match_map_colors, split_tiles
 
 
 SPACING = 0.02
 
+# How long to wait for `/reload` to pick up the new functions
+RELOAD_TIMEOUT = 30.0
+
+
+class Config(plugins.Config):
+    max_download_mb: int = 32
+    max_pixels: int = 4096 * 4096 # Bigger pictures are downscaled while decoding
+    download_timeout: float = 30.0 # Seconds without receiving data before a download is dropped
+    fetch_workers: int = 4
+    entities_per_tick: int = 1000 # Entities summoned per server tick while drawing
+    variant_cache_mb: int = 128 # Rotated, resized and quantized pictures with their merged rectangles
+    block_texture_pack: str = "vanilla" # Texture folder of the screenshot plugin used by block-art
+
 
 class Persistent(plugins.Persistent):
-    downloaded_pictures: dict[str, Union[list, np.array]] = {} # img_name -> processed array
+    pictures: dict[str, PictureInfo] = {} # img_name -> file, sizes and hash inside the picture store
+    downloaded_pictures: dict[str, Union[list, np.array]] = {} # Legacy nested lists, moved to the picture store on load
     loaded_pictures: list[str] = []
+    block_pictures: dict[str, dict] = {} # tag -> origin, right, up and the rectangles of placed blocks, to clear them
 
 
 class Rotation(enum.Enum):
@@ -32,6 +61,11 @@ class Mirror(enum.Enum):
     FrontBack = enum.auto()
 
 
+class DrawMode(enum.Enum):
+    RCON =     enum.auto()
+    DATAPACK = enum.auto()
+
+
 class ImageRotation:
     """
     Rotation angle (0, 90, 180, 270, none, cw_90, cw_180, ccw_90)
@@ -88,7 +122,80 @@ class ImageMirroring:
             raise ValueError()
 
 
-class PictureLoader(plugins.Plugin[None, Persistent]):
+class ImageDrawMode:
+    """
+    How the summon commands reach the server (datapack, rcon)
+    """
+
+    value: DrawMode
+
+
+    def __init__(self, value: str) -> "ImageDrawMode":
+
+        value = value.strip().lower()
+
+        try:
+            self.value = {
+                "datapack": DrawMode.DATAPACK,
+                "function": DrawMode.DATAPACK,
+                "rcon": DrawMode.RCON
+            }[value]
+
+        except:
+            raise ValueError("Valid values: datapack/rcon")
+
+
+class ImageQuantizer:
+    """
+    Palette computation (median_cut, kmeans)
+    """
+
+    value: QuantizeMethod
+
+
+    def __init__(self, value: str) -> "ImageQuantizer":
+
+        value = value.strip().lower()
+
+        try:
+            self.value = {
+                "median_cut": QuantizeMethod.MEDIAN_CUT,
+                "median-cut": QuantizeMethod.MEDIAN_CUT,
+                "kmeans": QuantizeMethod.KMEANS,
+                "k-means": QuantizeMethod.KMEANS
+            }[value]
+
+        except:
+            raise ValueError("Valid values: median_cut/kmeans")
+
+
+class ImageDithering:
+    """
+    Dithering (none, ordered, floyd_steinberg)
+    """
+
+    value: Dither
+
+
+    def __init__(self, value: str) -> "ImageDithering":
+
+        value = value.strip().lower()
+
+        try:
+            self.value = {
+                "none": Dither.NONE,
+                "ordered": Dither.ORDERED,
+                "bayer": Dither.ORDERED,
+                "floyd_steinberg": Dither.FLOYD_STEINBERG,
+                "floyd-steinberg": Dither.FLOYD_STEINBERG,
+                "fs": Dither.FLOYD_STEINBERG
+            }[value]
+
+        except:
+            raise ValueError("Valid values: none/ordered/floyd_steinberg")
+
+
+class PictureLoader(plugins.Plugin[Config, Persistent]):
     """
     Displays realistic pictures in-game
     """
@@ -101,6 +208,56 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
     )
 
 
+    def on_load(self):
+
+        self.store = PictureStore(self.path / "pictures")
+        self.fetcher = ImageFetcher(
+            max_bytes=self.config.max_download_mb * 1024 * 1024,
+            max_pixels=self.config.max_pixels,
+            timeout=(5.0, self.config.download_timeout),
+            workers=self.config.fetch_workers
+        )
+
+        # (hash, rotation, mirror, size_x, size_y, colors, quantizer, dither, merge, glyph_rows) -> (image, rectangles)
+        self.variants = LRUCache(self.config.variant_cache_mb * 1024 * 1024)
+
+        self.scheduler = DrawScheduler(self.server, self.config.entities_per_tick)
+        self.scheduler.start()
+
+        self.__block_palette = None
+
+        if len(self.persistent.downloaded_pictures) > 0:
+
+            for name, image in self.persistent.downloaded_pictures.items():
+                self.persistent.pictures[name] = self.store.save(np.asarray(image, np.uint8))
+
+            self.persistent.downloaded_pictures = {}
+            self.persistent._save()
+
+
+    def on_unload(self):
+
+        self.scheduler.stop()
+        self.fetcher.close()
+
+
+    def _save_picture(
+        self,
+        name: str,
+        image_arr: np.ndarray
+    ) -> None:
+        """
+        Stores the picture on disk under the given name
+        """
+
+        old = self.persistent.pictures.get(name)
+        self.persistent.pictures[name] = self.store.save(image_arr)
+        self.persistent._save()
+
+        if old is not None and old["file"] not in (info["file"] for info in self.persistent.pictures.values()):
+            self.store.remove(old)
+
+
     def _create_tag(self, name: str) -> str:
         """
         Creates the tag for all the text_displays of that image
@@ -132,9 +289,13 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
         Downloads an image from the given url or filename and saves it as with the given name
         """
         
-        image_arr = self._fetch_image(url_or_file)
-        self.persistent.downloaded_pictures[name] = image_arr.tolist()
-        self.persistent._save()
+        try:
+            image_arr = self._fetch_image(url_or_file)
+        except (FetchError, ValueError) as e:
+            ctx.error(str(e))
+            return
+
+        self._save_picture(name, image_arr)
 
         ctx.success(f"Succesfully saved the image as `{name}`")
 
@@ -148,22 +309,37 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
         Downloads an image from the given url
         """
         
-        response = requests.get(url)
-        response.raise_for_status()
-        image = Image.open(BytesIO(response.content))
-
-        if image.mode != "RGBA":
-            image = image.convert("RGBA")
-
-        image_arr = np.array(image)
+        image_arr = self.fetcher.fetch(url)
 
         if name is not None:
-            self.persistent.downloaded_pictures[name] = image_arr.tolist()
-            self.persistent._save()
+            self._save_picture(name, image_arr)
 
         return image_arr
 
 
+    def load_pictures(self, sources: Dict[str, str]) -> Dict[str, Optional[Exception]]:
+        """
+        Fetches the given pictures (name -> url or file) concurrently and saves them,
+        returns the error of every picture that couldn't be loaded (or None)
+        """
+
+        results = self.fetcher.fetch_many(set(sources.values()))
+        errors = {}
+
+        for name, source in sources.items():
+
+            result = results[source]
+
+            if isinstance(result, Exception):
+                errors[name] = result
+                continue
+
+            self._save_picture(name, result)
+            errors[name] = None
+
+        return errors
+
+
     def _fetch_image(
         self,
         image: Union[str, list, np.ndarray, Image.Image]
@@ -176,33 +352,25 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
             return image
         
         if isinstance(image, list):
-            return np.asarray(image, np.int16)
+            return np.asarray(image, np.uint8)
 
         if isinstance(image, Image.Image):
             return np.array(image)
 
         if isinstance(image, str):
 
-            if image in self.persistent.downloaded_pictures:
-                return np.array(self.persistent.downloaded_pictures[image])
-
-            if image.endswith(".png") or image.endswith(".jpg"):
+            if image in self.persistent.pictures:
+                return self.store.load(self.persistent.pictures[image])
 
-                try:
-                    img = Image.open(image)
-
-                    if img.mode != "RGBA":
-                        img = img.convert("RGBA")
+            if image.startswith("http://") or image.startswith("https://"):
+                return self._download_image(image)
 
-                    return np.array(img)
-                
-                except:
-                    pass
+            if image.endswith(".png") or image.endswith(".jpg"):
+                return self.fetcher.fetch(image)
 
-            if image.startswith("http"):
-                return self._download_image(image)
+            raise ValueError(f"`{image}` isn't a saved picture, an url or a .png/.jpg file")
 
-        raise ValueError()
+        raise ValueError(f"Can't draw a {type(image).__name__}")
 
     
     def _rotate_and_mirror_image(
@@ -258,6 +426,28 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
         return image_arr
     
 
+    def _quantize_image(
+        self,
+        image_arr: np.ndarray,
+        colors: Optional[int] = None,
+        method: QuantizeMethod = QuantizeMethod.MEDIAN_CUT,
+        dither: Dither = Dither.NONE
+    ) -> np.ndarray:
+        """
+        Reduces the image to a palette of the given number of colours, so more pixels can be merged.
+
+        If colors is set to None, image is not quantized
+        """
+
+        if colors is None:
+            return image_arr
+
+        if colors < 1:
+            raise ValueError("The palette needs at least one colour")
+
+        return quantize(image_arr, colors, method, dither)
+
+
     def _get_orientation_vectors(
         self,
         yaw: float = 0.0,
@@ -289,6 +479,134 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
         return forward, right, up
 
 
+    def _get_datapack(self) -> Datapack:
+        return Datapack(get_world_path(self.server))
+
+
+    def _function_job(
+        self,
+        tag_name: str,
+        commands: list[str],
+        player: Optional[str] = None,
+        costs: Optional[List[int]] = None
+    ) -> DrawJob:
+        """
+        Writes the commands into the datapack, split into functions of one tick worth of `costs`
+        (1 per command by default), and returns the job running them. The datapack is reloaded when the job starts
+        """
+
+        datapack = self._get_datapack()
+        length = self.scheduler.entities_per_tick
+
+        # Tells this write apart from an older picture with the same tag still loaded by the server
+        nonce = secrets.token_hex(4)
+
+        functions = datapack.write_functions(tag_name, commands, length, nonce, costs)
+        ready = datapack.ready_function(tag_name, nonce)
+
+        def reload():
+
+            self.server.execute("/reload")
+
+            # `/reload` returns before the new functions are loaded
+            deadline = time.monotonic() + RELOAD_TIMEOUT
+            enabled = False
+
+            while "Unknown function" in str(self.server.execute(f"/function {ready}")):
+
+                if not enabled:
+                    # The pack may have been disabled by hand, new packs are enabled by `/reload` on their own
+                    self.server.execute(f'/datapack enable "{datapack.pack_id}"')
+                    enabled = True
+
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"The server didn't load `{ready}` after reloading the datapacks")
+
+                time.sleep(0.5)
+
+        return DrawJob(
+            tag_name,
+            [f"/function {function}" for function, _cost in functions],
+            [cost for _function, cost in functions],
+            player,
+            reload
+        )
+
+
+    def _picture_hash(self, picture: Union[str, np.ndarray, Image.Image]) -> Optional[str]:
+        """
+        Returns the hash of a stored picture or of an array, None for anything fetched from outside
+        """
+
+        if isinstance(picture, str):
+
+            info = self.persistent.pictures.get(picture)
+
+            return None if info is None else info["hash"]
+
+        if isinstance(picture, np.ndarray):
+
+            digest = hashlib.sha256(str((picture.shape, picture.dtype.str)).encode())
+            digest.update(np.ascontiguousarray(picture).data)
+
+            return digest.hexdigest()
+
+        return None
+
+
+    def _prepare_image(
+        self,
+        picture: Union[str, np.ndarray, Image.Image],
+        rotation: Rotation,
+        mirror: Mirror,
+        size_x: Optional[int],
+        size_y: Optional[int],
+        colors: Optional[int],
+        quantizer: QuantizeMethod,
+        dither: Dither,
+        merge: bool,
+        glyph_rows: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the rotated, mirrored, resized and quantized picture with the rectangles drawing it.
+
+        Both are cached, placing the same picture again with the same options skips all the processing
+        """
+
+        digest = self._picture_hash(picture)
+        key = (digest, rotation, mirror, size_x, size_y, colors, quantizer, dither, merge, glyph_rows)
+
+        if digest is not None:
+
+            variant = self.variants.get(key)
+
+            if variant is not MISSING:
+                return variant
+
+        image_arr = self._fetch_image(picture)
+
+        image_arr = self._rotate_and_mirror_image(image_arr, rotation, mirror)
+        image_arr = self._resize_image(image_arr, size_x, size_y)
+        image_arr = self._quantize_image(image_arr, colors, quantizer, dither)
+
+        if glyph_rows is not None:
+            rectangles = glyph_rectangles(image_arr, glyph_rows)
+        elif merge:
+            rectangles = merge_rectangles(image_arr)
+        else:
+            rectangles = pixel_rectangles(image_arr)
+
+        # Shared by every placement from now on
+        image_arr = np.array(image_arr)
+        image_arr.flags.writeable = False
+        rectangles.flags.writeable = False
+
+        if digest is not None:
+            self.variants.put(key, (image_arr, rectangles))
+
+        return image_arr, rectangles
+
+
     def draw_picture(self,
         picture: Union[str, np.ndarray, Image.Image],
         x: float,
@@ -301,49 +619,221 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
         size_y: Optional[int] = None,
         rotation: Rotation = Rotation.NONE,
         mirror: Mirror = Mirror.NONE,
-        name: str = "unknown"
+        name: str = "unknown",
+        mode: DrawMode = DrawMode.DATAPACK,
+        player: Optional[str] = None,
+        wait: bool = False,
+        merge: bool = True,
+        glyph_rows: Optional[int] = None,
+        colors: Optional[int] = None,
+        quantizer: QuantizeMethod = QuantizeMethod.MEDIAN_CUT,
+        dither: Dither = Dither.NONE
     ) -> str:
         """
         Draws the given picture in-game and returns it's tag-name
 
         The picture could be a downloaded image, image-url or PIL.Image.
 
-        If size is set to None, image is not resized
+        If size is set to None, image is not resized.
+
+        With `DrawMode.DATAPACK` the summon commands are written into a function of the plugin's datapack
+        and ran with a few `/function` calls, `DrawMode.RCON` sends them one by one.
+
+        The entities are summoned over several ticks by the draw scheduler, `player` gets the progress
+        in its actionbar, and `wait` blocks until the picture is drawn.
+
+        If `merge` is set, rectangles of the same colour are drawn by a single scaled text_display,
+        setting `colors` reduces the image to that many colours first so there is more to merge
+
+        If `glyph_rows` is set, every block of that many rows is drawn by one text_display per run of opaque pixels,
+        showing one coloured glyph per pixel. Runs of the same colour share a text span, so fewer colours
+        also give shorter commands
         """
 
-        image_arr = self._fetch_image(picture)
-        
-        image_arr = self._rotate_and_mirror_image(image_arr, rotation, mirror)
-        image_arr = self._resize_image(image_arr, size_x, size_y)
+        image_arr, rectangles = self._prepare_image(
+            picture,
+            rotation,
+            mirror,
+            size_x,
+            size_y,
+            colors,
+            quantizer,
+            dither,
+            merge,
+            glyph_rows
+        )
 
-        sy, sx = image_arr.shape[:2]
         corner_pos = Vec3d(x, y, z)
 
         tag_name = self._create_tag(name)
         self.persistent.loaded_pictures.append(tag_name)
         
         _forward, right, up = self._get_orientation_vectors(yaw, pitch)
-        
-        with self.server.all_at_once():
 
-            for py in range(sy):
-                for px in range(sx):
+        arguments = (image_arr, rectangles, corner_pos.as_tuple(), right.as_tuple(), up.as_tuple(), SPACING, yaw, pitch, tag_name)
+
+        if glyph_rows is None:
+            commands = summon_commands(*arguments)
+
+        else:
+            # Same check as the map-art, an unknown version is taken as a recent one
+            data_version = get_data_version(get_world_path(self.server))
+            snbt = data_version is None or data_version >= SNBT_TEXT_DATA_VERSION
+
+            commands = glyph_commands(*arguments, snbt=snbt)
 
-                    pos = corner_pos + right * (px * SPACING) + up * (py * SPACING)
-                    color = rgb_to_argb(*map(int, image_arr[py, px]))
+        if mode == DrawMode.DATAPACK:
+            job = self._function_job(tag_name, commands, player)
+        else:
+            job = DrawJob(tag_name, [f"/{command}" for command in commands], player=player)
 
-                    if image_arr[py, px][-1] == 0:
-                        continue
+        self.scheduler.submit(job)
 
-                    nbt = "{" + f"""Rotation:[{yaw}F, {pitch}F], background: {color}, Tags:[{tag_name}]""" + "}"
+        if wait:
+            job.wait()
 
-                    self.server.execute(
-                        f"""/summon text_display {pos.x} {pos.y} {pos.z} {nbt}"""
-                    )
+            if job.error is not None:
+                raise job.error
+
+        return tag_name
+
+
+    def _get_block_palette(self) -> BlockPalette:
+        """
+        Returns the colours of the blocks usable by block-art, read from the screenshot plugin's textures
+        """
+
+        if self.__block_palette is None:
+
+            screenshot = self.manager.get_plugin_named("screenshot")
+            screenshot_path = Path(__file__).parent.parent / "screenshot" if screenshot is None else screenshot.path
+
+            self.__block_palette = BlockPalette.from_textures(
+                screenshot_path / "textures" / self.config.block_texture_pack
+            )
+
+        return self.__block_palette
+
+
+    def draw_blocks(self,
+        picture: Union[str, np.ndarray, Image.Image],
+        x: int,
+        y: int,
+        z: int,
+        *,
+        right: Tuple[int, int, int] = (1, 0, 0),
+        up: Tuple[int, int, int] = (0, 1, 0),
+        size_x: Optional[int] = None,
+        size_y: Optional[int] = None,
+        rotation: Rotation = Rotation.NONE,
+        mirror: Mirror = Mirror.NONE,
+        dither: Dither = Dither.NONE,
+        name: str = "unknown",
+        mode: DrawMode = DrawMode.DATAPACK,
+        player: Optional[str] = None,
+        wait: bool = False
+    ) -> str:
+        """
+        Builds the picture with blocks, one block per pixel, and returns it's tag-name
+
+        The bottom-left pixel goes at (x, y, z), the columns follow `right` and the rows `up`,
+        both being unit vectors along an axis. Every pixel takes the full block with the closest average colour,
+        equal blocks are placed by the same `/fill`
+        """
+
+        palette = self._get_block_palette()
+
+        digest = self._picture_hash(picture)
+        key = (digest, rotation, mirror, size_x, size_y, "blocks", dither)
+        blocks = MISSING if digest is None else self.variants.get(key)
+
+        if blocks is MISSING:
+
+            image_arr = self._fetch_image(picture)
+            image_arr = self._rotate_and_mirror_image(image_arr, rotation, mirror)
+            image_arr = self._resize_image(image_arr, size_x, size_y)
+
+            # The first row of the image is its top
+            blocks = np.flipud(palette.match(image_arr, dither))
+            blocks.flags.writeable = False
+
+            if digest is not None:
+                self.variants.put(key, blocks)
+
+        tag_name = self._create_tag(name)
+        self.persistent.loaded_pictures.append(tag_name)
+        self.persistent.block_pictures[tag_name] = {
+            "origin": [x, y, z],
+            "right": list(right),
+            "up": list(up),
+            "rectangles": block_area(blocks).tolist()
+        }
+        self.persistent._save()
+
+        # A fill costs the blocks it places, so the scheduler spreads big fills over more ticks
+        commands, volumes = fill_commands(blocks, palette.names, (x, y, z), right, up)
+
+        if mode == DrawMode.DATAPACK:
+            job = self._function_job(tag_name, commands, player, volumes)
+        else:
+            job = DrawJob(tag_name, [f"/{command}" for command in commands], volumes, player)
+
+        self.scheduler.submit(job)
+
+        if wait:
+            job.wait()
+
+            if job.error is not None:
+                raise job.error
 
         return tag_name
 
     
+    def draw_map(self,
+        picture: Union[str, np.ndarray, Image.Image],
+        *,
+        tiles_x: Optional[int] = None,
+        tiles_y: Optional[int] = None,
+        rotation: Rotation = Rotation.NONE,
+        mirror: Mirror = Mirror.NONE,
+        dither: Dither = Dither.NONE
+    ) -> List[List[int]]:
+        """
+        Writes the picture as locked maps straight into the world's `data` folder
+        and returns the map ids, row by row from the top-left one
+
+        The picture is resized to `tiles_x` by `tiles_y` maps of 128x128 pixels,
+        by default as many maps as needed to hold it at its own size.
+
+        The maps take ids from `RESERVED_MAP_IDS` on, which the server never reaches by itself
+        """
+
+        if (tiles_x is not None and tiles_x < 1) or (tiles_y is not None and tiles_y < 1):
+            raise ValueError("A map-art needs at least one map on each side")
+
+        image_arr = self._fetch_image(picture)
+        image_arr = self._rotate_and_mirror_image(image_arr, rotation, mirror)
+
+        height, width = image_arr.shape[:2]
+
+        if tiles_x is None and tiles_y is None:
+            tiles_x, tiles_y = -(-width // MAP_SIZE), -(-height // MAP_SIZE)
+
+        elif tiles_x is None:
+            tiles_x = max(1, round(tiles_y * width / height))
+
+        elif tiles_y is None:
+            tiles_y = max(1, round(tiles_x * height / width))
+
+        image_arr = self._resize_image(image_arr, tiles_x * MAP_SIZE, tiles_y * MAP_SIZE)
+        tiles = split_tiles(match_map_colors(image_arr, dither))
+
+        writer = MapWriter(get_world_path(self.server))
+        ids = writer.write_maps([tile for row in tiles for tile in row])
+
+        return [ids[i:i + tiles_x] for i in range(0, len(ids), tiles_x)]
+
+
     @pic.command
     def display(
         self,
@@ -357,13 +847,20 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
         size_x: Optional[int] = None,
         size_y: Optional[int] = None,
         rotation: ImageRotation = ImageRotation("none"),
-        mirror: ImageMirroring = ImageMirroring("none")
+        mirror: ImageMirroring = ImageMirroring("none"),
+        mode: ImageDrawMode = ImageDrawMode("datapack"),
+        colors: Optional[int] = None,
+        quantizer: ImageQuantizer = ImageQuantizer("median_cut"),
+        dither: ImageDithering = ImageDithering("none"),
+        glyph_rows: Optional[int] = None,
+        no_merge: plugins.Flag = False
     ):
 
-        if name not in self.persistent.downloaded_pictures.keys():
+        if name not in self.persistent.pictures.keys():
             ctx.error(f"There is not picture named `{name}`")
+            return
 
-        image_arr = np.asarray(self.persistent.downloaded_pictures[name], np.int16)
+        info = self.persistent.pictures[name]
 
         rot = ctx.player.rotation
 
@@ -377,8 +874,8 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
 
             corner = (ctx.player.pos + ctx.player.forward_vec * 2)
 
-            temp_size_x = image_arr.shape[1] if size_x is None else size_x
-            temp_size_y = image_arr.shape[0] if size_y is None else size_y
+            temp_size_x = info["width"] if size_x is None else size_x
+            temp_size_y = info["height"] if size_y is None else size_y
 
             _f, right, up = self._get_orientation_vectors(yaw, pitch)
             x, y, z = (corner + (right * -temp_size_x + up * temp_size_y) * (SPACING / 2)).as_tuple()
@@ -388,9 +885,9 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
         ctx.reply(text.dark_aqua("Start displaying..."))
 
         t0 = time.perf_counter()
-        
+
         tag_name = self.draw_picture(
-            image_arr,
+            name,
             x,
             y,
             z,
@@ -400,10 +897,191 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
             size_y=size_y,
             rotation=rotation.value,
             mirror=mirror.value,
-            name=name
+            name=name,
+            mode=mode.value,
+            merge=not no_merge,
+            glyph_rows=glyph_rows,
+            colors=colors,
+            quantizer=quantizer.value,
+            dither=dither.value,
+            player=str(ctx.player)
         )
 
-        ctx.success(f"Drawing task finished! Saved as `{tag_name}`. Took {time.perf_counter() - t0:.2f} seconds")
+        ctx.success(f"Drawing `{tag_name}` ({time.perf_counter() - t0:.2f} seconds to prepare), progress is shown in the actionbar")
+
+
+    @pic.command
+    def blocks(
+        self,
+        ctx: Context,
+        name: str,
+        x: Optional[int] = None,
+        y: Optional[int] = None,
+        z: Optional[int] = None,
+        size_x: Optional[int] = None,
+        size_y: Optional[int] = None,
+        rotation: ImageRotation = ImageRotation("none"),
+        mirror: ImageMirroring = ImageMirroring("none"),
+        dither: ImageDithering = ImageDithering("none"),
+        mode: ImageDrawMode = ImageDrawMode("datapack")
+    ):
+        """
+        Builds the picture with blocks in front of the player, on the floor if looking down.
+        (x, y, z) is the bottom-left corner if given
+        """
+
+        if name not in self.persistent.pictures.keys():
+            ctx.error(f"There is not picture named `{name}`")
+            return
+
+        info = self.persistent.pictures[name]
+        width = info["width"] if size_x is None else size_x
+
+        if rotation.value in (Rotation.CW_90, Rotation.CCW_90) and size_x is None:
+            width = info["height"]
+
+        rot = ctx.player.rotation
+        yaw = math.radians(rot.yaw)
+
+        # Horizontal direction the player looks at, snapped to an axis
+        fx, fz = -math.sin(yaw), math.cos(yaw)
+        forward = (int(round(fx)), 0, 0) if abs(fx) > abs(fz) else (0, 0, int(round(fz)))
+        right = (-forward[2], 0, forward[0])
+
+        floor = abs(rot.pitch) > 60
+        up = forward if floor else (0, 1, 0)
+
+        if x is None or y is None or z is None:
+
+            px, py, pz = (math.floor(i) for i in ctx.player.pos.as_tuple())
+            distance = 2 if floor else 3
+
+            x = px + forward[0] * distance - right[0] * (width // 2)
+            y = py - 1 if rot.pitch > 60 else py + (2 if floor else 0)
+            z = pz + forward[2] * distance - right[2] * (width // 2)
+
+        ctx.reply(text.dark_aqua("Start building..."))
+
+        tag_name = self.draw_blocks(
+            name,
+            x,
+            y,
+            z,
+            right=right,
+            up=up,
+            size_x=size_x,
+            size_y=size_y,
+            rotation=rotation.value,
+            mirror=mirror.value,
+            dither=dither.value,
+            name=name,
+            mode=mode.value,
+            player=str(ctx.player)
+        )
+
+        ctx.success(f"Building `{tag_name}`, progress is shown in the actionbar")
+
+
+    @pic.command(name="map")
+    def _map(
+        self,
+        ctx: Context,
+        name: str,
+        tiles_x: Optional[int] = None,
+        tiles_y: Optional[int] = None,
+        rotation: ImageRotation = ImageRotation("none"),
+        mirror: ImageMirroring = ImageMirroring("none"),
+        dither: ImageDithering = ImageDithering("none")
+    ):
+        """
+        Turns the picture into map-art and gives the maps to the player, to hang in item frames.
+        The map files are written straight into the world: they use ids from 1048576 on so they never collide
+        with crafted maps, but are lost if something else writes map files in that range
+        """
+
+        if name not in self.persistent.pictures.keys():
+            ctx.error(f"There is not picture named `{name}`")
+            return
+
+        try:
+            ids = self.draw_map(
+                name,
+                tiles_x=tiles_x,
+                tiles_y=tiles_y,
+                rotation=rotation.value,
+                mirror=mirror.value,
+                dither=dither.value
+            )
+        except ValueError as e:
+            ctx.error(str(e))
+            return
+
+        writer = MapWriter(get_world_path(self.server))
+
+        with self.server.all_at_once():
+
+            for row in ids:
+                for map_id in row:
+                    self.server.execute(f"/{writer.give_command(str(ctx.player), map_id)}")
+
+        msg = text.dark_aqua(f"Gave {len(ids[0])}x{len(ids)} maps of `{name}` (")
+        msg += text.gold(f"#{ids[0][0]}")
+        msg += text.dark_aqua(" to ")
+        msg += text.gold(f"#{ids[-1][-1]}")
+        msg += text.dark_aqua("), top-left first")
+
+        ctx.reply(msg)
+
+
+    @pic.command
+    def pause(
+        self,
+        ctx: Context,
+        name: str
+    ):
+        """
+        Pauses the drawing of a picture
+        """
+
+        if not self.scheduler.pause(name):
+            ctx.error(f"`{name}` is not being drawn")
+            return
+
+        ctx.success(f"Paused `{name}`")
+
+
+    @pic.command
+    def resume(
+        self,
+        ctx: Context,
+        name: str
+    ):
+        """
+        Resumes the drawing of a paused picture
+        """
+
+        if not self.scheduler.resume(name):
+            ctx.error(f"`{name}` is not paused")
+            return
+
+        ctx.success(f"Resumed `{name}`")
+
+
+    @pic.command
+    def cancel(
+        self,
+        ctx: Context,
+        name: str
+    ):
+        """
+        Stops drawing a picture, use `clear` to remove what was already drawn
+        """
+
+        if not self.scheduler.cancel(name):
+            ctx.error(f"`{name}` is not being drawn")
+            return
+
+        ctx.success(f"Cancelled `{name}`")
 
 
     @pic.command(name="list")
@@ -424,11 +1102,11 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
 
         if downloaded is True:
 
-            if len(self.persistent.downloaded_pictures) == 0:
+            if len(self.persistent.pictures) == 0:
                 ctx.warn("There is no downloaded picture yet!")
                 return
 
-            ctx.reply(text.yellow(f"""Downloaded pictures: {", ".join(self.persistent.downloaded_pictures.keys())}"""))
+            ctx.reply(text.yellow(f"""Downloaded pictures: {", ".join(self.persistent.pictures.keys())}"""))
 
 
     @pic.command
@@ -441,15 +1119,13 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
         Displays the sizes of the given image
         """
 
-        if picture not in self.persistent.downloaded_pictures.keys():
+        if picture not in self.persistent.pictures.keys():
             ctx.error(f"There is no downloaded image called `{picture}`")
             return
 
-        img_arr = self._fetch_image(picture)
+        info = self.persistent.pictures[picture]
 
-        y, x = img_arr.shape[:2]
-
-        ctx.info(f"`{picture}`: {x}x{y}")
+        ctx.info(f"`{picture}`: {info['width']}x{info['height']}")
 
     
     @pic.command
@@ -467,6 +1143,22 @@ class PictureLoader(plugins.Plugin[None, Persistent]):
             return
 
         self.persistent.loaded_pictures.remove(name)
+        self.scheduler.cancel(name)
+
+        blocks = self.persistent.block_pictures.pop(name, None)
+
+        if blocks is None:
+            self.server.execute(f"/kill @e[tag={name}]")
+
+        else:
+            # Block-art has no entity, the blocks it placed are replaced with air
+            commands = clear_commands(blocks["rectangles"], blocks["origin"], blocks["right"], blocks["up"])
+
+            with self.server.all_at_once():
+                for command in commands:
+                    self.server.execute(f"/{command}")
+
+        self.persistent._save()
+        self._get_datapack().remove_functions(name)
 
-        self.server.execute(f"/kill @e[tag={name}]")
         ctx.success(f"Picture `{name}` cleared sucesfully")
\ No newline at end of file
@@ -0,0 +1,255 @@
+from typing import Callable, Optional
+import numpy as np
+import enum
+
+
+# (n, 3) pixels, (colours, 3) palette -> (n,) indices of the closest colours
+NearestFunction = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+class QuantizeMethod(enum.Enum):
+    MEDIAN_CUT = enum.auto()
+    KMEANS =     enum.auto()
+
+
+class Dither(enum.Enum):
+    NONE =            enum.auto()
+    ORDERED =         enum.auto()
+    FLOYD_STEINBERG = enum.auto()
+
+
+def bayer_matrix(size: int = 8) -> np.ndarray:
+    """
+    Returns the (size, size) Bayer threshold matrix, normalized to [-0.5, 0.5)
+    """
+
+    matrix = np.zeros((1, 1), dtype=np.float32)
+
+    while matrix.shape[0] < size:
+        matrix = np.block([
+            [4 * matrix,     4 * matrix + 2],
+            [4 * matrix + 3, 4 * matrix + 1]
+        ])
+
+    return matrix / matrix.size - 0.5
+
+
+def median_cut(
+    pixels: np.ndarray,
+    colors: int
+) -> np.ndarray:
+    """
+    Returns a palette of at most `colors` RGB colours for the given (n, 3) pixels.
+
+    The box with the widest channel range is split at its median until there are enough boxes,
+    every box then gives the mean of its pixels
+    """
+
+    boxes = [pixels]
+
+    while len(boxes) < colors:
+
+        ranges = [np.ptp(box, axis=0).max() if len(box) > 1 else -1 for box in boxes]
+        widest = int(np.argmax(ranges))
+
+        if ranges[widest] <= 0:
+            break
+
+        box = boxes.pop(widest)
+        channel = int(np.argmax(np.ptp(box, axis=0)))
+
+        order = np.argsort(box[:, channel], kind="stable")
+        half = len(box) // 2
+
+        boxes.extend([box[order[:half]], box[order[half:]]])
+
+    return np.array([box.mean(axis=0) for box in boxes], dtype=np.float32)
+
+
+def nearest_colors(
+    pixels: np.ndarray,
+    palette: np.ndarray,
+    batch: int = 65536
+) -> np.ndarray:
+    """
+    Returns the index of the closest palette colour of every (n, 3) pixel
+    """
+
+    indices = np.empty(len(pixels), dtype=np.intp)
+    palette = palette.astype(np.float32)
+    palette_norms = (palette ** 2).sum(axis=1)
+
+    for start in range(0, len(pixels), batch):
+
+        part = pixels[start:start + batch].astype(np.float32)
+
+        # |p - c|² without the |p|² term, which is the same for every colour
+        distances = palette_norms[None, :] - 2 * part @ palette.T
+        indices[start:start + batch] = np.argmin(distances, axis=1)
+
+    return indices
+
+
+def kmeans(
+    pixels: np.ndarray,
+    colors: int,
+    iterations: int = 8,
+    sample: int = 65536,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Refines a median cut palette with a few Lloyd iterations over a sample of the pixels
+    """
+
+    rng = np.random.default_rng(seed)
+
+    if len(pixels) > sample:
+        pixels = pixels[rng.choice(len(pixels), sample, replace=False)]
+
+    pixels = pixels.astype(np.float32)
+    palette = median_cut(pixels, colors)
+
+    for _ in range(iterations):
+
+        labels = nearest_colors(pixels, palette)
+
+        sums = np.zeros_like(palette)
+        np.add.at(sums, labels, pixels)
+        counts = np.bincount(labels, minlength=len(palette)).astype(np.float32)
+
+        used = counts > 0
+        updated = palette.copy()
+        updated[used] = sums[used] / counts[used, None]
+
+        if np.allclose(updated, palette, atol=0.5):
+            palette = updated
+            break
+
+        palette = updated
+
+    return palette
+
+
+def floyd_steinberg(
+    rgb: np.ndarray,
+    palette: np.ndarray,
+    mask: np.ndarray,
+    nearest: Optional[NearestFunction] = None
+) -> np.ndarray:
+    """
+    Maps the (h, w, 3) image onto the palette with Floyd–Steinberg error diffusion.
+
+    Pixel (y, x) only depends on the pixels of the anti-diagonals `2y + x` before its own,
+    so every anti-diagonal is quantized at once
+    """
+
+    nearest = nearest_colors if nearest is None else nearest
+    height, width = rgb.shape[:2]
+
+    # One pixel of padding on each side swallows the error diffused out of the image
+    work = np.zeros((height + 1, width + 2, 3), dtype=np.float32)
+    work[:height, 1:width + 1] = rgb
+
+    indices = np.zeros((height, width), dtype=np.intp)
+    ys, xs = np.mgrid[0:height, 0:width]
+    waves = (2 * ys + xs).ravel()
+    order = np.argsort(waves, kind="stable")
+    bounds = np.searchsorted(waves[order], np.arange(waves.max() + 2))
+
+    flat_y, flat_x = ys.ravel()[order], xs.ravel()[order]
+
+    for wave in range(len(bounds) - 1):
+
+        y = flat_y[bounds[wave]:bounds[wave + 1]]
+        x = flat_x[bounds[wave]:bounds[wave + 1]]
+
+        old = np.clip(work[y, x + 1], 0, 255)
+        index = nearest(old, palette)
+        error = (old - palette[index]) * mask[y, x, None]
+
+        indices[y, x] = index
+
+        work[y, x + 2] += error * (7 / 16)
+        work[y + 1, x] += error * (3 / 16)
+        work[y + 1, x + 1] += error * (5 / 16)
+        work[y + 1, x + 2] += error * (1 / 16)
+
+    return indices
+
+
+def palette_indices(
+    rgb: np.ndarray,
+    palette: np.ndarray,
+    mask: np.ndarray,
+    dither: Dither = Dither.NONE,
+    nearest: Optional[NearestFunction] = None
+) -> np.ndarray:
+    """
+    Returns the (h, w) indices of the palette colours drawing the (h, w, 3) image,
+    `mask` telling which pixels are drawn at all.
+
+    `nearest` replaces the brute force nearest colour lookup, e.g. by a KD-tree for big palettes
+    """
+
+    nearest = nearest_colors if nearest is None else nearest
+    rgb = rgb.astype(np.float32)
+
+    if dither == Dither.FLOYD_STEINBERG:
+        return floyd_steinberg(rgb, palette, mask, nearest)
+
+    if dither == Dither.ORDERED:
+
+        matrix = bayer_matrix(8)
+        height, width = rgb.shape[:2]
+        thresholds = np.tile(matrix, (height // 8 + 1, width // 8 + 1))[:height, :width]
+
+        # Spreads the pixels by about the spacing between the palette colours
+        spread = 255 / max(1, round(len(palette) ** (1 / 3)))
+        rgb = np.clip(rgb + thresholds[..., None] * spread, 0, 255)
+
+    return nearest(rgb.reshape(-1, 3), palette).reshape(rgb.shape[:2])
+
+
+def quantize(
+    image_arr: np.ndarray,
+    colors: int,
+    method: QuantizeMethod = QuantizeMethod.MEDIAN_CUT,
+    dither: Dither = Dither.NONE,
+    palette: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Reduces the opaque pixels of an RGBA image to a palette of `colors` colours,
+    the palette is computed from the image unless given. Alpha is kept as it is
+    """
+
+    image_arr = np.asarray(image_arr)
+    rgb = image_arr[..., :3].astype(np.float32)
+
+    if image_arr.shape[2] == 4:
+        mask = image_arr[..., 3] != 0
+    else:
+        mask = np.ones(image_arr.shape[:2], dtype=bool)
+
+    opaque = rgb[mask]
+
+    if len(opaque) == 0:
+        return image_arr
+
+    if palette is None:
+
+        if method == QuantizeMethod.KMEANS:
+            palette = kmeans(opaque, colors)
+        else:
+            palette = median_cut(opaque, colors)
+
+    palette = np.asarray(palette, dtype=np.float32)
+    indices = palette_indices(rgb, palette, mask, dither)
+
+    result = image_arr.copy()
+    result[..., :3] = np.where(
+        mask[..., None],
+        np.rint(palette[indices]).astype(image_arr.dtype),
+        image_arr[..., :3]
+    )
+
+    return result
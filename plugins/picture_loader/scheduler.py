@@ -0,0 +1,345 @@
+from typing import Callable, List, Optional
+from collections import OrderedDict
+import threading
+import enum
+import time
+
+from mconduit import text, Server
+
+
+TICK = 0.05 # Seconds
+
+# Ticks between two progress reports
+REPORT_INTERVAL = 10
+
+
+class DrawState(enum.Enum):
+    QUEUED =    enum.auto()
+    RUNNING =   enum.auto()
+    PAUSED =    enum.auto()
+    CANCELLED = enum.auto()
+    DONE =      enum.auto()
+    FAILED =    enum.auto()
+
+
+class DrawJob:
+    """
+    The commands drawing one picture, ran a few at a time by the `DrawScheduler`.
+
+    Each step is a command whose cost is the number of entities it summons or blocks it places
+    (1 for a summon, the volume of a `fill`, the sum of its commands for a `/function` call)
+    """
+
+
+    tag: str
+    steps: List[str]
+    costs: List[int]
+    player: Optional[str]
+    prepare: Optional[Callable[[], None]]
+    state: DrawState
+    position: int
+    drawn: int
+    total: int
+    error: Optional[Exception]
+    started: Optional[float]
+    done: threading.Event
+
+
+    def __init__(
+        self,
+        tag: str,
+        steps: List[str],
+        costs: Optional[List[int]] = None,
+        player: Optional[str] = None,
+        prepare: Optional[Callable[[], None]] = None
+    ) -> "DrawJob":
+        """
+        `prepare` is called on the scheduler thread before the first step, `player` gets the progress
+        """
+
+        self.tag = tag
+        self.steps = steps
+        self.costs = [1] * len(steps) if costs is None else costs
+        self.player = player
+        self.prepare = prepare
+
+        self.state = DrawState.QUEUED
+        self.position = 0
+        self.drawn = 0
+        self.total = sum(self.costs)
+        self.error = None
+        self.started = None
+        self.done = threading.Event()
+
+
+    @property
+    def progress(self) -> float:
+        return 1.0 if self.total == 0 else self.drawn / self.total
+
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DrawState.CANCELLED, DrawState.DONE, DrawState.FAILED)
+
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+
+class DrawScheduler:
+    """
+    Spreads the drawing of pictures across server ticks.
+
+    Every tick, the running job executes steps until `entities_per_tick` entities were summoned,
+    so big pictures never freeze the server. Jobs run one after the other in submission order,
+    and can be paused, resumed or cancelled by their tag
+    """
+
+
+    server: Server
+    entities_per_tick: int
+    __jobs: "OrderedDict[str, DrawJob]"
+
+
+    def __init__(
+        self,
+        server: Server,
+        entities_per_tick: int = 1000
+    ) -> "DrawScheduler":
+
+        self.server = server
+        self.entities_per_tick = max(1, entities_per_tick)
+
+        self.__jobs = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__wake = threading.Event()
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+
+    def start(self) -> None:
+
+        if self.__thread is not None:
+            return
+
+        self.__stopped.clear()
+        self.__thread = threading.Thread(target=self.__run, name="picture-draw", daemon=True)
+        self.__thread.start()
+
+
+    def stop(self) -> None:
+        """
+        Stops the scheduler, the unfinished jobs are cancelled
+        """
+
+        if self.__thread is not None:
+            self.__stopped.set()
+            self.__wake.set()
+            self.__thread.join()
+            self.__thread = None
+
+        with self.__lock:
+            jobs, self.__jobs = list(self.__jobs.values()), OrderedDict()
+
+        for job in jobs:
+            self.__finish(job, DrawState.CANCELLED)
+
+
+    @property
+    def jobs(self) -> List[DrawJob]:
+
+        with self.__lock:
+            return list(self.__jobs.values())
+
+
+    def get(self, tag: str) -> Optional[DrawJob]:
+
+        with self.__lock:
+            return self.__jobs.get(tag)
+
+
+    def submit(self, job: DrawJob) -> DrawJob:
+
+        with self.__lock:
+            self.__jobs[job.tag] = job
+
+        self.__wake.set()
+
+        return job
+
+
+    def pause(self, tag: str) -> bool:
+
+        with self.__lock:
+
+            job = self.__jobs.get(tag)
+
+            if job is None or job.state not in (DrawState.QUEUED, DrawState.RUNNING):
+                return False
+
+            job.state = DrawState.PAUSED
+
+        self.__report(job, "paused")
+
+        return True
+
+
+    def resume(self, tag: str) -> bool:
+
+        with self.__lock:
+
+            job = self.__jobs.get(tag)
+
+            if job is None or job.state != DrawState.PAUSED:
+                return False
+
+            job.state = DrawState.QUEUED if job.position == 0 else DrawState.RUNNING
+
+        self.__wake.set()
+
+        return True
+
+
+    def cancel(self, tag: str) -> bool:
+        """
+        Stops drawing the picture, what's already drawn stays in the world
+        """
+
+        with self.__lock:
+            job = self.__jobs.pop(tag, None)
+
+        if job is None:
+            return False
+
+        self.__finish(job, DrawState.CANCELLED)
+
+        return True
+
+
+    def __next_job(self) -> Optional[DrawJob]:
+
+        with self.__lock:
+
+            for job in self.__jobs.values():
+
+                if job.state in (DrawState.QUEUED, DrawState.RUNNING):
+                    return job
+
+        return None
+
+
+    def __run(self) -> None:
+
+        next_tick = time.monotonic()
+        ticks = 0
+
+        while not self.__stopped.is_set():
+
+            job = self.__next_job()
+
+            if job is None:
+                self.__wake.wait()
+                self.__wake.clear()
+                next_tick = time.monotonic()
+                continue
+
+            try:
+                self.__tick(job)
+            except Exception as e:
+                job.error = e
+
+                with self.__lock:
+                    self.__jobs.pop(job.tag, None)
+
+                self.__finish(job, DrawState.FAILED)
+
+            ticks += 1
+
+            if job.state == DrawState.RUNNING and ticks % REPORT_INTERVAL == 0:
+                self.__report(job, "drawing")
+
+            # Never tries to catch up on missed ticks, a late server must not get a bigger burst
+            next_tick = max(next_tick + TICK, time.monotonic())
+            self.__stopped.wait(next_tick - time.monotonic())
+
+
+    def __tick(self, job: DrawJob) -> None:
+
+        if job.state == DrawState.QUEUED:
+
+            if job.prepare is not None:
+                job.prepare()
+
+            job.started = time.perf_counter()
+
+            with self.__lock:
+
+                # Paused or cancelled while preparing
+                if job.state != DrawState.QUEUED:
+                    return
+
+                job.state = DrawState.RUNNING
+
+        budget = self.entities_per_tick
+
+        with self.server.all_at_once():
+
+            # Always runs at least one step, even if it costs more than the budget
+            while job.position < len(job.steps) and job.state == DrawState.RUNNING:
+
+                cost = job.costs[job.position]
+
+                if budget < cost and budget != self.entities_per_tick:
+                    break
+
+                self.server.execute(job.steps[job.position])
+
+                job.position += 1
+                job.drawn += cost
+                budget -= cost
+
+        if job.position >= len(job.steps):
+
+            with self.__lock:
+
+                # Paused or cancelled during the last steps
+                if job.state != DrawState.RUNNING:
+                    return
+
+                self.__jobs.pop(job.tag, None)
+
+            self.__finish(job, DrawState.DONE)
+
+
+    def __finish(self, job: DrawJob, state: DrawState) -> None:
+        """
+        Sets the final state of the job, only the first call counts
+        """
+
+        with self.__lock:
+
+            if job.done.is_set():
+                return
+
+            job.state = state
+            job.done.set()
+
+        if state == DrawState.DONE:
+            self.__report(job, f"done in {time.perf_counter() - job.started:.1f}s")
+        else:
+            self.__report(job, state.name.lower())
+
+
+    def __report(self, job: DrawJob, status: str) -> None:
+
+        if job.player is None:
+            return
+
+        msg = text.dark_aqua(f"`{job.tag}` {status}: ")
+        msg += text.gold(f"{job.drawn}/{job.total}")
+        msg += text.dark_aqua(f" ({job.progress * 100:.0f}%)")
+
+        try:
+            self.server.execute(f"/title {job.player} actionbar {msg}")
+        except Exception:
+            pass # Progress reports are best effort
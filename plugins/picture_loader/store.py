@@ -0,0 +1,96 @@
+from typing import Any, Dict
+from pathlib import Path
+import numpy as np
+import hashlib
+
+
+PictureInfo = Dict[str, Any] # {"file": str, "width": int, "height": int, "hash": str}
+
+
+def to_rgba(image_arr: np.ndarray) -> np.ndarray:
+    """
+    Casts an RGB or RGBA image to a contiguous uint8 RGBA array
+    """
+
+    image_arr = np.asarray(image_arr)
+
+    if image_arr.shape[2] == 3:
+        alpha = np.full((*image_arr.shape[:2], 1), 255, dtype=np.uint8)
+        image_arr = np.concatenate((image_arr.astype(np.uint8), alpha), axis=2)
+
+    return np.ascontiguousarray(image_arr, dtype=np.uint8)
+
+
+class PictureStore:
+    """
+    Keeps the downloaded pictures as `.npy` files inside the given folder.
+
+    Files are named after the hash of their pixels, so the same picture saved under two names
+    is only stored once. Only the returned `PictureInfo` goes into the persistent data,
+    the pixels are mapped from disk the first time they are needed
+    """
+
+
+    folder: Path
+    __arrays: Dict[str, np.ndarray]
+
+
+    def __init__(self, folder: Path) -> "PictureStore":
+
+        self.folder = Path(folder)
+        self.__arrays = {}
+
+
+    def save(self, image_arr: np.ndarray) -> PictureInfo:
+        """
+        Writes the picture to disk (unless already there) and returns its metadata
+        """
+
+        image_arr = to_rgba(image_arr)
+        height, width = image_arr.shape[:2]
+
+        digest = hashlib.sha256()
+        digest.update(f"{width}x{height}".encode())
+        digest.update(image_arr.data)
+        digest = digest.hexdigest()
+
+        file = f"{digest[:32]}.npy"
+        path = self.folder / file
+
+        if not path.exists():
+
+            self.folder.mkdir(parents=True, exist_ok=True)
+
+            # Written aside first, so a crash never leaves a truncated picture behind
+            temp = path.with_suffix(".tmp")
+
+            with open(temp, "wb") as f:
+                np.save(f, image_arr)
+
+            temp.replace(path)
+
+        return {"file": file, "width": width, "height": height, "hash": digest}
+
+
+    def load(self, info: PictureInfo) -> np.ndarray:
+        """
+        Returns the read-only pixels of a stored picture, memory-mapped from its file
+        """
+
+        file = info["file"]
+        image_arr = self.__arrays.get(file)
+
+        if image_arr is None:
+            image_arr = np.load(self.folder / file, mmap_mode="r")
+            self.__arrays[file] = image_arr
+
+        return image_arr
+
+
+    def remove(self, info: PictureInfo) -> None:
+        """
+        Deletes the file of a picture, callers must make sure no other name still uses it
+        """
+
+        self.__arrays.pop(info["file"], None)
+        (self.folder / info["file"]).unlink(missing_ok=True)
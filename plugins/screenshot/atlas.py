@@ -21,17 +21,21 @@ class TextureAtlas:
         self.tiles_per_row = size // tile_size
         self.current_index = 0
         self.uv_map: Dict[Tuple[str, str], Tuple[float, float, float, float]] = {}
+        self.tile_map: Dict[Tuple[str, str], int] = {}
 
 
-    def get_uv(
+    def get_tile(
         self,
         block_name: str,
         face: str
-    ) -> Tuple[float, float, float, float]:
+    ) -> int:
+        """
+        Returns the index of the tile holding the texture of the given block face
+        """
         
         key = (block_name, face)
-        if key in self.uv_map:
-            return self.uv_map[key]
+        if key in self.tile_map:
+            return self.tile_map[key]
 
         img = self.manager.get_texture(block_name, face)
 
@@ -43,8 +47,28 @@ class TextureAtlas:
         x = (self.current_index % self.tiles_per_row) * self.tile_size
         y = (self.current_index // self.tiles_per_row) * self.tile_size
         self.image.paste(img, (x, y))
+
+        self.tile_map[key] = self.current_index
         self.current_index += 1
 
+        return self.tile_map[key]
+
+
+    def get_uv(
+        self,
+        block_name: str,
+        face: str
+    ) -> Tuple[float, float, float, float]:
+        
+        key = (block_name, face)
+        if key in self.uv_map:
+            return self.uv_map[key]
+
+        tile = self.get_tile(block_name, face)
+
+        x = (tile % self.tiles_per_row) * self.tile_size
+        y = (tile // self.tiles_per_row) * self.tile_size
+
         u0, v0 = x / self.size, y / self.size
         u1, v1 = (x + self.tile_size) / self.size, (y + self.tile_size) / self.size
         
@@ -0,0 +1,153 @@
+from typing import Optional, Callable, Dict, List, Tuple
+import numpy as np
+
+from mconduit import Vec3d, Dimension
+from plugins.world_cache.world import dimension_name
+
+
+BRICK_SIZE = 8
+
+
+class BrickMap:
+    """
+    Sparse occupancy of the world split in 8x8x8 bricks.
+
+    A brick is empty when none of its blocks can be hit by a ray, so rays can cross it in a single jump.
+    Bricks are filled lazily the first time they are queried and kept until invalidated,
+    so the same map can serve many renders while the world doesn't change.
+    `invalidate` has the signature of a `RegionChangeFeed` subscriber
+    """
+
+
+    __world_reader: object
+    __is_solid: Callable[[str], bool]
+    __bricks: Dict[Tuple[str, int, int, int], bool]
+
+
+    def __init__(
+        self,
+        world_reader: object,
+        is_solid: Callable[[str], bool]
+    ) -> "BrickMap":
+
+        self.__world_reader = world_reader
+        self.__is_solid = is_solid
+        self.__bricks = {}
+
+
+    def __len__(self) -> int:
+        return len(self.__bricks)
+
+
+    def invalidate(
+        self,
+        dim: Optional[Dimension] = None,
+        chunks: Optional[List[Tuple[int, int]]] = None
+    ) -> None:
+        """
+        Forgets the bricks of the given chunks of a dimension, every brick of the dimension if no chunk is given,
+        or all of them if no dimension is given either
+        """
+
+        if dim is None:
+            self.__bricks = {}
+            return
+
+        dim = dimension_name(dim)
+        per_chunk = 16 // BRICK_SIZE
+
+        if chunks is None:
+            touched = None
+        else:
+            touched = {(cx, cz) for cx, cz in chunks}
+
+        self.__bricks = {
+            key: empty
+            for key, empty in self.__bricks.items()
+            if key[0] != dim or (touched is not None and (key[1] // per_chunk, key[3] // per_chunk) not in touched)
+        }
+
+
+    def is_empty(
+        self,
+        bx: int,
+        by: int,
+        bz: int,
+        dim: Dimension = Dimension.Overworld
+    ) -> bool:
+        """
+        Returns whether the brick with the given brick coordinates has no solid block
+        """
+
+        key = (dimension_name(dim), bx, by, bz)
+        empty = self.__bricks.get(key)
+
+        if empty is None:
+            empty = self.__bricks[key] = self.__fill(bx, by, bz, dim)
+
+        return empty
+
+
+    def is_empty_at(
+        self,
+        x: int,
+        y: int,
+        z: int,
+        dim: Dimension = Dimension.Overworld
+    ) -> bool:
+        """
+        Returns whether the brick containing the given block has no solid block
+        """
+
+        return self.is_empty(x // BRICK_SIZE, y // BRICK_SIZE, z // BRICK_SIZE, dim)
+
+
+    def to_grid(
+        self,
+        corner1: Tuple[int, int, int],
+        corner2: Tuple[int, int, int],
+        dim: Dimension = Dimension.Overworld
+    ) -> Tuple[Tuple[int, int, int], np.ndarray]:
+        """
+        Returns the occupancy of all the bricks between the two block corners as a dense `(x, y, z)` uint8 grid
+        (1 where the brick holds something), together with the brick coordinates of the first cell.
+
+        Meant to be uploaded as a 3D texture by GPU ray-marchers
+        """
+
+        start = tuple(min(a, b) // BRICK_SIZE for a, b in zip(corner1, corner2))
+        end = tuple(max(a, b) // BRICK_SIZE for a, b in zip(corner1, corner2))
+
+        grid = np.zeros([e - s + 1 for s, e in zip(start, end)], dtype=np.uint8)
+
+        for i in range(grid.shape[0]):
+            for j in range(grid.shape[1]):
+                for k in range(grid.shape[2]):
+                    grid[i, j, k] = not self.is_empty(start[0] + i, start[1] + j, start[2] + k, dim)
+
+        return start, grid
+
+
+    def __fill(
+        self,
+        bx: int,
+        by: int,
+        bz: int,
+        dim: Dimension
+    ) -> bool:
+        """
+        Reads the blocks of a brick of the dimension and returns whether it is empty
+        """
+
+        x0, y0, z0 = bx * BRICK_SIZE, by * BRICK_SIZE, bz * BRICK_SIZE
+
+        for x in range(x0, x0 + BRICK_SIZE):
+            for y in range(y0, y0 + BRICK_SIZE):
+                for z in range(z0, z0 + BRICK_SIZE):
+
+                    block = self.__world_reader.get_block(Vec3d(x, y, z), dim)
+
+                    if block and self.__is_solid(block["Name"].replace("minecraft:", "")):
+                        return False
+
+        return True
\ No newline at end of file
@@ -56,7 +56,8 @@ class ScreenshotCog(commands.Cog):
         max_dist: int = None,
         texture: str = None,
         width: int = None,
-        height: int = None
+        height: int = None,
+        instanced: bool = None
     ):
 
         if None in (x, y, z):
@@ -77,7 +78,8 @@ class ScreenshotCog(commands.Cog):
             max_dist,
             texture,
             width,
-            height
+            height,
+            instanced
         )
         image_path = save_image(image)
 
@@ -0,0 +1,270 @@
+from typing import Optional, List, Tuple, Hashable, Iterable
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+import moderngl
+import zlib
+
+
+VERTEX_FORMAT = "3f 2f 1f 3f"
+VERTEX_ATTRIBUTES = ("in_position", "in_uv", "in_light", "in_tint")
+VERTEX_FLOATS = 9
+VERTEX_SIZE = VERTEX_FLOATS * 4
+
+
+@dataclass
+class ChunkSlot:
+    first: int  # First vertex inside the arena
+    count: int  # Number of vertices
+    digest: int # Checksum of the uploaded mesh
+
+
+class GpuScene:
+    """
+    Keeps the chunk meshes resident on the GPU between renders.
+
+    All the meshes live inside a single vertex buffer (the arena) sized by the memory budget,
+    so that the visible chunks can be drawn with one multi-draw call.
+    When the arena is full, the least recently drawn chunks are evicted
+    """
+
+
+    ctx: moderngl.Context
+    budget: int
+    capacity: int
+    uploads: int
+    reuses: int
+    evictions: int
+    __vbo: moderngl.Buffer
+    __vao: moderngl.VertexArray
+    __slots: "OrderedDict[Hashable, ChunkSlot]"
+    __free: List[List[int]]
+
+
+    def __init__(
+        self,
+        ctx: moderngl.Context,
+        program: moderngl.Program,
+        budget: int = 128 * 1024 * 1024
+    ) -> "GpuScene":
+
+        self.ctx = ctx
+        self.budget = budget
+        self.capacity = budget // VERTEX_SIZE
+        self.uploads = 0
+        self.reuses = 0
+        self.evictions = 0
+
+        self.__program = program
+        self.__vbo = ctx.buffer(reserve=self.capacity * VERTEX_SIZE)
+        self.__vao = ctx.vertex_array(program, [(self.__vbo, VERTEX_FORMAT, *VERTEX_ATTRIBUTES)])
+        self.__slots = OrderedDict()
+        self.__free = [[0, self.capacity]]
+        self.__multi_draw = True
+
+
+    @property
+    def used_bytes(self) -> int:
+        """
+        Bytes of the arena currently occupied by chunk meshes
+        """
+
+        return sum(slot.count for slot in self.__slots.values()) * VERTEX_SIZE
+
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__slots
+
+
+    def release(self) -> None:
+        """
+        Frees all the GPU resources held by the scene
+        """
+
+        self.__slots.clear()
+        self.__free = [[0, self.capacity]]
+        self.__vao.release()
+        self.__vbo.release()
+
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Drops the given chunk from the GPU, or every chunk if `key` is None
+        """
+
+        if key is None:
+            self.__slots.clear()
+            self.__free = [[0, self.capacity]]
+            return
+
+        if key in self.__slots:
+            self.__release_slot(key)
+
+
+    def render(
+        self,
+        chunks: Iterable[Tuple[Hashable, np.ndarray]]
+    ) -> None:
+        """
+        Draws the given `(key, mesh)` chunks, uploading only the meshes that are not resident yet
+        or that changed since they were uploaded
+        """
+
+        pending: List[Tuple[int, int]] = []
+        pinned = set()
+
+        for key, mesh in chunks:
+
+            count = len(mesh) // VERTEX_FLOATS
+
+            if count == 0:
+                continue
+
+            if count > self.capacity:
+                self.__draw_transient(mesh)
+                continue
+
+            digest = zlib.crc32(mesh)
+            slot = self.__slots.get(key)
+
+            if slot is not None and slot.digest == digest:
+
+                self.__slots.move_to_end(key)
+                self.reuses += 1
+
+            else:
+
+                if slot is not None:
+                    self.__release_slot(key)
+
+                first = self.__allocate(count, pinned)
+
+                if first is None:
+
+                    # The chunks needed by this frame don't fit together: draw what
+                    # we have so far and make their space available again
+                    self.__draw(pending)
+                    pending = []
+                    pinned = set()
+
+                    first = self.__allocate(count, pinned)
+
+                self.__vbo.write(mesh.tobytes(), offset=first * VERTEX_SIZE)
+
+                slot = ChunkSlot(first, count, digest)
+                self.__slots[key] = slot
+                self.uploads += 1
+
+            pending.append((slot.first, slot.count))
+            pinned.add(key)
+
+        self.__draw(pending)
+
+
+    def __allocate(
+        self,
+        count: int,
+        pinned: set
+    ) -> Optional[int]:
+        """
+        Finds room for `count` vertices, evicting the least recently used chunks if needed
+        """
+
+        while True:
+
+            for i, (first, size) in enumerate(self.__free):
+
+                if size >= count:
+
+                    if size == count:
+                        self.__free.pop(i)
+                    else:
+                        self.__free[i] = [first + count, size - count]
+
+                    return first
+
+            victim = next((key for key in self.__slots if key not in pinned), None)
+
+            if victim is None:
+                return None
+
+            self.__release_slot(victim)
+            self.evictions += 1
+
+
+    def __release_slot(self, key: Hashable) -> None:
+        """
+        Gives back the arena range of the given chunk, merging it with the adjacent free ranges
+        """
+
+        slot = self.__slots.pop(key)
+        self.__free.append([slot.first, slot.count])
+        self.__free.sort()
+
+        merged = [self.__free[0]]
+
+        for first, size in self.__free[1:]:
+
+            last = merged[-1]
+
+            if last[0] + last[1] == first:
+                last[1] += size
+            else:
+                merged.append([first, size])
+
+        self.__free = merged
+
+
+    def __draw(self, ranges: List[Tuple[int, int]]) -> None:
+        """
+        Draws the given `(first, count)` arena ranges with a single multi-draw call when available
+        """
+
+        if len(ranges) == 0:
+            return
+
+        ranges = sorted(ranges)
+        merged = [list(ranges[0])]
+
+        for first, count in ranges[1:]:
+
+            if merged[-1][0] + merged[-1][1] == first:
+                merged[-1][1] += count
+            else:
+                merged.append([first, count])
+
+        if self.__multi_draw:
+
+            # DrawArraysIndirectCommand: count, instance_count, first, base_instance
+            commands = np.array(
+                [(count, 1, first, 0) for first, count in merged],
+                dtype=np.uint32
+            )
+            indirect = self.ctx.buffer(commands.tobytes())
+
+            try:
+                self.__vao.render_indirect(indirect, mode=moderngl.TRIANGLES, count=len(merged))
+                return
+
+            except moderngl.Error:
+                self.__multi_draw = False # Needs OpenGL 4.3
+
+            finally:
+                indirect.release()
+
+        for first, count in merged:
+            self.__vao.render(moderngl.TRIANGLES, vertices=count, first=first)
+
+
+    def __draw_transient(self, mesh: np.ndarray) -> None:
+        """
+        Draws a mesh that doesn't fit in the arena without keeping it resident
+        """
+
+        vbo = self.ctx.buffer(mesh.tobytes())
+        vao = self.ctx.vertex_array(self.__program, [(vbo, VERTEX_FORMAT, *VERTEX_ATTRIBUTES)])
+
+        vao.render(moderngl.TRIANGLES)
+
+        vao.release()
+        vbo.release()
\ No newline at end of file
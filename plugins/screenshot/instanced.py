@@ -0,0 +1,121 @@
+from typing import Tuple
+import numpy as np
+import moderngl
+
+from .mesher import FACES, TINT_COLORS
+from .atlas import TextureAtlas
+
+
+def _glsl_array(kind: str, values: list) -> str:
+
+    items = ", ".join(f"{kind}({', '.join(str(float(v)) for v in value)})" for value in values)
+
+    return f"{kind}[{len(values)}]({items})"
+
+
+CORNERS = [corner for verts, _uv, _light, _offset in FACES.values() for corner in verts]
+UV_CORNERS = [uv for _verts, uv_corners, _light, _offset in FACES.values() for uv in uv_corners]
+LIGHTS = [light for _verts, _uv, light, _offset in FACES.values()]
+
+
+class InstancedFaces:
+    """
+    Alternative draw path: every exposed face is uploaded as a single FACE_RECORD
+    and a unit quad is instanced over them, being expanded in the vertex shader
+    """
+
+
+    vertex_shader = f"""
+        #version 330
+        uniform mat4 proj;
+        uniform mat4 view;
+        uniform vec3 origin;
+        uniform float tilesPerRow;
+        uniform float tileUv;
+        uniform vec3 tints[{len(TINT_COLORS)}];
+
+        const vec3 CORNERS[{len(CORNERS)}] = {_glsl_array("vec3", CORNERS)};
+        const vec2 UV_CORNERS[{len(UV_CORNERS)}] = {_glsl_array("vec2", UV_CORNERS)};
+        const float LIGHTS[{len(LIGHTS)}] = float[{len(LIGHTS)}]({", ".join(str(float(l)) for l in LIGHTS)});
+        const int QUAD[6] = int[6](0, 1, 2, 0, 2, 3);
+
+        in ivec3 in_pos;
+        in uint in_face;
+        in uint in_tint;
+        in uint in_tile;
+
+        out vec2 v_uv;
+        out float v_light;
+        out float v_distance;
+        out vec3 v_tint;
+
+        void main() {{
+            int face = int(in_face);
+            int corner = face * 4 + QUAD[gl_VertexID];
+
+            vec4 pos = view * vec4(origin + vec3(in_pos) + CORNERS[corner], 1.0);
+            v_distance = length(pos.xyz);
+            gl_Position = proj * pos;
+
+            float tile = float(in_tile);
+            vec2 tile_origin = vec2(mod(tile, tilesPerRow), floor(tile / tilesPerRow)) * tileUv;
+
+            v_uv = tile_origin + UV_CORNERS[corner] * tileUv;
+            v_light = LIGHTS[face];
+            v_tint = tints[int(in_tint)];
+        }}
+    """
+
+
+    def __init__(
+        self,
+        ctx: moderngl.Context,
+        fragment_shader: str
+    ) -> "InstancedFaces":
+
+        self.ctx = ctx
+        self.program = ctx.program(vertex_shader=self.vertex_shader, fragment_shader=fragment_shader)
+
+
+    def release(self) -> None:
+        self.program.release()
+
+
+    def render(
+        self,
+        faces: np.ndarray,
+        origin: Tuple[int, int, int],
+        atlas: TextureAtlas,
+        proj: np.ndarray,
+        view: np.ndarray,
+        fog_color: Tuple[float, float, float],
+        max_distance: int
+    ) -> None:
+        """
+        Draws the given FACE_RECORDs
+        """
+
+        if len(faces) == 0:
+            return
+
+        prog = self.program
+
+        prog['proj'].write(proj.tobytes())
+        prog['view'].write(view.tobytes())
+        prog['origin'].value = tuple(float(i) for i in origin)
+        prog['tilesPerRow'].value = float(atlas.tiles_per_row)
+        prog['tileUv'].value = atlas.tile_size / atlas.size
+        prog['tints'].value = TINT_COLORS
+        prog['fogColor'].value = fog_color
+        prog['maxDist'].value = max_distance
+
+        vbo = self.ctx.buffer(faces.tobytes())
+        vao = self.ctx.vertex_array(
+            prog,
+            [(vbo, "3i2 u1 u1 u2/i", "in_pos", "in_face", "in_tint", "in_tile")]
+        )
+
+        vao.render(moderngl.TRIANGLES, vertices=6, instances=len(faces))
+
+        vao.release()
+        vbo.release()
\ No newline at end of file
@@ -0,0 +1,91 @@
+from typing import Optional, List, Tuple
+import numpy as np
+
+from plugins.world_cache.lru import LRUCache, MISSING
+from plugins.world_cache.world import dimension_name
+
+from .atlas import TextureAtlas
+
+
+class MeshCache:
+    """
+    Keeps the meshes of the recently rendered chunks, so a chunk is only meshed again after it changes.
+
+    Entries are keyed by the vertical range and the atlas they were meshed with, and dropped by
+    `invalidate_chunks`, which is subscribed to the world_cache change feed
+    """
+
+
+    meshes: LRUCache
+
+
+    def __init__(self, budget: int = 256 * 1024 * 1024) -> "MeshCache":
+
+        self.meshes = LRUCache(budget)
+
+
+    @staticmethod
+    def key(
+        dim: str,
+        cx: int,
+        cz: int,
+        min_y: int,
+        max_y: int,
+        atlas: TextureAtlas
+    ) -> Tuple:
+
+        return (dimension_name(dim), cx, cz, min_y, max_y, id(atlas))
+
+
+    def get(
+        self,
+        dim: str,
+        cx: int,
+        cz: int,
+        min_y: int,
+        max_y: int,
+        atlas: TextureAtlas
+    ) -> Optional[np.ndarray]:
+
+        mesh = self.meshes.get(self.key(dim, cx, cz, min_y, max_y, atlas))
+
+        return None if mesh is MISSING else mesh
+
+
+    def put(
+        self,
+        dim: str,
+        cx: int,
+        cz: int,
+        min_y: int,
+        max_y: int,
+        atlas: TextureAtlas,
+        mesh: np.ndarray
+    ) -> None:
+
+        self.meshes.put(self.key(dim, cx, cz, min_y, max_y, atlas), mesh)
+
+
+    def invalidate_chunks(
+        self,
+        dim: str,
+        chunks: List[Tuple[int, int]]
+    ) -> None:
+        """
+        Drops the meshes of the given chunks and of their neighbours, whose border faces depend on them
+        """
+
+        dim = dimension_name(dim)
+        touched = set()
+
+        for cx, cz in chunks:
+            touched.update([(cx, cz), (cx - 1, cz), (cx + 1, cz), (cx, cz - 1), (cx, cz + 1)])
+
+        for key, _mesh in self.meshes.items():
+
+            if key[0] == dim and (key[1], key[2]) in touched:
+                self.meshes.pop(key)
+
+
+    def clear(self) -> None:
+        self.meshes.clear()
\ No newline at end of file
@@ -1,10 +1,13 @@
+from typing import Optional, Dict, List, Tuple, Iterable
 from math import sqrt, sin, cos, pi
 import numpy as np
 
 from mconduit import Vec3d, Rot, Dimension
-from mconduit.world import CachedWorldReader
+from plugins.world_cache.world import MappedWorldReader
 
 from .atlas import TextureAtlas
+from .prefetch import ChunkPrefetcher
+from .mesh_cache import MeshCache
 
 
 FACES = {
@@ -38,38 +41,57 @@ def is_transparent(block_name: str) -> bool:
     return False
 
 
-def get_block_tint(
+TINT_COLORS = [
+    (1.0, 1.0, 1.0),
+    (121/255, 192/255, 90/255), # Grass
+    (72/255, 181/255, 76/255)   # Foliage
+]
+
+FACE_RECORD = np.dtype([
+    ("pos", "<i2", 3), # Relative to the render origin
+    ("face", "u1"),    # Index inside FACES
+    ("tint", "u1"),    # Index inside TINT_COLORS
+    ("tile", "<u2")    # Atlas tile
+])
+
+
+def get_tint_index(
     block_name: str,
     face: str
-) -> tuple[float, float, float]:
-    
-    r, g, b = 1.0, 1.0, 1.0
+) -> int:
     
     if block_name == "grass_block" and face == "top":
-        r, g, b = 121/255, 192/255, 90/255
+        return 1
 
     elif "leaves" in block_name:
-        r, g, b = 72/255, 181/255, 76/255
+        return 2
     
     elif block_name in ["grass", "tall_grass", "fern", "large_fern", "vine"]:
-        r, g, b = 121/255, 192/255, 90/255
+        return 1
         
-    return r, g, b
+    return 0
 
 
-def generate_mesh(
-    world_reader: CachedWorldReader,
+def get_block_tint(
+    block_name: str,
+    face: str
+) -> tuple[float, float, float]:
+    
+    return TINT_COLORS[get_tint_index(block_name, face)]
+
+
+def visible_chunks(
     pos: Vec3d,
     rot: Rot,
-    dim: Dimension,
-    atlas: TextureAtlas,
     render_distance: int = 132
-) -> np.ndarray:
+) -> List[Tuple[int, int]]:
+    """
+    Returns the coordinates of the chunks that can be seen from the given camera, nearest first
+    """
 
-    vertices = []
-    block_cache = {}
+    chunks = []
 
-    px, py, pz = int(pos.x), int(pos.y), int(pos.z)
+    px, pz = int(pos.x), int(pos.z)
     max_dist_squared = render_distance * render_distance
     rot = rot * pi / 180
     yaw, pitch = rot.yaw, rot.pitch
@@ -82,24 +104,6 @@ def generate_mesh(
     scz = (pz - render_distance) // 16
     ecz = (pz + render_distance) // 16
 
-    def get_block(x, y, z):
-
-        pos_tuple = (x, y, z)
-
-        if pos_tuple in block_cache:
-            return block_cache[pos_tuple]
-        
-        block = world_reader.get_block(Vec3d(x, y, z), dim)
-
-        if block is not None:
-            block = block["Name"].replace("minecraft:", "")
-        
-        block_cache[pos_tuple] = block
-
-        return block
-    
-    world_reader.clean_cache()
-
     for cx in range(scx, ecx + 1):
 
         for cz in range(scz, ecz + 1):
@@ -120,45 +124,335 @@ def generate_mesh(
             if dot < -0.3:
                 continue
 
-            min_y = max(-54, py - render_distance)
-            max_y = min(319, py + render_distance)
-
-            for x in range(cx * 16, (cx + 1) * 16):
-
-                for y in range(min_y, max_y):
-
-                    for z in range(cz * 16, (cz + 1) * 16):
-                
-                        block = world_reader.get_block(Vec3d(x, y, z))
-                        if not block: continue
-                
-                        name = block["Name"]
-                        if is_transparent(name): continue
-                
-                        name_clean = name.replace("minecraft:", "")
-
-                        for face_name, (verts, uv_corners, light, offset) in FACES.items():
-                            
-                            neighbor = get_block(x + offset[0], y + offset[1], z + offset[2])
-                    
-                            if not neighbor or is_transparent(neighbor):
-                                
-                                u0, v0, u1, v1 = atlas.get_uv(name_clean, face_name)
-                                tr, tg, tb = get_block_tint(name_clean, face_name)
-
-                                for idx in [0, 1, 2, 0, 2, 3]:
-                                    
-                                    vx, vy, vz = verts[idx]
-                                    uc, vc = uv_corners[idx]
-                                    
-                                    final_u = u0 if uc == 0 else u1
-                                    final_v = v0 if vc == 0 else v1
-                            
-                                    vertices.extend([
-                                        x + vx, y + vy, z + vz,
-                                        final_u, final_v,
-                                        light,
-                                        tr, tg, tb
-                                    ])
-
-    return np.array(vertices, dtype=np.float32)
\ No newline at end of file
+            chunks.append((cx, cz))
+
+    chunks.sort(key=lambda c: (c[0] * 16 + 8 - px) ** 2 + (c[1] * 16 + 8 - pz) ** 2)
+
+    return chunks
+
+
+def vertical_range(
+    pos: Vec3d,
+    render_distance: int = 132
+) -> Tuple[int, int]:
+    """
+    Returns the `(min_y, max_y)` interval of blocks that gets meshed
+    """
+
+    py = int(pos.y)
+
+    return max(-54, py - render_distance), min(319, py + render_distance)
+
+
+def generate_chunk_mesh(
+    world_reader: MappedWorldReader,
+    dim: Dimension,
+    cx: int,
+    cz: int,
+    min_y: int,
+    max_y: int,
+    atlas: TextureAtlas
+) -> np.ndarray:
+    """
+    Generates the vertices of a single chunk
+    """
+
+    volume, palette = read_chunk_volume(world_reader, dim, cx, cz, min_y, max_y)
+
+    return mesh_volume(volume, *mesh_tables(palette, atlas), (cx * 16, min_y, cz * 16))
+
+
+def read_chunk_volume(
+    world_reader: MappedWorldReader,
+    dim: Dimension,
+    cx: int,
+    cz: int,
+    min_y: int,
+    max_y: int
+) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """
+    Reads the blocks of a chunk, plus a 1 block border, into an `(x, y, z)` array of palette indices.
+
+    Index 0 of the returned palette is always `None` (unloaded), names are without namespace
+    """
+
+    volume, palette = world_reader.get_volume(
+        cx * 16 - 1, min_y - 1, cz * 16 - 1,
+        cx * 16 + 16, max_y, cz * 16 + 16,
+        dim
+    )
+
+    return volume, strip_namespace(palette)
+
+
+def strip_namespace(palette: Iterable[Optional[str]]) -> List[Optional[str]]:
+    """
+    Removes the `minecraft:` namespace from the block names of a palette
+    """
+
+    return [None if name is None else name.replace("minecraft:", "") for name in palette]
+
+
+def solid_table(palette: List[Optional[str]]) -> np.ndarray:
+    """
+    Returns, for every palette entry, whether it hides the faces of its neighbours
+    """
+
+    return np.array(
+        [name is not None and not is_transparent(name) for name in palette],
+        dtype=bool
+    )
+
+
+def exposed_faces(solid: np.ndarray) -> List[np.ndarray]:
+    """
+    Returns, for every face in FACES, the mask of the inner blocks of the `solid` volume showing that face
+    """
+
+    inner = solid[1:-1, 1:-1, 1:-1]
+    masks = []
+
+    for _verts, _uv_corners, _light, (ox, oy, oz) in FACES.values():
+
+        neighbor = solid[1 + ox:solid.shape[0] - 1 + ox, 1 + oy:solid.shape[1] - 1 + oy, 1 + oz:solid.shape[2] - 1 + oz]
+        masks.append(inner & ~neighbor)
+
+    return masks
+
+
+def mesh_tables(
+    palette: List[Optional[str]],
+    atlas: TextureAtlas
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the `(solid, uvs, tints)` lookup tables of a palette, indexed by `[palette_index, face]`
+    """
+
+    uvs = np.zeros((len(palette), len(FACES), 4), dtype=np.float32)
+    tints = np.ones((len(palette), len(FACES), 3), dtype=np.float32)
+
+    for i, name in enumerate(palette):
+
+        if name is None or is_transparent(name):
+            continue
+
+        for f, face_name in enumerate(FACES):
+            uvs[i, f] = atlas.get_uv(name, face_name)
+            tints[i, f] = get_block_tint(name, face_name)
+
+    return solid_table(palette), uvs, tints
+
+
+def mesh_volume(
+    volume: np.ndarray,
+    solid: np.ndarray,
+    uvs: np.ndarray,
+    tints: np.ndarray,
+    base: Tuple[int, int, int]
+) -> np.ndarray:
+    """
+    Generates the vertices of a volume read by `read_chunk_volume`, using the tables of `mesh_tables`.
+
+    `base` is the world position of the first inner block. Only works on arrays, so it can run in worker processes
+    """
+
+    ids = volume[1:-1, 1:-1, 1:-1]
+    vertices = []
+
+    for f, (mask, (verts, uv_corners, light, _offset)) in enumerate(zip(exposed_faces(solid[volume]), FACES.values())):
+
+        xs, ys, zs = np.nonzero(mask)
+        block_ids = ids[xs, ys, zs]
+
+        blocks = np.stack([xs, ys, zs], axis=1).astype(np.float32) + np.array(base, dtype=np.float32)
+        face_uvs = uvs[block_ids, f]
+
+        face = np.empty((len(xs), 6, 9), dtype=np.float32)
+
+        for k, idx in enumerate([0, 1, 2, 0, 2, 3]):
+
+            uc, vc = uv_corners[idx]
+
+            face[:, k, 0:3] = blocks + np.array(verts[idx], dtype=np.float32)
+            face[:, k, 3] = face_uvs[:, 0 if uc == 0 else 2]
+            face[:, k, 4] = face_uvs[:, 1 if vc == 0 else 3]
+            face[:, k, 5] = light
+            face[:, k, 6:9] = tints[block_ids, f]
+
+        vertices.append(face.reshape(-1))
+
+    return np.concatenate(vertices)
+
+
+def generate_chunk_faces(
+    world_reader: MappedWorldReader,
+    dim: Dimension,
+    cx: int,
+    cz: int,
+    min_y: int,
+    max_y: int,
+    atlas: TextureAtlas,
+    origin: Tuple[int, int, int]
+) -> np.ndarray:
+    """
+    Generates one FACE_RECORD for every exposed face of a chunk
+    """
+
+    volume, palette = read_chunk_volume(world_reader, dim, cx, cz, min_y, max_y)
+    ids = volume[1:-1, 1:-1, 1:-1]
+
+    tiles = np.zeros((len(palette), len(FACES)), dtype=np.uint16)
+    tints = np.zeros((len(palette), len(FACES)), dtype=np.uint8)
+
+    for i, name in enumerate(palette[1:], start=1):
+
+        if is_transparent(name):
+            continue
+
+        for f, face_name in enumerate(FACES):
+            tiles[i, f] = atlas.get_tile(name, face_name)
+            tints[i, f] = get_tint_index(name, face_name)
+
+    records = []
+    ox, oy, oz = origin
+
+    for f, mask in enumerate(exposed_faces(solid_table(palette)[volume])):
+
+        xs, ys, zs = np.nonzero(mask)
+        block_ids = ids[xs, ys, zs]
+
+        faces = np.empty(len(xs), dtype=FACE_RECORD)
+        faces["pos"][:, 0] = xs + (cx * 16 - ox)
+        faces["pos"][:, 1] = ys + (min_y - oy)
+        faces["pos"][:, 2] = zs + (cz * 16 - oz)
+        faces["face"] = f
+        faces["tint"] = tints[block_ids, f]
+        faces["tile"] = tiles[block_ids, f]
+
+        records.append(faces)
+
+    return np.concatenate(records)
+
+
+def generate_faces(
+    world_reader: MappedWorldReader,
+    pos: Vec3d,
+    rot: Rot,
+    dim: Dimension,
+    atlas: TextureAtlas,
+    render_distance: int = 132,
+    prefetcher: Optional[ChunkPrefetcher] = None
+) -> Tuple[np.ndarray, Tuple[int, int, int]]:
+    """
+    Generates the FACE_RECORDs of every visible chunk.
+
+    Returns the records together with the origin their positions are relative to
+    """
+
+    min_y, max_y = vertical_range(pos, render_distance)
+    origin = (int(pos.x) // 16 * 16, 0, int(pos.z) // 16 * 16)
+
+    world_reader.refresh()
+
+    faces = [
+        generate_chunk_faces(world_reader, dim, cx, cz, min_y, max_y, atlas, origin)
+        for cx, cz in read_chunks(world_reader, dim, visible_chunks(pos, rot, render_distance), prefetcher)
+    ]
+
+    if len(faces) == 0:
+        return np.array([], dtype=FACE_RECORD), origin
+
+    return np.concatenate(faces), origin
+
+
+def read_chunks(
+    world_reader: MappedWorldReader,
+    dim: Dimension,
+    chunks: List[Tuple[int, int]],
+    prefetcher: Optional[ChunkPrefetcher] = None
+) -> Iterable[Tuple[int, int]]:
+    """
+    Returns the chunks to mesh, loaded in background by the `prefetcher` if given
+    """
+
+    if prefetcher is None:
+        return chunks
+
+    return prefetcher.iterate(world_reader, dim, chunks)
+
+
+def generate_chunk_meshes(
+    world_reader: MappedWorldReader,
+    pos: Vec3d,
+    rot: Rot,
+    dim: Dimension,
+    atlas: TextureAtlas,
+    render_distance: int = 132,
+    prefetcher: Optional[ChunkPrefetcher] = None,
+    mesh_cache: Optional[MeshCache] = None
+) -> Dict[Tuple[int, int], np.ndarray]:
+    """
+    Generates the vertices of every visible chunk, keyed by chunk coordinates.
+
+    Chunks found in `mesh_cache` aren't read nor meshed again
+    """
+
+    min_y, max_y = vertical_range(pos, render_distance)
+    chunks = visible_chunks(pos, rot, render_distance)
+    meshes = cached_meshes(mesh_cache, dim, chunks, min_y, max_y, atlas)
+
+    world_reader.refresh()
+
+    for cx, cz in read_chunks(world_reader, dim, [c for c in chunks if c not in meshes], prefetcher):
+
+        meshes[(cx, cz)] = generate_chunk_mesh(world_reader, dim, cx, cz, min_y, max_y, atlas)
+
+        if mesh_cache is not None:
+            mesh_cache.put(dim, cx, cz, min_y, max_y, atlas, meshes[(cx, cz)])
+
+    return {chunk: meshes[chunk] for chunk in chunks}
+
+
+def cached_meshes(
+    mesh_cache: Optional[MeshCache],
+    dim: Dimension,
+    chunks: List[Tuple[int, int]],
+    min_y: int,
+    max_y: int,
+    atlas: TextureAtlas
+) -> Dict[Tuple[int, int], np.ndarray]:
+    """
+    Returns the meshes of the given chunks that are still in `mesh_cache`
+    """
+
+    meshes = {}
+
+    if mesh_cache is None:
+        return meshes
+
+    for cx, cz in chunks:
+
+        mesh = mesh_cache.get(dim, cx, cz, min_y, max_y, atlas)
+
+        if mesh is not None:
+            meshes[(cx, cz)] = mesh
+
+    return meshes
+
+
+def generate_mesh(
+    world_reader: MappedWorldReader,
+    pos: Vec3d,
+    rot: Rot,
+    dim: Dimension,
+    atlas: TextureAtlas,
+    render_distance: int = 132,
+    prefetcher: Optional[ChunkPrefetcher] = None
+) -> np.ndarray:
+
+    meshes = generate_chunk_meshes(world_reader, pos, rot, dim, atlas, render_distance, prefetcher)
+
+    if len(meshes) == 0:
+        return np.array([], dtype=np.float32)
+
+    return np.concatenate(list(meshes.values()))
\ No newline at end of file
@@ -0,0 +1,174 @@
+from typing import Optional, Dict, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import os
+
+from mconduit import Vec3d, Rot, Dimension
+from plugins.world_cache.world import MappedWorldReader
+from plugins.world_cache.shared import SharedVolumes, VolumeDescriptor, attach_volume
+
+from .atlas import TextureAtlas
+from .prefetch import ChunkPrefetcher
+from .mesher import (
+    visible_chunks,
+    read_chunks,
+    vertical_range,
+    strip_namespace,
+    cached_meshes,
+    mesh_tables,
+    mesh_volume
+)
+from .mesh_cache import MeshCache
+
+
+def _mesh_chunk(
+    descriptor: VolumeDescriptor,
+    solid: np.ndarray,
+    uvs: np.ndarray,
+    tints: np.ndarray,
+    base: Tuple[int, int, int]
+) -> Tuple[Optional[str], int]:
+    """
+    Worker side: meshes the described volume in place.
+
+    Returns the name of the shared memory holding the vertices and their count
+    """
+
+    with attach_volume(descriptor) as volume:
+        vertices = mesh_volume(volume, solid, uvs, tints, base)
+
+    if len(vertices) == 0:
+        return None, 0
+
+    out = SharedMemory(create=True, size=vertices.nbytes)
+    np.ndarray(vertices.shape, dtype=np.float32, buffer=out.buf)[:] = vertices
+    out.close()
+
+    return out.name, len(vertices)
+
+
+def _collect(name: Optional[str], count: int) -> np.ndarray:
+    """
+    Copies the vertices produced by a worker out of its shared memory and frees it
+    """
+
+    if name is None:
+        return np.array([], dtype=np.float32)
+
+    shm = SharedMemory(name=name)
+
+    try:
+        vertices = np.ndarray((count,), dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return vertices
+
+
+class ParallelMesher:
+    """
+    Spreads the meshing of the chunks across a persistent pool of worker processes.
+
+    The chunks are read straight into `SharedVolumes` that the workers attach to, and the vertices are
+    handed back through shared memory, so nothing bigger than the lookup tables gets pickled
+    """
+
+
+    workers: int
+    __pool: Optional[ProcessPoolExecutor]
+
+
+    def __init__(self, workers: int = 0) -> "ParallelMesher":
+
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.__pool = None
+
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+
+        if self.__pool is None:
+            self.__pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        return self.__pool
+
+
+    def release(self) -> None:
+        """
+        Stops the worker processes
+        """
+
+        if self.__pool is not None:
+            self.__pool.shutdown(cancel_futures=True)
+            self.__pool = None
+
+
+    def generate_chunk_meshes(
+        self,
+        world_reader: MappedWorldReader,
+        pos: Vec3d,
+        rot: Rot,
+        dim: Dimension,
+        atlas: TextureAtlas,
+        render_distance: int = 132,
+        prefetcher: Optional[ChunkPrefetcher] = None,
+        mesh_cache: Optional[MeshCache] = None
+    ) -> Dict[Tuple[int, int], np.ndarray]:
+        """
+        Same as `mesher.generate_chunk_meshes`, but the chunks are meshed by the worker processes
+        while the next ones are being read
+        """
+
+        min_y, max_y = vertical_range(pos, render_distance)
+        chunks = visible_chunks(pos, rot, render_distance)
+        cached = cached_meshes(mesh_cache, dim, chunks, min_y, max_y, atlas)
+        missing = [chunk for chunk in chunks if chunk not in cached]
+
+        world_reader.refresh()
+
+        if len(missing) == 0:
+            return {chunk: cached[chunk] for chunk in chunks}
+
+        pool = self._get_pool()
+        futures = {}
+        meshes = {}
+
+        with SharedVolumes(len(missing), (18, max_y - min_y + 2, 18)) as volumes:
+
+            try:
+
+                for i, (cx, cz) in enumerate(read_chunks(world_reader, dim, missing, prefetcher)):
+
+                    # The border block around the chunk hides the faces between chunks
+                    descriptor = volumes.read(world_reader, dim, i, (cx * 16 - 1, min_y - 1, cz * 16 - 1))
+
+                    futures[(cx, cz)] = pool.submit(
+                        _mesh_chunk,
+                        descriptor,
+                        *mesh_tables(strip_namespace(descriptor.palette), atlas),
+                        (cx * 16, min_y, cz * 16)
+                    )
+
+                for key, future in futures.items():
+
+                    meshes[key] = _collect(*future.result())
+
+                    if mesh_cache is not None:
+                        mesh_cache.put(dim, *key, min_y, max_y, atlas, meshes[key])
+
+                return {chunk: cached[chunk] if chunk in cached else meshes[chunk] for chunk in chunks}
+
+            finally:
+
+                for key, future in futures.items():
+
+                    if key in meshes:
+                        continue
+
+                    # Frees the outputs left behind when something failed halfway,
+                    # the workers are done with the volumes once their futures are
+                    try:
+                        _collect(*future.result())
+                    except Exception:
+                        pass
\ No newline at end of file
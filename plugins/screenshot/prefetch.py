@@ -0,0 +1,93 @@
+from typing import Optional, Iterator, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future
+from collections import deque
+
+from mconduit import Dimension
+from plugins.world_cache.world import MappedWorldReader
+
+
+class ChunkPrefetcher:
+    """
+    Loads and decodes chunks on background I/O threads, ahead of the mesher.
+
+    Reading the region files and decompressing the chunks mostly releases the GIL,
+    so it overlaps with the meshing of the chunks that are already loaded
+    """
+
+
+    workers: int
+    read_ahead: int
+    __pool: Optional[ThreadPoolExecutor]
+
+
+    def __init__(
+        self,
+        workers: int = 4,
+        read_ahead: int = 32
+    ) -> "ChunkPrefetcher":
+
+        self.workers = workers
+        self.read_ahead = read_ahead
+        self.__pool = None
+
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+
+        if self.__pool is None:
+            self.__pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="chunk-prefetch")
+
+        return self.__pool
+
+
+    def release(self) -> None:
+        """
+        Stops the I/O threads
+        """
+
+        if self.__pool is not None:
+            self.__pool.shutdown(cancel_futures=True)
+            self.__pool = None
+
+
+    def iterate(
+        self,
+        world_reader: MappedWorldReader,
+        dim: Dimension,
+        chunks: List[Tuple[int, int]]
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        Yields the given chunk coordinates in order, each one once its chunk is loaded in the reader cache.
+
+        At most `read_ahead` chunks are loaded ahead of the consumer
+        """
+
+        pool = self._get_pool()
+        pending: deque[Tuple[Tuple[int, int], Future]] = deque()
+        chunks = iter(chunks)
+
+        def submit_next() -> None:
+
+            chunk = next(chunks, None)
+
+            if chunk is not None:
+                pending.append((chunk, pool.submit(world_reader.get_chunk, *chunk, dim)))
+
+        for _ in range(self.read_ahead):
+            submit_next()
+
+        try:
+
+            while pending:
+
+                chunk, future = pending.popleft()
+                submit_next()
+
+                # A chunk that failed to load is read again, and reported, by the mesher
+                future.exception()
+
+                yield chunk
+
+        finally:
+
+            for _chunk, future in pending:
+                future.cancel()
\ No newline at end of file
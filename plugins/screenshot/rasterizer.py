@@ -0,0 +1,273 @@
+from typing import Tuple
+from PIL import Image
+import numpy as np
+
+from .gpu_scene import VERTEX_FLOATS
+
+
+class SoftwareRasterizer:
+    """
+    Pure NumPy fallback of the OpenGL renderer, used on hosts where no GL context can be created.
+
+    It consumes the same vertices produced by `mesher.generate_mesh` and reproduces the
+    fragment shader: nearest texture sampling, alpha discard, face light, tint and linear fog.
+    Triangles are rasterized in vectorized batches against a z-buffer.
+
+    Like the GPU, triangles crossing the near plane are clipped against it in clip space
+    """
+
+
+    batch_fragments: int
+
+
+    def __init__(self, batch_fragments: int = 2_000_000) -> "SoftwareRasterizer":
+
+        self.batch_fragments = batch_fragments
+
+
+    def render(
+        self,
+        mesh: np.ndarray,
+        atlas_image: Image.Image,
+        proj: np.ndarray,
+        view: np.ndarray,
+        width: int,
+        height: int,
+        fog_color: Tuple[float, float, float],
+        max_distance: float
+    ) -> Image.Image:
+        """
+        Renders the mesh with the given (OpenGL layout) matrices and returns the picture
+        """
+
+        color = np.empty((height, width, 4), dtype=np.float32)
+        color[:, :] = (*fog_color, 1.0)
+        depth = np.full(height * width, np.inf, dtype=np.float32)
+
+        vertices = mesh.reshape(-1, VERTEX_FLOATS)
+
+        if len(vertices) >= 3:
+
+            atlas = np.asarray(atlas_image.convert("RGBA"), dtype=np.float32) / 255
+            triangles = self._project(vertices, proj, view, width, height)
+
+            for batch in self._batches(triangles):
+                self._rasterize(batch, atlas, color, depth, width, fog_color, max_distance)
+
+        pixels = np.clip(np.round(color * 255), 0, 255).astype(np.uint8)
+
+        return Image.fromarray(pixels, "RGBA")
+
+
+    def _project(
+        self,
+        vertices: np.ndarray,
+        proj: np.ndarray,
+        view: np.ndarray,
+        width: int,
+        height: int
+    ) -> dict:
+        """
+        Transforms the vertices to screen space and drops the triangles that can't be seen
+        """
+
+        positions = np.concatenate([vertices[:, :3], np.ones((len(vertices), 1), np.float32)], axis=1)
+
+        # The matrices are laid out for OpenGL, so they multiply row vectors
+        eye = positions @ view
+        clip = eye @ proj
+
+        # uv, light, tint and fog distance, interpolated linearly in clip space like the shader outputs
+        attributes = vertices[:, 3:].reshape(-1, 3, VERTEX_FLOATS - 3)
+        distance = np.linalg.norm(eye[:, :3], axis=1).reshape(-1, 3)
+        attributes = np.concatenate([attributes, distance[:, :, None]], axis=2)
+
+        clip, attributes = self._clip_near(clip.reshape(-1, 3, 4), attributes)
+
+        w = clip[:, :, 3]
+        visible = np.all(w > 1e-5, axis=1)
+        w = np.where(w > 1e-5, w, 1.0)
+
+        ndc = clip[:, :, :3] / w[:, :, None]
+
+        sx = (ndc[:, :, 0] + 1) * 0.5 * width
+        sy = (1 - ndc[:, :, 1]) * 0.5 * height
+        sz = ndc[:, :, 2]
+
+        # Back-face culling: front faces are counter-clockwise in NDC
+        area = (
+            (ndc[:, 1, 0] - ndc[:, 0, 0]) * (ndc[:, 2, 1] - ndc[:, 0, 1]) -
+            (ndc[:, 2, 0] - ndc[:, 0, 0]) * (ndc[:, 1, 1] - ndc[:, 0, 1])
+        )
+        visible &= area > 0
+
+        visible &= ~np.all(sz > 1, axis=1) & ~np.all(sz < -1, axis=1)
+
+        x_min = np.maximum(np.ceil(sx.min(axis=1) - 0.5), 0)
+        x_max = np.minimum(np.floor(sx.max(axis=1) - 0.5), width - 1)
+        y_min = np.maximum(np.ceil(sy.min(axis=1) - 0.5), 0)
+        y_max = np.minimum(np.floor(sy.max(axis=1) - 0.5), height - 1)
+
+        visible &= (x_min <= x_max) & (y_min <= y_max)
+
+        inv_w = 1 / w
+
+        return {
+            "sx": sx[visible],
+            "sy": sy[visible],
+            "sz": sz[visible],
+            "inv_w": inv_w[visible],
+            # Pre-divided by w for perspective correct interpolation
+            "attributes": attributes[visible] * inv_w[visible][:, :, None],
+            "x_min": x_min[visible].astype(np.int64),
+            "y_min": y_min[visible].astype(np.int64),
+            "width": (x_max - x_min + 1)[visible].astype(np.int64),
+            "height": (y_max - y_min + 1)[visible].astype(np.int64)
+        }
+
+
+    def _clip_near(
+        self,
+        clip: np.ndarray,
+        attributes: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Clips the (n, 3, 4) clip space triangles against the near plane `z = -w`, with their (n, 3, k) attributes.
+
+        A triangle with one vertex in front of the plane becomes a smaller triangle, one with two becomes
+        a quad split in two triangles. The winding is kept, so back-face culling still works afterwards
+        """
+
+        distances = clip[:, :, 2] + clip[:, :, 3]
+        inside = distances >= 0
+        count = inside.sum(axis=1)
+
+        if np.all(count == 3):
+            return clip, attributes
+
+        vertices = np.concatenate([clip, attributes], axis=2)
+
+        # Rotates every clipped triangle so that its odd vertex (alone on its side of the plane) comes first
+        one, two = count == 1, count == 2
+        odd = np.where(one, np.argmax(inside, axis=1), np.argmin(inside, axis=1))
+        order = (odd[:, None] + np.arange(3)[None, :]) % 3
+
+        rotated = np.take_along_axis(vertices, order[:, :, None], axis=1)
+        d = np.take_along_axis(distances, order, axis=1)
+
+        a, b, c = rotated[:, 0], rotated[:, 1], rotated[:, 2]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_ab = (d[:, 0] / (d[:, 0] - d[:, 1]))[:, None]
+            t_ac = (d[:, 0] / (d[:, 0] - d[:, 2]))[:, None]
+
+        ab = a + (b - a) * t_ab
+        ac = a + (c - a) * t_ac
+
+        result = np.concatenate([
+            vertices[count == 3],
+            # Only `a` is in front: a, ab, ac
+            np.stack([a, ab, ac], axis=1)[one],
+            # Only `a` is behind: the quad ab, b, c, ac
+            np.stack([ab, b, c], axis=1)[two],
+            np.stack([ab, c, ac], axis=1)[two]
+        ])
+
+        return result[:, :, :4], result[:, :, 4:]
+
+
+    def _batches(self, triangles: dict):
+        """
+        Splits the triangles in batches covering about `batch_fragments` candidate pixels each
+        """
+
+        fragments = np.cumsum(triangles["width"] * triangles["height"])
+        start = 0
+
+        while start < len(fragments):
+
+            offset = fragments[start - 1] if start > 0 else 0
+            end = int(np.searchsorted(fragments, offset + self.batch_fragments, side="right"))
+            end = max(end, start + 1)
+
+            yield {key: value[start:end] for key, value in triangles.items()}
+
+            start = end
+
+
+    def _rasterize(
+        self,
+        batch: dict,
+        atlas: np.ndarray,
+        color: np.ndarray,
+        depth: np.ndarray,
+        width: int,
+        fog_color: Tuple[float, float, float],
+        max_distance: float
+    ) -> None:
+        """
+        Rasterizes a batch of triangles into the color and depth buffers
+        """
+
+        counts = batch["width"] * batch["height"]
+        tri = np.repeat(np.arange(len(counts)), counts)
+        local = np.arange(len(tri)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        fx = batch["x_min"][tri] + local % batch["width"][tri]
+        fy = batch["y_min"][tri] + local // batch["width"][tri]
+        px = fx + 0.5
+        py = fy + 0.5
+
+        sx, sy = batch["sx"][tri], batch["sy"][tri]
+
+        den = (sy[:, 1] - sy[:, 2]) * (sx[:, 0] - sx[:, 2]) + (sx[:, 2] - sx[:, 1]) * (sy[:, 0] - sy[:, 2])
+        den = np.where(den == 0, 1e-12, den)
+
+        l0 = ((sy[:, 1] - sy[:, 2]) * (px - sx[:, 2]) + (sx[:, 2] - sx[:, 1]) * (py - sy[:, 2])) / den
+        l1 = ((sy[:, 2] - sy[:, 0]) * (px - sx[:, 2]) + (sx[:, 0] - sx[:, 2]) * (py - sy[:, 2])) / den
+        l2 = 1 - l0 - l1
+
+        bary = np.stack([l0, l1, l2], axis=1)
+        z = np.einsum("ij,ij->i", bary, batch["sz"][tri])
+
+        inside = np.all(bary >= 0, axis=1) & (z >= -1) & (z <= 1)
+
+        tri, fx, fy, bary, z = tri[inside], fx[inside], fy[inside], bary[inside], z[inside]
+
+        inv_w = np.einsum("ij,ij->i", bary, batch["inv_w"][tri])
+        attributes = np.einsum("ij,ijk->ik", bary, batch["attributes"][tri]) / inv_w[:, None]
+
+        uv = attributes[:, 0:2]
+        light = attributes[:, 2]
+        tint = attributes[:, 3:6]
+        distance = attributes[:, 6]
+
+        size_y, size_x = atlas.shape[:2]
+        tx = np.clip(np.floor(uv[:, 0] * size_x).astype(np.int64), 0, size_x - 1)
+        ty = np.clip(np.floor(uv[:, 1] * size_y).astype(np.int64), 0, size_y - 1)
+        texel = atlas[ty, tx]
+
+        # Discarded fragments don't write the depth buffer
+        kept = texel[:, 3] >= 0.1
+
+        pixel = (fy * width + fx)[kept]
+        z = z[kept]
+
+        # Nearest fragment of this batch for every pixel, then test it against the z-buffer
+        order = np.lexsort((z, pixel))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = pixel[order][1:] != pixel[order][:-1]
+        winners = order[first]
+        winners = winners[z[winners] < depth[pixel[winners]]]
+
+        depth[pixel[winners]] = z[winners]
+
+        texel = texel[kept][winners]
+        shade = texel[:, :3] * light[kept][winners, None] * tint[kept][winners]
+
+        fog = np.clip(distance[kept][winners] / max_distance, 0, 1)[:, None]
+        shade = shade * (1 - fog) + np.array(fog_color, dtype=np.float32) * fog
+
+        flat = color.reshape(-1, 4)
+        flat[pixel[winners], :3] = shade
+        flat[pixel[winners], 3] = texel[:, 3]
\ No newline at end of file
@@ -1,9 +1,11 @@
-from typing import Tuple
+from typing import Optional, Tuple
 from math import floor
 import numpy as np
 import nbtlib
 
-from mconduit import Vec3d
+from mconduit import Vec3d, Dimension
+
+from .brickmap import BrickMap, BRICK_SIZE
 
 
 def is_renderable(
@@ -25,12 +27,32 @@ def is_renderable(
     return True
 
 
+def _exit_face(axis: int, step: int) -> str:
+
+    if axis == 0:
+        return "west" if step > 0 else "east"
+
+    elif axis == 1:
+        return "bottom" if step > 0 else "top"
+
+    return "north" if step > 0 else "south"
+
+
 def raycast(
     world_reader: object,
     origin: Vec3d,
     direction: np.ndarray,
-    max_distance: int = 200
+    max_distance: int = 200,
+    brick_map: Optional[BrickMap] = None,
+    dim: Dimension = Dimension.Overworld
 ) -> Tuple[Vec3d, nbtlib.tag.Base, str, float] | None:
+    """
+    Walks the ray block by block through `dim` and returns the first renderable block hit.
+
+    When a `brick_map` is given, its empty bricks are crossed in a single jump
+    """
+
+    start = np.array(origin.as_tuple(), dtype=float)
 
     pos = np.array(
         [floor(i) for i in origin.as_tuple()],
@@ -46,7 +68,7 @@ def raycast(
         if direction[i] != 0:
 
             next_boundary = pos[i] + (step[i] > 0)
-            t_max[i] = (next_boundary - pos[i]) / direction[i]
+            t_max[i] = (next_boundary - start[i]) / direction[i]
             t_delta[i] = abs(1 / direction[i])
         else:
             t_max[i] = float("inf")
@@ -57,8 +79,32 @@ def raycast(
 
     while distance < max_distance:
 
+        if brick_map is not None and brick_map.is_empty_at(*pos, dim):
+
+            # Jumps straight to the block where the ray leaves the brick
+            brick_start = pos // BRICK_SIZE * BRICK_SIZE
+
+            with np.errstate(divide="ignore"):
+                bounds = np.where(step > 0, brick_start + BRICK_SIZE, brick_start)
+                t_exit = np.where(step != 0, (bounds - start) / direction, float("inf"))
+
+            axis = int(np.argmin(t_exit))
+            distance = max(distance, t_exit[axis])
+
+            hit = np.floor(start + direction * distance).astype(int)
+            pos = np.clip(hit, brick_start, brick_start + BRICK_SIZE - 1)
+            pos[axis] = bounds[axis] if step[axis] > 0 else bounds[axis] - 1
+
+            for i in range(3):
+
+                if step[i] != 0:
+                    t_max[i] = (pos[i] + (step[i] > 0) - start[i]) / direction[i]
+
+            face = _exit_face(axis, step[axis])
+            continue
+
         p = Vec3d(*pos)
-        block = world_reader.get_block(p)
+        block = world_reader.get_block(p, dim)
 
 
         if block and is_renderable(block["Name"].replace("minecraft:", "")):
@@ -69,11 +115,4 @@ def raycast(
         t_max[axis] += t_delta[axis]
         pos[axis] += step[axis]
 
-        if axis == 0:
-            face = "west" if step[axis] > 0 else "east"
-
-        elif axis == 1:
-            face = "bottom" if step[axis] > 0 else "top"
-
-        else:
-            face = "north" if step[axis] > 0 else "south"
\ No newline at end of file
+        face = _exit_face(axis, step[axis])
\ No newline at end of file
@@ -1,28 +1,61 @@
-import moderngl
+from typing import Optional, Dict, Tuple, Union
 from pathlib import Path
+import numpy as np
+import moderngl
 from PIL import Image
+import logging
 
 from mconduit import Vec3d, Rot, Dimension, Server
-from mconduit.world import CachedWorldReader
+from plugins.world_cache.world import MappedWorldReader
 
 from .camera import Camera
 from .texture_manager import TextureManager
 from .atlas import TextureAtlas
-from .mesher import generate_mesh
+from .mesher import generate_chunk_meshes, generate_faces
+from .instanced import InstancedFaces
+from .rasterizer import SoftwareRasterizer
+from .gpu_scene import GpuScene
+from .parallel_mesher import ParallelMesher
+from .prefetch import ChunkPrefetcher
+from .mesh_cache import MeshCache
 from .fog import get_fog_color
 
 
+logger = logging.getLogger(__name__)
+
+
 class Renderer:
 
     def __init__(
         self,
         server: Server,
-        base_path: Path
+        base_path: Path,
+        world_reader: MappedWorldReader,
+        gpu_budget: int = 128 * 1024 * 1024,
+        mesh_workers: int = 1
     ) -> "Renderer":
+        """
+        `world_reader` is the reader shared by the world_cache plugin.
+
+        `mesh_workers` is the number of processes meshing the chunks:
+        1 meshes on the caller's thread, 0 uses one process per core
+        """
         
         self.server = server
-        self.world_reader = CachedWorldReader(server)
+        self.world_reader = world_reader
         self.texture_manager = TextureManager(base_path)
+        self.gpu_budget = gpu_budget
+        self.parallel_mesher = ParallelMesher(mesh_workers) if mesh_workers != 1 else None
+        self.prefetcher = ChunkPrefetcher()
+        self.mesh_cache = MeshCache()
+
+        self.__ctx = None
+        self.__program = None
+        self.__scene = None
+        self.__instanced = None
+        self.__software = None
+        self.__atlases = {}
+        self.__atlas_textures = {}
         
         self.vertex_shader = """
             #version 330
@@ -76,6 +109,97 @@ class Renderer:
             }
         """
 
+    def _get_context(self) -> Optional[moderngl.Context]:
+        """
+        Returns the OpenGL context, creating it on first use.
+
+        The context is kept alive between renders so that the chunk meshes can stay on the GPU.
+        Returns None when no context can be created, in which case the software rasterizer is used
+        """
+
+        if self.__software is not None:
+            return None
+
+        if self.__ctx is None:
+
+            try:
+                self.__ctx = moderngl.create_standalone_context()
+
+            except Exception as e:
+                logger.warning("Could not create an OpenGL context, using the software rasterizer: %s", e)
+                self.__software = SoftwareRasterizer()
+                return None
+
+            self.__program = self.__ctx.program(vertex_shader=self.vertex_shader, fragment_shader=self.fragment_shader)
+            self.__scene = GpuScene(self.__ctx, self.__program, self.gpu_budget)
+            self.__instanced = InstancedFaces(self.__ctx, self.fragment_shader)
+
+        return self.__ctx
+
+
+    def _get_atlas(self, texture: str) -> TextureAtlas:
+        """
+        Returns the atlas of the given texture pack.
+
+        Atlases are kept between renders, so that the UVs of the resident meshes stay valid
+        """
+
+        if texture not in self.__atlases:
+            self.__atlases[texture] = TextureAtlas(self.texture_manager)
+
+        return self.__atlases[texture]
+
+
+    def _get_atlas_texture(
+        self,
+        texture: str,
+        atlas: TextureAtlas
+    ) -> moderngl.Texture:
+        """
+        Returns the GPU copy of the atlas, uploading it again only when new tiles were added
+        """
+
+        tex, tiles = self.__atlas_textures.get(texture, (None, -1))
+
+        if tex is None:
+
+            tex = self.__ctx.texture((atlas.size, atlas.size), 4)
+            tex.filter = (moderngl.NEAREST, moderngl.NEAREST)
+
+        if tiles != atlas.current_index:
+            tex.write(atlas.image.tobytes())
+
+        self.__atlas_textures[texture] = (tex, atlas.current_index)
+
+        return tex
+
+
+    def release(self) -> None:
+        """
+        Frees the OpenGL context, everything that is resident on the GPU, the meshing workers and the I/O threads
+        """
+
+        if self.parallel_mesher is not None:
+            self.parallel_mesher.release()
+
+        self.prefetcher.release()
+        self.mesh_cache.clear()
+
+        if self.__ctx is None:
+            return
+
+        for tex, _tiles in self.__atlas_textures.values():
+            tex.release()
+
+        self.__scene.release()
+        self.__instanced.release()
+        self.__program.release()
+        self.__ctx.release()
+
+        self.__atlas_textures = {}
+        self.__ctx = None
+
+
     def generate_picture(
         self,
         pos: Vec3d,
@@ -85,18 +209,86 @@ class Renderer:
         max_distance: int,
         texture: str,
         width: int,
-        height: int
+        height: int,
+        instanced: bool = False
     ) -> Image:
+        """
+        Renders the picture seen from the given camera.
+
+        If `instanced` is True, the exposed faces are drawn through the instanced path
+        instead of the resident chunk meshes (only when an OpenGL context is available)
+        """
         
         width, height = int(width), int(height)
         fov, max_distance = float(fov), int(max_distance)
 
         self.texture_manager.load_texture_pack(texture)
-        atlas = TextureAtlas(self.texture_manager)
-        mesh_data = generate_mesh(self.world_reader, pos, rot, dim, atlas, render_distance=max_distance)
+        atlas = self._get_atlas(texture)
+        ctx = self._get_context()
+
+        if ctx is None:
+            instanced = False
+
+        if instanced:
+            geometry = generate_faces(self.world_reader, pos, rot, dim, atlas, render_distance=max_distance, prefetcher=self.prefetcher)
+        elif self.parallel_mesher is not None:
+            geometry = self.parallel_mesher.generate_chunk_meshes(self.world_reader, pos, rot, dim, atlas, render_distance=max_distance, prefetcher=self.prefetcher, mesh_cache=self.mesh_cache)
+        else:
+            geometry = generate_chunk_meshes(self.world_reader, pos, rot, dim, atlas, render_distance=max_distance, prefetcher=self.prefetcher, mesh_cache=self.mesh_cache)
+
+        if ctx is None:
+            return self._draw_software(geometry, pos, rot, dim, fov, max_distance, atlas, width, height)
+
+        with ctx:
+            return self._draw(ctx, geometry, instanced, pos, rot, dim, fov, max_distance, texture, atlas, width, height)
+
+
+    def _draw_software(
+        self,
+        meshes: Dict[Tuple[int, int], np.ndarray],
+        pos: Vec3d,
+        rot: Rot,
+        dim: Dimension,
+        fov: float,
+        max_distance: int,
+        atlas: TextureAtlas,
+        width: int,
+        height: int
+    ) -> Image:
+
+        fog_c = get_fog_color(dim)
+        camera = Camera(pos.x, pos.y, pos.z, rot.yaw, rot.pitch, fov)
+        mesh = np.concatenate([np.array([], dtype=np.float32), *meshes.values()])
+
+        return self.__software.render(
+            mesh,
+            atlas.image,
+            camera.get_projection_matrix(width, height),
+            camera.get_view_matrix(),
+            width,
+            height,
+            (fog_c[0]/255, fog_c[1]/255, fog_c[2]/255),
+            max_distance
+        )
 
-        ctx = moderngl.create_standalone_context()
-        prog = ctx.program(vertex_shader=self.vertex_shader, fragment_shader=self.fragment_shader)
+
+    def _draw(
+        self,
+        ctx: moderngl.Context,
+        geometry: Union[Dict[Tuple[int, int], np.ndarray], Tuple[np.ndarray, Tuple[int, int, int]]],
+        instanced: bool,
+        pos: Vec3d,
+        rot: Rot,
+        dim: Dimension,
+        fov: float,
+        max_distance: int,
+        texture: str,
+        atlas: TextureAtlas,
+        width: int,
+        height: int
+    ) -> Image:
+
+        prog = self.__program
 
         color_tex = ctx.texture((width, height), 4)
         depth_tex = ctx.depth_texture((width, height))
@@ -112,28 +304,32 @@ class Renderer:
         fog_c = get_fog_color(dim)
         bg_color = (fog_c[0]/255, fog_c[1]/255, fog_c[2]/255, 1.0)
         fbo.clear(*bg_color)
+
+        camera = Camera(pos.x, pos.y, pos.z, rot.yaw, rot.pitch, fov)
+        proj = camera.get_projection_matrix(width, height)
+        view = camera.get_view_matrix()
         
-        if len(mesh_data) > 0:
+        if instanced:
+
+            faces, origin = geometry
+
+            if len(faces) > 0:
 
-            camera = Camera(pos.x, pos.y, pos.z, rot.yaw, rot.pitch, fov)
+                self._get_atlas_texture(texture, atlas).use()
+                self.__instanced.render(faces, origin, atlas, proj, view, bg_color[:3], max_distance)
+
+        elif any(len(mesh) > 0 for mesh in geometry.values()):
             
-            prog['proj'].write(camera.get_projection_matrix(width, height).tobytes())
-            prog['view'].write(camera.get_view_matrix().tobytes())
+            prog['proj'].write(proj.tobytes())
+            prog['view'].write(view.tobytes())
             prog['fogColor'].value = (bg_color[0], bg_color[1], bg_color[2])
             prog['maxDist'].value = max_distance
             
-            tex = ctx.texture((atlas.size, atlas.size), 4, atlas.image.tobytes())
-            tex.filter = (moderngl.NEAREST, moderngl.NEAREST)
-            tex.use()
+            self._get_atlas_texture(texture, atlas).use()
 
-            vbo = ctx.buffer(mesh_data.tobytes())
-            vao = ctx.vertex_array(prog,[(vbo, '3f 2f 1f 3f', 'in_position', 'in_uv', 'in_light', 'in_tint')])
-            
-            vao.render(moderngl.TRIANGLES)
-
-            vao.release()
-            vbo.release()
-            tex.release()
+            self.__scene.render(
+                ((dim, texture, cx, cz), mesh) for (cx, cz), mesh in geometry.items()
+            )
 
         img_data = fbo.read(components=4)
         img = Image.frombytes('RGBA', (width, height), img_data)
@@ -142,7 +338,5 @@ class Renderer:
         fbo.release()
         color_tex.release()
         depth_tex.release()
-        prog.release()
-        ctx.release()
         
         return img
\ No newline at end of file
@@ -1,10 +1,15 @@
+from typing import Dict, Optional
 from pathlib import Path
 from PIL import Image
 
 from mconduit import Vec3d, Rot, Dimension, Server
 from mconduit.world import WorldReader, Region, Chunk, Block
+from plugins.world_cache.lru import LRUCache
+from plugins.world_cache.changes import RegionChangeFeed
+from plugins.world_cache.world import dimension_name
 
-from .ray import raycast
+from .ray import raycast, is_renderable
+from .brickmap import BrickMap
 from .camera import Camera
 from .lighting import apply_lighting
 from .fog import apply_fog, get_fog_color
@@ -12,66 +17,82 @@ from .texture_manager import TextureManager
 
 
 class CachedWorldReader(WorldReader):
+    """
+    WorldReader keeping the recently used regions, chunks and blocks of every dimension in memory,
+    each cache bounded by its own byte budget
+    """
 
 
     def __init__(
         self,
-        server: Server
+        server: Server,
+        region_budget: int = 32 * 1024 * 1024,
+        chunk_budget: int = 192 * 1024 * 1024,
+        block_budget: int = 32 * 1024 * 1024
     ) -> "CachedWorldReader":
 
         super().__init__(server)
 
-        self.__region_cache = {}
-        self.__chunk_cache = {}
-        self.__block_cache = {}
+        self.region_cache = LRUCache(region_budget)
+        self.chunk_cache = LRUCache(chunk_budget)
+        self.block_cache = LRUCache(block_budget)
 
 
     def clean_cache(self) -> None:
 
-        self.__region_cache = {}
-        self.__chunk_cache = {}
-        self.__block_cache = {}
+        self.region_cache.clear()
+        self.chunk_cache.clear()
+        self.block_cache.clear()
+
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns the hit, miss and eviction counters of every cache
+        """
+
+        return {
+            "regions": self.region_cache.stats(),
+            "chunks": self.chunk_cache.stats(),
+            "blocks": self.block_cache.stats()
+        }
 
 
     def get_region(
         self,
         region_x: int,
-        region_z: int
+        region_z: int,
+        dim: Dimension = Dimension.Overworld
     ) -> Region | None:
 
-        if (region_x, region_z) in self.__region_cache:
-            return self.__region_cache[(region_x, region_z)]
-
-        region = super().get_region(region_x, region_z)
-        self.__region_cache[(region_x, region_z)] = region
-
-        return region
+        return self.region_cache.get_or_load(
+            (dimension_name(dim), region_x, region_z),
+            lambda: super(CachedWorldReader, self).get_region(region_x, region_z, dim)
+        )
 
     
     def get_chunk(
         self,
         chunk_x: int,
-        chunk_z: int
+        chunk_z: int,
+        dim: Dimension = Dimension.Overworld
     ) -> Chunk | None:
 
-        if (chunk_x, chunk_z) in self.__chunk_cache:
-            return self.__chunk_cache[(chunk_x, chunk_z)]
-
-        chunk = super().get_chunk(chunk_x, chunk_z)
-        self.__chunk_cache[(chunk_x, chunk_z)] = chunk
-
-        return chunk
+        return self.chunk_cache.get_or_load(
+            (dimension_name(dim), chunk_x, chunk_z),
+            lambda: super(CachedWorldReader, self).get_chunk(chunk_x, chunk_z, dim)
+        )
 
     
-    def get_block(self, block_pos: Vec3d) -> Block | None:
-
-        if block_pos in self.__block_cache:
-            return self.__block_cache[block_pos]
-
-        block = super().get_block(block_pos)
-        self.__block_cache[block_pos] = block
+    def get_block(
+        self,
+        block_pos: Vec3d,
+        dim: Dimension = Dimension.Overworld
+    ) -> Block | None:
 
-        return block
+        return self.block_cache.get_or_load(
+            (dimension_name(dim), block_pos),
+            lambda: super(CachedWorldReader, self).get_block(block_pos, dim)
+        )
 
 
 class Renderer:
@@ -80,12 +101,29 @@ class Renderer:
     def __init__(
         self,
         server: Server,
-        base_path: Path
+        base_path: Path,
+        change_feed: Optional[RegionChangeFeed] = None
     ) -> "Renderer":
+        """
+        With a `change_feed` (from the world_cache plugin) the brick map is kept between renders
+        and only the bricks of the saved chunks are dropped, otherwise it's rebuilt by every render
+        """
         
         self.server = server
         self.world_reader = CachedWorldReader(server)
         self.texture_manager = TextureManager(base_path)
+        self.brick_map = BrickMap(self.world_reader, is_renderable)
+        self.change_feed = change_feed
+
+        if change_feed is not None:
+            change_feed.subscribe(self.brick_map.invalidate)
+
+
+    def release(self) -> None:
+
+        if self.change_feed is not None:
+            self.change_feed.unsubscribe(self.brick_map.invalidate)
+            self.change_feed = None
 
 
     def generate_picture(
@@ -103,6 +141,10 @@ class Renderer:
         pixels = img.load()
 
         self.world_reader.clean_cache()
+
+        if self.change_feed is None:
+            self.brick_map.invalidate()
+
         self.texture_manager.load_texture_pack(texture)
         camera = Camera(*pos.as_tuple(), rot.yaw, rot.pitch, fov)
         fog_color = get_fog_color(dim)
@@ -113,7 +155,7 @@ class Renderer:
 
                 direction = camera.get_ray_direction(px, py, width, height)
                 
-                ray = raycast(self.world_reader, pos, direction)
+                ray = raycast(self.world_reader, pos, direction, brick_map=self.brick_map, dim=dim)
 
                 if ray is None:
                     pixels[px, py] = fog_color
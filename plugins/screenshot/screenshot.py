@@ -2,12 +2,18 @@ from typing import Optional, Union, Dict, Any
 from pathlib import Path
 from PIL import Image
 import threading
+import logging
 
 from mconduit import plugins, Context, Vec3d, Rot, Dimension
+from plugins.world_cache.world import get_world_path
+from plugins.world_cache.world_cache import acquire_world, release_world
 
 from .renderer import Renderer
 
 
+logger = logging.getLogger(__name__)
+
+
 class Persistent(plugins.Persistent):
 
     pos: list = [0, 0, 0]
@@ -18,6 +24,8 @@ class Persistent(plugins.Persistent):
     texture: str = "vanilla"
     width: int = 1900
     height: int = 1080
+    instanced: bool = False
+    mesh_workers: int = 1 # 1 meshes on the caller's thread, 0 uses one process per core
 
 
 class Screenshot(plugins.Plugin[None, Persistent]):
@@ -45,7 +53,43 @@ class Screenshot(plugins.Plugin[None, Persistent]):
             self.discord_images_path.mkdir(parents=True, exist_ok=True)
             discord_ext.load_cog("discord_cog", self)
 
-        self.__renderer = Renderer(self.server, self.path)
+        world_cache = self.manager.get_plugin_named("world_cache")
+        self.__world_path = None
+
+        if world_cache is not None:
+            reader = world_cache.get_reader()
+            self.__change_feed = world_cache.get_change_feed()
+
+        else:
+            # Same reader and feed as the world_cache plugin would share, released with this plugin
+            logger.warning("The world_cache plugin isn't loaded, the screenshot plugin opens the world by itself")
+
+            self.__world_path = get_world_path(self.server)
+            world = acquire_world(self.__world_path)
+
+            reader = world.reader
+            self.__change_feed = world.feed
+
+        self.__renderer = Renderer(
+            self.server,
+            self.path,
+            reader,
+            mesh_workers=self.persistent.mesh_workers
+        )
+
+        # Chunks saved on disk get meshed again on the next picture
+        self.__change_feed.subscribe(self.__renderer.mesh_cache.invalidate_chunks)
+
+
+    def on_unload(self):
+
+        self.__change_feed.unsubscribe(self.__renderer.mesh_cache.invalidate_chunks)
+
+        with self.__lock:
+            self.__renderer.release()
+
+        if self.__world_path is not None:
+            release_world(self.__world_path)
 
     
     @property
@@ -80,7 +124,8 @@ class Screenshot(plugins.Plugin[None, Persistent]):
             "max_dist": self.persistent.max_dist,
             "texture": self.persistent.texture,
             "width": self.persistent.width,
-            "height": self.persistent.height
+            "height": self.persistent.height,
+            "instanced": self.persistent.instanced
         }
     
 
@@ -93,7 +138,8 @@ class Screenshot(plugins.Plugin[None, Persistent]):
         max_dist: Optional[int] = None,
         texture: Optional[str] = None,
         width: Optional[int] = None,
-        height: Optional[int] = None
+        height: Optional[int] = None,
+        instanced: Optional[bool] = None
     ) -> Image:
 
         defaults = self.default_configs
@@ -105,7 +151,8 @@ class Screenshot(plugins.Plugin[None, Persistent]):
             max_dist,
             texture,
             width,
-            height
+            height,
+            instanced
         ]
 
         for (i, config), default in zip(enumerate(configs), defaults.values()):
@@ -126,7 +173,8 @@ class Screenshot(plugins.Plugin[None, Persistent]):
         max_dist: int = 128,
         texture: str = "vanilla",
         width: int = 320,
-        height: int = 240
+        height: int = 240,
+        instanced: bool = False
     ) -> Image:
         
         with self.__lock:
@@ -138,7 +186,8 @@ class Screenshot(plugins.Plugin[None, Persistent]):
                 max_dist,
                 texture,
                 width,
-                height
+                height,
+                instanced
             )
     
 
@@ -154,7 +203,8 @@ class Screenshot(plugins.Plugin[None, Persistent]):
         max_dist: Union[int, str] = "-",
         texture: str = "-",
         width: Union[int, str] = "-",
-        height: Union[int, str] = "-"
+        height: Union[int, str] = "-",
+        instanced: plugins.Flag = False
     ):
         
         if "-" in (x, y, z):
@@ -193,7 +243,8 @@ class Screenshot(plugins.Plugin[None, Persistent]):
             pos,
             rot,
             dimension,
-            *configs
+            *configs,
+            instanced=True if instanced is True else None
         )
         
         image.save(img_path)
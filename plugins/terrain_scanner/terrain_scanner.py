@@ -1,7 +1,16 @@
-from typing import Optional, Literal, List
+from typing import Optional, Literal, List, Tuple, FrozenSet
+from pathlib import Path
+import numpy as np
+import logging
 
 from mconduit import plugins, utils, Context, Vec3d, Dimension
-from mconduit.world import CachedWorldReader
+from plugins.world_cache.lru import LRUCache, MISSING
+from plugins.world_cache.changes import RegionChangeFeed
+from plugins.world_cache.world import MappedWorldReader, dimension_name, get_world_path
+from plugins.world_cache.world_cache import acquire_world, release_world
+
+
+logger = logging.getLogger(__name__)
 
 
 BLOCK_LIST = [
@@ -40,12 +49,98 @@ BLOCK_LIST = [
 ]
 
 
+class ScanIndex:
+    """
+    Positions of the scanned blocks inside every chunk, kept until the chunk is saved again
+    """
+
+
+    positions: LRUCache
+
+
+    def __init__(self, budget: int = 64 * 1024 * 1024) -> "ScanIndex":
+
+        self.positions = LRUCache(budget)
+
+
+    def get(
+        self,
+        key: Tuple[str, int, int, int, int, FrozenSet[str]]
+    ) -> Optional[np.ndarray]:
+
+        positions = self.positions.get(key)
+
+        return None if positions is MISSING else positions
+
+
+    def put(
+        self,
+        key: Tuple[str, int, int, int, int, FrozenSet[str]],
+        positions: np.ndarray
+    ) -> None:
+
+        self.positions.put(key, positions)
+
+
+    def invalidate_chunks(
+        self,
+        dim: str,
+        chunks: List[Tuple[int, int]]
+    ) -> None:
+
+        chunks = set(chunks)
+
+        for key, _positions in self.positions.items():
+
+            if key[0] == dim and (key[1], key[2]) in chunks:
+                self.positions.pop(key)
+
+
 class TerrainScanner(plugins.Plugin):
     """
     Helps prepping the terrain for a World Eater
     """
 
 
+    __index: ScanIndex
+    __reader: MappedWorldReader
+    __change_feed: RegionChangeFeed
+    __world_path: Optional[Path]
+
+
+    def on_load(self):
+
+        self.__index = ScanIndex()
+
+        world_cache = self.manager.get_plugin_named("world_cache")
+        self.__world_path = None
+
+        if world_cache is not None:
+            self.__reader = world_cache.get_reader()
+            self.__change_feed = world_cache.get_change_feed()
+
+        else:
+            # Same reader and feed as the world_cache plugin would share, released with this plugin
+            logger.warning("The world_cache plugin isn't loaded, the terrain scanner opens the world by itself")
+
+            self.__world_path = get_world_path(self.server)
+            world = acquire_world(self.__world_path)
+
+            self.__reader = world.reader
+            self.__change_feed = world.feed
+
+        # Chunks saved on disk get scanned again
+        self.__change_feed.subscribe(self.__index.invalidate_chunks)
+
+
+    def on_unload(self):
+
+        self.__change_feed.unsubscribe(self.__index.invalidate_chunks)
+
+        if self.__world_path is not None:
+            release_world(self.__world_path)
+
+
     def scan(
         self,
         c1: Vec3d,
@@ -82,27 +177,42 @@ class TerrainScanner(plugins.Plugin):
         x2, _y2, z2 = utils.coords.chunk_coords(c2)
         max_y, min_y = max(c1.y, c2.y), min(c1.y, c2.y)
 
-        chunks = CachedWorldReader(self.server).get_chunks(x1, z1, x2, z2, dim)
-        block_coords = []
+        world_reader = self.__reader
+        world_reader.refresh()
 
-        for chunk in chunks:
+        dim_name = dimension_name(dim)
+        wanted_blocks = frozenset(blocks)
+        found = []
 
-            for x in range(16):
-                for z in range(16):
+        for cx in range(min(x1, x2), max(x1, x2) + 1):
+            for cz in range(min(z1, z2), max(z1, z2) + 1):
 
-                    cx, cz = chunk.x, chunk.z
+                key = (dim_name, cx, cz, min_y, max_y, wanted_blocks)
+                positions = self.__index.get(key)
 
-                    for y in range(min_y, max_y):
-                    
-                        block = chunk.get_block(x, y, z) # Note: This should accept both real and relative coordinates!
+                if positions is None:
 
-                        if block is None:
-                            continue
-                    
-                        block = block.replace("minecraft:", "")
-                    
-                        if block in blocks:
-                            block_coords.append(Vec3d(x + cx * 16, y, z + cz * 16))
+                    volume, palette = world_reader.get_volume(
+                        cx * 16, min_y, cz * 16,
+                        cx * 16 + 15, max_y - 1, cz * 16 + 15,
+                        dim
+                    )
+
+                    wanted = np.array(
+                        [name is not None and name.replace("minecraft:", "") in wanted_blocks for name in palette],
+                        dtype=bool
+                    )
+
+                    positions = np.argwhere(wanted[volume]) + np.array([cx * 16, min_y, cz * 16])
+                    self.__index.put(key, positions)
+
+                found.append(positions)
+
+        block_coords = [
+            Vec3d(int(x), int(y), int(z))
+            for positions in found
+            for x, y, z in positions
+        ]
 
         return block_coords
     
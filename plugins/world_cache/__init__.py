@@ -0,0 +1 @@
+from .world_cache import WorldCache
\ No newline at end of file
@@ -0,0 +1,366 @@
+from typing import Callable, Optional, Dict, List, Set, Tuple
+from pathlib import Path
+import numpy as np
+import threading
+import logging
+import time
+import re
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+from .region import SECTOR_SIZE, HEADER_SIZE
+from .world import MappedWorldReader, get_region_folders, get_folder_dimension, dimension_name
+
+
+REGION_NAME = re.compile(r"^r\.(-?\d+)\.(-?\d+)\.mca$")
+
+ChangeCallback = Callable[[str, List[Tuple[int, int]]], None]
+
+# Dimension and chunks of a region that changed
+Change = Tuple[str, List[Tuple[int, int]]]
+
+
+logger = logging.getLogger(__name__)
+
+
+class RegionEventHandler(FileSystemEventHandler):
+    """
+    Forwards the paths of the region files touched on disk
+    """
+
+    __callback: Callable[[Path], None]
+
+
+    def __init__(self, callback: Callable[[Path], None]) -> "RegionEventHandler":
+
+        self.__callback = callback
+
+
+    def __forward(self, event, path: str) -> None:
+
+        if not event.is_directory and path.endswith(".mca"):
+            self.__callback(Path(path))
+
+
+    def on_created(self, event) -> None:
+        self.__forward(event, event.src_path)
+
+
+    def on_modified(self, event) -> None:
+        self.__forward(event, event.src_path)
+
+
+    def on_deleted(self, event) -> None:
+        self.__forward(event, event.src_path)
+
+
+    def on_moved(self, event) -> None:
+        self.__forward(event, event.dest_path)
+
+
+class RegionChangeFeed:
+    """
+    Tells which chunks of the world were saved since the last time they were looked at.
+
+    Region files are watched through filesystem events (when `watchdog` is installed),
+    with a periodic mtime sweep as a fallback. A touched region has its header compared
+    with the last one seen: every chunk whose location or timestamp changed gets its revision bumped,
+    then the subscribers are called with the dimension and the list of changed chunks.
+
+    Subscribers run on the feed thread outside of its lock, the exceptions they raise are logged
+    """
+
+
+    world_path: Path
+    sweep_interval: float
+    revision: int
+    __reader: Optional[MappedWorldReader]
+    __headers: Dict[Tuple[str, int, int], np.ndarray]
+    __stats: Dict[Path, Tuple[int, int]]
+    __region_revisions: Dict[Tuple[str, int, int], int]
+    __chunk_revisions: Dict[Tuple[str, int, int], int]
+    __subscribers: List[ChangeCallback]
+    __pending: Set[Path]
+
+
+    def __init__(
+        self,
+        world_path: Path,
+        reader: Optional[MappedWorldReader] = None,
+        sweep_interval: float = 10.0
+    ) -> "RegionChangeFeed":
+        """
+        `reader`, if given, has the header of every changed region re-read
+        """
+
+        self.world_path = Path(world_path).resolve()
+        self.sweep_interval = sweep_interval
+        self.revision = 0
+
+        self.__reader = reader
+        self.__headers = {}
+        self.__stats = {}
+        self.__region_revisions = {}
+        self.__chunk_revisions = {}
+        self.__subscribers = []
+        self.__pending = set()
+
+        self.__lock = threading.RLock()
+        self.__wake = threading.Event()
+        self.__stopped = threading.Event()
+        self.__thread = None
+        self.__observer = None
+
+
+    def start(self) -> None:
+        """
+        Takes a first snapshot of the region headers, then starts watching them
+        """
+
+        if self.__thread is not None:
+            return
+
+        self.sweep(publish=False)
+        self.__stopped.clear()
+
+        self.__thread = threading.Thread(target=self.__run, name="region-change-feed", daemon=True)
+        self.__thread.start()
+
+        if Observer is not None and self.world_path.is_dir():
+
+            self.__observer = Observer()
+            self.__observer.schedule(RegionEventHandler(self.notify), path=str(self.world_path), recursive=True)
+            self.__observer.start()
+
+
+    def stop(self) -> None:
+        """
+        Stops the watcher and the sweep thread
+        """
+
+        if self.__observer is not None:
+            self.__observer.stop()
+            self.__observer.join()
+            self.__observer = None
+
+        if self.__thread is not None:
+            self.__stopped.set()
+            self.__wake.set()
+            self.__thread.join()
+            self.__thread = None
+
+
+    def subscribe(self, callback: ChangeCallback) -> None:
+        """
+        Calls `callback(dimension, chunks)` every time some chunks of a region are saved
+        """
+
+        with self.__lock:
+            self.__subscribers.append(callback)
+
+
+    def unsubscribe(self, callback: ChangeCallback) -> None:
+
+        with self.__lock:
+
+            if callback in self.__subscribers:
+                self.__subscribers.remove(callback)
+
+
+    def region_revision(self, dim: str, region_x: int, region_z: int) -> int:
+        """
+        Number of times the given region was seen changing
+        """
+
+        return self.__region_revisions.get((dimension_name(dim), region_x, region_z), 0)
+
+
+    def chunk_revision(self, dim: str, chunk_x: int, chunk_z: int) -> int:
+        """
+        Number of times the given chunk was seen being saved
+        """
+
+        return self.__chunk_revisions.get((dimension_name(dim), chunk_x, chunk_z), 0)
+
+
+    def notify(self, path: Path) -> None:
+        """
+        Queues a region file to be checked by the feed thread
+        """
+
+        with self.__lock:
+            self.__pending.add(Path(path))
+
+        self.__wake.set()
+
+
+    def sweep(self, publish: bool = True) -> None:
+        """
+        Checks every region file whose size or modification time changed since the last sweep
+        """
+
+        changes: List[Change] = []
+
+        with self.__lock:
+
+            seen = set()
+
+            for dim, folder in get_region_folders(self.world_path).items():
+
+                for path in folder.glob("r.*.mca"):
+
+                    seen.add(path)
+
+                    try:
+                        stat = path.stat()
+                    except FileNotFoundError:
+                        continue
+
+                    if self.__stats.get(path) != (stat.st_mtime_ns, stat.st_size):
+                        changes.extend(self.__check(dim, path, publish))
+
+            missing = [path for path in self.__stats if path not in seen]
+
+        for path in missing:
+            self.check(path)
+
+        self.__publish(changes)
+
+
+    def check(self, path: Path) -> None:
+        """
+        Compares the header of the given region file with the last one seen, and publishes the changes
+        """
+
+        path = Path(path).resolve()
+        dim = get_folder_dimension(self.world_path, path.parent)
+
+        if dim is None:
+            return
+
+        with self.__lock:
+            changes = self.__check(dim, path, True)
+
+        self.__publish(changes)
+
+
+    def __publish(self, changes: List[Change]) -> None:
+        """
+        Calls the subscribers outside of the lock, so a slow one only delays the feed thread
+        """
+
+        if len(changes) == 0:
+            return
+
+        with self.__lock:
+            subscribers = list(self.__subscribers)
+
+        for dim, chunks in changes:
+
+            for callback in subscribers:
+
+                try:
+                    callback(dim, chunks)
+                except Exception:
+                    # A broken subscriber must not stop the feed
+                    logger.exception("Region change subscriber %r failed", callback)
+
+
+    def __run(self) -> None:
+
+        last_sweep = time.monotonic()
+
+        while not self.__stopped.is_set():
+
+            self.__wake.wait(max(0.0, self.sweep_interval - (time.monotonic() - last_sweep)))
+
+            # Lets a save finish writing its chunks, they come as a burst of events
+            self.__stopped.wait(0.25)
+            self.__wake.clear()
+
+            with self.__lock:
+                pending, self.__pending = self.__pending, set()
+
+            for path in pending:
+                self.check(path)
+
+            if time.monotonic() - last_sweep >= self.sweep_interval:
+                self.sweep()
+                last_sweep = time.monotonic()
+
+
+    def __check(
+        self,
+        dim: str,
+        path: Path,
+        publish: bool
+    ) -> List[Change]:
+        """
+        Updates the header of the region, returns its changed chunks if they should be published.
+        Must be called with the lock held
+        """
+
+        match = REGION_NAME.match(path.name)
+
+        if match is None:
+            return []
+
+        region_x, region_z = int(match.group(1)), int(match.group(2))
+        key = (dim, region_x, region_z)
+
+        try:
+            stat = path.stat()
+
+            with open(path, "rb") as f:
+                data = f.read(HEADER_SIZE)
+
+            self.__stats[path] = (stat.st_mtime_ns, stat.st_size)
+
+        except FileNotFoundError:
+            data = b""
+            self.__stats.pop(path, None)
+
+        header = np.zeros(HEADER_SIZE // 4, dtype=np.uint32)
+
+        if len(data) == HEADER_SIZE:
+            header = np.frombuffer(data, dtype=">u4").astype(np.uint32)
+
+        old = self.__headers.get(key)
+        self.__headers[key] = header
+
+        if not publish:
+            return []
+
+        if old is None:
+            old = np.zeros_like(header)
+
+        locations, timestamps = header.reshape(2, SECTOR_SIZE // 4)
+        old_locations, old_timestamps = old.reshape(2, SECTOR_SIZE // 4)
+
+        # A chunk changes place when it's (re)generated, deleted or grows, otherwise only its timestamp changes
+        changed = np.nonzero(
+            (locations != old_locations) |
+            ((timestamps != old_timestamps) & (locations != 0))
+        )[0]
+
+        if len(changed) == 0:
+            return []
+
+        chunks = [(region_x * 32 + int(i) % 32, region_z * 32 + int(i) // 32) for i in changed]
+
+        self.revision += 1
+        self.__region_revisions[key] = self.__region_revisions.get(key, 0) + 1
+
+        for chunk_x, chunk_z in chunks:
+            chunk_key = (dim, chunk_x, chunk_z)
+            self.__chunk_revisions[chunk_key] = self.__chunk_revisions.get(chunk_key, 0) + 1
+
+        if self.__reader is not None:
+            self.__reader.refresh_region(region_x, region_z, dim)
+
+        return [(dim, chunks)]
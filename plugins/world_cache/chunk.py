@@ -0,0 +1,177 @@
+from typing import Any, Optional, Dict, List, Tuple
+import numpy as np
+
+from .nbt import parse_selected, Selection
+
+
+SECTION_VOLUME = 16 * 16 * 16
+
+# The only tags of a chunk needed to read its blocks, the entities, heightmaps, biomes... are skipped
+BLOCK_SELECTION = {
+    "xPos": True,
+    "zPos": True,
+    "sections": {
+        "Y": True,
+        "block_states": True
+    }
+}
+
+
+def unpack_block_states(data: np.ndarray, palette_size: int) -> np.ndarray:
+    """
+    Unpacks the `data` long array of a section into its 4096 palette indices, in `y, z, x` order.
+
+    Since 1.16 an entry never spans two longs, the unused high bits of every long are padding
+    """
+
+    if palette_size <= 1 or len(data) == 0:
+        return np.zeros(SECTION_VOLUME, dtype=np.uint16)
+
+    bits = max(4, (palette_size - 1).bit_length())
+    per_long = 64 // bits
+
+    longs = np.asarray(data, dtype=np.int64).view(np.uint64)
+    shifts = np.arange(per_long, dtype=np.uint64) * np.uint64(bits)
+
+    values = (longs[:, None] >> shifts) & np.uint64((1 << bits) - 1)
+
+    return values.reshape(-1)[:SECTION_VOLUME].astype(np.uint16)
+
+
+class Chunk:
+    """
+    A decoded chunk (1.18+ format).
+
+    Block states are left packed, a block is unpacked from its long only when requested
+    """
+
+
+    x: int
+    z: int
+    nbt: Dict[str, Any]
+    __sections: Dict[int, Dict[str, Any]]
+    __unpacked: Dict[int, Tuple[np.ndarray, List[str]]]
+
+
+    def __init__(
+        self,
+        x: int,
+        z: int,
+        nbt: Dict[str, Any]
+    ) -> "Chunk":
+
+        self.x = x
+        self.z = z
+        self.nbt = nbt
+        self.__sections = {}
+        self.__unpacked = {}
+
+        for section in nbt.get("sections", []):
+
+            if "block_states" in section:
+                self.__sections[int(section["Y"])] = section["block_states"]
+
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Estimated memory held by the chunk, counting every section as if it was already unpacked
+        """
+
+        size = 0
+
+        for block_states in self.__sections.values():
+            size += SECTION_VOLUME * 2 + 64 * len(block_states["palette"])
+            size += getattr(block_states.get("data"), "nbytes", 0)
+
+        return size + 256
+
+
+    @classmethod
+    def parse(
+        cls,
+        x: int,
+        z: int,
+        data: bytes,
+        selection: Selection = BLOCK_SELECTION
+    ) -> "Chunk":
+        """
+        Decodes the chunk from its uncompressed NBT, materializing only the `selection` tags
+        """
+
+        return cls(x, z, parse_selected(data, selection))
+
+
+    def get_block_state(
+        self,
+        x: int,
+        y: int,
+        z: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns the palette entry (`Name` and `Properties`) of the block at the given coordinates.
+
+        Accepts both absolute and chunk-relative x and z
+        """
+
+        block_states = self.__sections.get(y >> 4)
+
+        if block_states is None:
+            return None
+
+        palette = block_states["palette"]
+
+        if len(palette) == 1 or "data" not in block_states:
+            return palette[0]
+
+        bits = max(4, (len(palette) - 1).bit_length())
+        per_long = 64 // bits
+        index = (y & 15) * 256 + (z & 15) * 16 + (x & 15)
+
+        packed = int(block_states["data"][index // per_long]) & 0xFFFFFFFFFFFFFFFF
+        value = (packed >> ((index % per_long) * bits)) & ((1 << bits) - 1)
+
+        return palette[value]
+
+
+    def get_section(self, section_y: int) -> Optional[Tuple[np.ndarray, List[str]]]:
+        """
+        Returns the `(16, 16, 16)` uint16 array of palette indices of a section, indexed `[y, z, x]`,
+        together with the namespaced block names of its palette.
+
+        Returns None if the section isn't stored in the chunk
+        """
+
+        if section_y in self.__unpacked:
+            return self.__unpacked[section_y]
+
+        block_states = self.__sections.get(section_y)
+
+        if block_states is None:
+            return None
+
+        palette = [str(state["Name"]) for state in block_states["palette"]]
+        data = block_states.get("data", [])
+
+        blocks = unpack_block_states(data, len(palette)).reshape(16, 16, 16)
+        self.__unpacked[section_y] = blocks, palette
+
+        return blocks, palette
+
+
+    def get_block(
+        self,
+        x: int,
+        y: int,
+        z: int
+    ) -> Optional[str]:
+        """
+        Returns the namespaced name of the block at the given coordinates
+        """
+
+        state = self.get_block_state(x, y, z)
+
+        if state is None:
+            return None
+
+        return str(state["Name"])
\ No newline at end of file
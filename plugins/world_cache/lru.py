@@ -0,0 +1,234 @@
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypeVar
+from collections import OrderedDict
+import numpy as np
+import threading
+import sys
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Rough estimate of the memory held by a value, in bytes.
+
+    Arrays, buffers and anything exposing `nbytes` are measured exactly,
+    containers (including NBT compounds and lists) are walked recursively.
+    Other objects count themselves plus the containers stored in their attributes
+    """
+
+    return _estimate(value, set(), True)
+
+
+def _estimate(value: Any, seen: set, attributes: bool) -> int:
+
+    if value is None or id(value) in seen:
+        return 0
+
+    seen.add(id(value))
+
+    if isinstance(value, np.ndarray):
+        return value.nbytes + 112
+
+    if isinstance(value, (bytes, bytearray, str, int, float, bool)):
+        return sys.getsizeof(value)
+
+    if isinstance(value, memoryview):
+        return value.nbytes
+
+    if hasattr(value, "nbytes") and isinstance(getattr(value, "nbytes"), int):
+        return value.nbytes
+
+    size = sys.getsizeof(value)
+
+    if isinstance(value, dict):
+        return size + sum(_estimate(k, seen, False) + _estimate(v, seen, False) for k, v in value.items())
+
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(_estimate(item, seen, False) for item in value)
+
+    if attributes and hasattr(value, "__dict__"):
+        return size + sum(
+            _estimate(item, seen, False)
+            for item in vars(value).values()
+            if isinstance(item, (dict, list, tuple, np.ndarray, bytes, bytearray, str))
+        )
+
+    return size
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Thread-safe least recently used cache bounded by an estimated size in bytes.
+
+    Inserting past the budget evicts the least recently used entries,
+    `on_evict` is called with every entry pushed out
+    """
+
+
+    budget: int
+    max_entries: Optional[int]
+    hits: int
+    misses: int
+    evictions: int
+    used_bytes: int
+    __entries: "OrderedDict[K, tuple[V, int]]"
+
+
+    def __init__(
+        self,
+        budget: int,
+        sizeof: Callable[[V], int] = estimate_size,
+        max_entries: Optional[int] = None,
+        on_evict: Optional[Callable[[K, V], None]] = None
+    ) -> "LRUCache":
+
+        self.budget = budget
+        self.max_entries = max_entries
+        self.__sizeof = sizeof
+        self.__on_evict = on_evict
+        self.__entries = OrderedDict()
+        self.__lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.used_bytes = 0
+
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+
+    def __contains__(self, key: K) -> bool:
+        return key in self.__entries
+
+
+    def get(self, key: K, default: Any = MISSING) -> V:
+        """
+        Returns the cached value and marks it as recently used, or `default` (`MISSING`) if not cached.
+
+        Cached `None` values are returned as such
+        """
+
+        with self.__lock:
+
+            entry = self.__entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self.__entries.move_to_end(key)
+
+            return entry[0]
+
+
+    def get_or_load(self, key: K, load: Callable[[], V]) -> V:
+        """
+        Returns the cached value, or loads it with `load` and caches it.
+
+        `load` runs outside of the lock, two threads missing the same key may both load it
+        """
+
+        value = self.get(key)
+
+        if value is MISSING:
+            value = load()
+            self.put(key, value)
+
+        return value
+
+
+    def put(self, key: K, value: V) -> None:
+        """
+        Caches a value, then evicts the least recently used entries until the cache fits its budget.
+
+        A value bigger than the whole budget isn't cached
+        """
+
+        size = self.__sizeof(value)
+        evicted = []
+
+        with self.__lock:
+
+            old = self.__entries.pop(key, None)
+
+            if old is not None:
+                self.used_bytes -= old[1]
+
+            if size <= self.budget:
+                self.__entries[key] = (value, size)
+                self.used_bytes += size
+
+            while self.__entries and (
+                self.used_bytes > self.budget or
+                (self.max_entries is not None and len(self.__entries) > self.max_entries)
+            ):
+                old_key, (old_value, old_size) = self.__entries.popitem(last=False)
+                self.used_bytes -= old_size
+                self.evictions += 1
+                evicted.append((old_key, old_value))
+
+        if self.__on_evict is not None:
+
+            for old_key, old_value in evicted:
+                self.__on_evict(old_key, old_value)
+
+
+    def pop(self, key: K, default: Any = None) -> V:
+        """
+        Removes an entry without counting it as an eviction
+        """
+
+        with self.__lock:
+
+            entry = self.__entries.pop(key, None)
+
+            if entry is None:
+                return default
+
+            self.used_bytes -= entry[1]
+
+            return entry[0]
+
+
+    def clear(self) -> None:
+        """
+        Removes every entry, the counters are kept
+        """
+
+        with self.__lock:
+            self.__entries.clear()
+            self.used_bytes = 0
+
+
+    def items(self) -> list:
+
+        with self.__lock:
+            return [(key, value) for key, (value, _size) in self.__entries.items()]
+
+
+    def values(self) -> list:
+
+        with self.__lock:
+            return [value for value, _size in self.__entries.values()]
+
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the counters of the cache
+        """
+
+        return {
+            "entries": len(self.__entries),
+            "used_bytes": self.used_bytes,
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
\ No newline at end of file
@@ -0,0 +1,287 @@
+from typing import Any, Dict, Tuple, Union
+import numpy as np
+import struct
+
+
+TAG_END = 0
+TAG_BYTE = 1
+TAG_SHORT = 2
+TAG_INT = 3
+TAG_LONG = 4
+TAG_FLOAT = 5
+TAG_DOUBLE = 6
+TAG_BYTE_ARRAY = 7
+TAG_STRING = 8
+TAG_LIST = 9
+TAG_COMPOUND = 10
+TAG_INT_ARRAY = 11
+TAG_LONG_ARRAY = 12
+
+SCALARS = {
+    TAG_BYTE: "b",
+    TAG_SHORT: "h",
+    TAG_INT: "i",
+    TAG_LONG: "q",
+    TAG_FLOAT: "f",
+    TAG_DOUBLE: "d"
+}
+SCALAR_STRUCTS = {tag: struct.Struct(f">{fmt}") for tag, fmt in SCALARS.items()}
+
+ARRAYS = {
+    TAG_BYTE_ARRAY: np.dtype(">i1"),
+    TAG_INT_ARRAY: np.dtype(">i4"),
+    TAG_LONG_ARRAY: np.dtype(">i8")
+}
+
+USHORT = struct.Struct(">H")
+INT = struct.Struct(">i")
+
+Selection = Union[bool, Dict[str, "Selection"]]
+
+
+def parse_selected(data: bytes, selection: Selection = True) -> Dict[str, Any]:
+    """
+    Parses an uncompressed NBT file, materializing only the selected tags.
+
+    `selection` is either True, to read a whole tag, or a dict mapping the names to read inside
+    a compound (or inside every compound of a list) to their own selection.
+    Every other tag is skipped over without building any object.
+
+    Compounds become dicts, lists become lists, numeric arrays become native NumPy arrays
+    """
+
+    if data[0] != TAG_COMPOUND:
+        raise ValueError("The root tag of a NBT file must be a compound")
+
+    name_length, = USHORT.unpack_from(data, 1)
+    value, _pos = _read(data, 3 + name_length, TAG_COMPOUND, selection)
+
+    return value
+
+
+def _read(
+    data: bytes,
+    pos: int,
+    tag: int,
+    selection: Selection
+) -> Tuple[Any, int]:
+    """
+    Reads the payload of a tag starting at `pos`, returns its value and the position following it
+    """
+
+    if tag in SCALAR_STRUCTS:
+        scalar = SCALAR_STRUCTS[tag]
+        return scalar.unpack_from(data, pos)[0], pos + scalar.size
+
+    if tag == TAG_STRING:
+        length, = USHORT.unpack_from(data, pos)
+        pos += 2
+        return bytes(data[pos:pos + length]).decode("utf-8", errors="replace"), pos + length
+
+    if tag in ARRAYS:
+        dtype = ARRAYS[tag]
+        count, = INT.unpack_from(data, pos)
+        pos += 4
+        array = np.frombuffer(data, dtype=dtype, count=count, offset=pos).astype(dtype.newbyteorder("="))
+        return array, pos + count * dtype.itemsize
+
+    if tag == TAG_LIST:
+
+        item = data[pos]
+        count, = INT.unpack_from(data, pos + 1)
+        pos += 5
+
+        if item in SCALARS:
+            values = struct.unpack_from(f">{max(count, 0)}{SCALARS[item]}", data, pos)
+            return list(values), pos + SCALAR_STRUCTS[item].size * max(count, 0)
+
+        values = []
+
+        for _ in range(count):
+            value, pos = _read(data, pos, item, selection)
+            values.append(value)
+
+        return values, pos
+
+    if tag == TAG_COMPOUND:
+
+        compound = {}
+
+        while True:
+
+            child = data[pos]
+            pos += 1
+
+            if child == TAG_END:
+                return compound, pos
+
+            name_length, = USHORT.unpack_from(data, pos)
+            name = bytes(data[pos + 2:pos + 2 + name_length]).decode("utf-8", errors="replace")
+            pos += 2 + name_length
+
+            if selection is True:
+                compound[name], pos = _read(data, pos, child, True)
+
+            elif name in selection:
+                compound[name], pos = _read(data, pos, child, selection[name])
+
+            else:
+                pos = _skip(data, pos, child)
+
+    raise ValueError(f"Unknown NBT tag {tag}")
+
+
+def _skip(data: bytes, pos: int, tag: int) -> int:
+    """
+    Returns the position following the payload of a tag, without reading it
+    """
+
+    if tag in SCALAR_STRUCTS:
+        return pos + SCALAR_STRUCTS[tag].size
+
+    if tag == TAG_STRING:
+        return pos + 2 + USHORT.unpack_from(data, pos)[0]
+
+    if tag in ARRAYS:
+        return pos + 4 + INT.unpack_from(data, pos)[0] * ARRAYS[tag].itemsize
+
+    if tag == TAG_LIST:
+
+        item = data[pos]
+        count, = INT.unpack_from(data, pos + 1)
+        pos += 5
+
+        if item in SCALAR_STRUCTS:
+            return pos + SCALAR_STRUCTS[item].size * max(count, 0)
+
+        for _ in range(count):
+            pos = _skip(data, pos, item)
+
+        return pos
+
+    if tag == TAG_COMPOUND:
+
+        while True:
+
+            child = data[pos]
+            pos += 1
+
+            if child == TAG_END:
+                return pos
+
+            pos += 2 + USHORT.unpack_from(data, pos)[0]
+            pos = _skip(data, pos, child)
+
+    raise ValueError(f"Unknown NBT tag {tag}")
+
+
+SCALAR_TYPES = {
+    np.int8: TAG_BYTE,
+    np.int16: TAG_SHORT,
+    np.int32: TAG_INT,
+    np.int64: TAG_LONG,
+    np.float32: TAG_FLOAT,
+    np.float64: TAG_DOUBLE
+}
+
+ARRAY_TAGS = {
+    np.dtype("i1"): TAG_BYTE_ARRAY,
+    np.dtype("u1"): TAG_BYTE_ARRAY,
+    np.dtype("i4"): TAG_INT_ARRAY,
+    np.dtype("i8"): TAG_LONG_ARRAY
+}
+
+
+def serialize(value: Dict[str, Any], name: str = "") -> bytes:
+    """
+    Writes a compound as an uncompressed NBT file.
+
+    Dicts become compounds, lists become lists, strings become strings and int8/int32/int64 NumPy arrays
+    become byte/int/long arrays. Plain ints are written as ints, bools as bytes and floats as doubles,
+    NumPy scalars (e.g. `np.int8(1)`) pick any other numeric tag
+    """
+
+    out = bytearray([TAG_COMPOUND])
+    _write_name(out, name)
+    _write(out, TAG_COMPOUND, value)
+
+    return bytes(out)
+
+
+def _tag_of(value: Any) -> int:
+
+    if isinstance(value, bool):
+        return TAG_BYTE
+
+    if isinstance(value, np.generic) and type(value) in SCALAR_TYPES:
+        return SCALAR_TYPES[type(value)]
+
+    if isinstance(value, int):
+        return TAG_INT
+
+    if isinstance(value, float):
+        return TAG_DOUBLE
+
+    if isinstance(value, str):
+        return TAG_STRING
+
+    if isinstance(value, np.ndarray):
+
+        tag = ARRAY_TAGS.get(value.dtype.newbyteorder("="))
+
+        if tag is None:
+            raise TypeError(f"Can't write a {value.dtype} array as NBT")
+
+        return tag
+
+    if isinstance(value, (list, tuple)):
+        return TAG_LIST
+
+    if isinstance(value, dict):
+        return TAG_COMPOUND
+
+    raise TypeError(f"Can't write {type(value).__name__} as NBT")
+
+
+def _write_name(out: bytearray, name: str) -> None:
+
+    encoded = name.encode("utf-8")
+    out += USHORT.pack(len(encoded))
+    out += encoded
+
+
+def _write(out: bytearray, tag: int, value: Any) -> None:
+
+    if tag in SCALAR_STRUCTS:
+        out += SCALAR_STRUCTS[tag].pack(int(value) if tag <= TAG_LONG else float(value))
+
+    elif tag == TAG_STRING:
+        _write_name(out, value)
+
+    elif tag in ARRAYS:
+        array = np.ascontiguousarray(value).astype(ARRAYS[tag], copy=False)
+        out += INT.pack(len(array))
+        out += array.tobytes()
+
+    elif tag == TAG_LIST:
+
+        item = _tag_of(value[0]) if len(value) > 0 else TAG_END
+        out.append(item)
+        out += INT.pack(len(value))
+
+        for element in value:
+            _write(out, item, element)
+
+    elif tag == TAG_COMPOUND:
+
+        for name, child in value.items():
+
+            child_tag = _tag_of(child)
+            out.append(child_tag)
+            _write_name(out, name)
+            _write(out, child_tag, child)
+
+        out.append(TAG_END)
+
+    else:
+        raise ValueError(f"Unknown NBT tag {tag}")
@@ -0,0 +1,277 @@
+from typing import Optional, Tuple
+from pathlib import Path
+import numpy as np
+import threading
+import struct
+import mmap
+import zlib
+import gzip
+
+try:
+    import lz4.block
+except ImportError:
+    lz4 = None
+
+
+SECTOR_SIZE = 4096
+HEADER_SIZE = 2 * SECTOR_SIZE
+
+COMPRESSION_GZIP = 1
+COMPRESSION_ZLIB = 2
+COMPRESSION_NONE = 3
+COMPRESSION_LZ4 = 4
+EXTERNAL_FLAG = 128
+
+LZ4_MAGIC = b"LZ4Block"
+LZ4_HEADER = struct.Struct("<BIII") # token, compressed length, decompressed length, checksum
+
+
+class RegionFile:
+    """
+    A `.mca` region file mapped in memory, safe to share between threads.
+
+    Only the 8 KiB header is read when the file is opened,
+    the payload of a chunk is sliced out of the mapping when that chunk is requested
+    """
+
+
+    path: Path
+    x: int
+    z: int
+    locations: np.ndarray
+    timestamps: np.ndarray
+    __mmap: Optional[mmap.mmap]
+
+
+    def __init__(self, path: Path) -> "RegionFile":
+
+        self.path = Path(path)
+        _r, x, z, _mca = self.path.name.split(".")
+        self.x, self.z = int(x), int(z)
+
+        self.__mmap = None
+        self.__lock = threading.RLock()
+        self.locations = np.zeros(1024, dtype=np.uint32)
+        self.timestamps = np.zeros(1024, dtype=np.uint32)
+
+        self.reload()
+
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory held by the header tables, the mapping itself is backed by the page cache
+        """
+
+        return self.locations.nbytes + self.timestamps.nbytes
+
+
+    def __enter__(self) -> "RegionFile":
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+    def close(self) -> None:
+        """
+        Unmaps the file
+        """
+
+        with self.__lock:
+
+            if self.__mmap is not None:
+                self.__mmap.close()
+                self.__mmap = None
+
+
+    def reload(self) -> None:
+        """
+        Maps the file again and re-reads its header, to see the chunks written after it was opened
+        """
+
+        with self.__lock:
+
+            self.close()
+
+            with open(self.path, "rb") as f:
+
+                if self.path.stat().st_size < HEADER_SIZE:
+                    return # Region created but not written yet
+
+                self.__mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            self.read_header()
+
+
+    def refresh(self) -> None:
+        """
+        Re-reads the header, the mapping shares the pages written by the server.
+
+        The file is mapped again if its size changed
+        """
+
+        with self.__lock:
+
+            if self.__mmap is None or self.path.stat().st_size != len(self.__mmap):
+                self.reload()
+            else:
+                self.read_header()
+
+
+    def read_header(self) -> None:
+        """
+        Reads the location and timestamp tables
+        """
+
+        if self.__mmap is None:
+            return
+
+        self.locations = np.frombuffer(self.__mmap[:SECTOR_SIZE], dtype=">u4").astype(np.uint32)
+        self.timestamps = np.frombuffer(self.__mmap[SECTOR_SIZE:HEADER_SIZE], dtype=">u4").astype(np.uint32)
+
+
+    @staticmethod
+    def index(chunk_x: int, chunk_z: int) -> int:
+        """
+        Position of the chunk inside the header tables, accepts both absolute and region-relative coordinates
+        """
+
+        return (chunk_x & 31) + (chunk_z & 31) * 32
+
+
+    def has_chunk(self, chunk_x: int, chunk_z: int) -> bool:
+        return self.locations[self.index(chunk_x, chunk_z)] != 0
+
+
+    def chunk_version(self, chunk_x: int, chunk_z: int) -> Tuple[int, int]:
+        """
+        Returns the location and the timestamp of the chunk, both change every time the chunk is saved
+        """
+
+        index = self.index(chunk_x, chunk_z)
+
+        return int(self.locations[index]), int(self.timestamps[index])
+
+
+    def __chunk_start(
+        self,
+        chunk_x: int,
+        chunk_z: int
+    ) -> Optional[int]:
+        """
+        Returns the byte offset of the given chunk, or None if the chunk was never generated
+        """
+
+        location = int(self.locations[self.index(chunk_x, chunk_z)])
+
+        if location == 0 or self.__mmap is None:
+            return None
+
+        return (location >> 8) * SECTOR_SIZE
+
+
+    def read_payload(
+        self,
+        chunk_x: int,
+        chunk_z: int
+    ) -> Optional[Tuple[int, bytes]]:
+        """
+        Returns the compression type and the still compressed bytes of the given chunk,
+        or None if the chunk was never generated
+        """
+
+        with self.__lock:
+
+            start = self.__chunk_start(chunk_x, chunk_z)
+
+            if start is not None and start + 5 > len(self.__mmap):
+
+                # The file grew after being mapped
+                self.reload()
+                start = self.__chunk_start(chunk_x, chunk_z)
+
+            if start is None or start + 5 > len(self.__mmap):
+                return None
+
+            length = int.from_bytes(self.__mmap[start:start + 4], "big")
+            compression = self.__mmap[start + 4]
+
+            if not compression & EXTERNAL_FLAG:
+                return compression, self.__mmap[start + 5:start + 4 + length]
+
+        # Chunks bigger than 1 MiB are stored in their own file
+        external = self.path.parent / f"c.{self.x * 32 + (chunk_x & 31)}.{self.z * 32 + (chunk_z & 31)}.mcc"
+
+        return compression & ~EXTERNAL_FLAG, external.read_bytes()
+
+
+    def read_chunk(
+        self,
+        chunk_x: int,
+        chunk_z: int
+    ) -> Optional[bytes]:
+        """
+        Returns the decompressed NBT of the given chunk, or None if the chunk was never generated
+        """
+
+        payload = self.read_payload(chunk_x, chunk_z)
+
+        if payload is None:
+            return None
+
+        return decompress(*payload)
+
+
+def decompress(compression: int, data: bytes) -> bytes:
+    """
+    Decompresses a chunk payload
+    """
+
+    if compression == COMPRESSION_GZIP:
+        return gzip.decompress(data)
+
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+
+    if compression == COMPRESSION_NONE:
+        return data
+
+    if compression == COMPRESSION_LZ4:
+        return _decompress_lz4(data)
+
+    raise ValueError(f"Unknown chunk compression {compression}")
+
+
+def _decompress_lz4(data: bytes) -> bytes:
+    """
+    Decompresses the LZ4 block stream used by Minecraft (lz4-java `LZ4BlockOutputStream`)
+    """
+
+    if lz4 is None:
+        raise RuntimeError("The `lz4` package is required to read LZ4 compressed chunks")
+
+    out = bytearray()
+    pos = 0
+
+    while pos < len(data):
+
+        if data[pos:pos + len(LZ4_MAGIC)] != LZ4_MAGIC:
+            raise ValueError("Invalid LZ4 block")
+
+        token, compressed, decompressed, _checksum = LZ4_HEADER.unpack_from(data, pos + len(LZ4_MAGIC))
+        pos += len(LZ4_MAGIC) + LZ4_HEADER.size
+
+        if decompressed == 0:
+            break # End mark
+
+        block = data[pos:pos + compressed]
+        pos += compressed
+
+        if token & 0xF0 == 0x10:
+            out += block
+        else:
+            out += lz4.block.decompress(block, uncompressed_size=decompressed)
+
+    return bytes(out)
\ No newline at end of file
@@ -0,0 +1,178 @@
+from typing import Optional, Iterator, List, Tuple
+from multiprocessing.shared_memory import SharedMemory
+from contextlib import contextmanager
+from dataclasses import dataclass
+import numpy as np
+import weakref
+
+from mconduit import Dimension
+
+from .world import MappedWorldReader
+
+
+@dataclass(frozen=True)
+class VolumeDescriptor:
+    """
+    Pickle-able handle of one block volume stored in a `SharedVolumes` segment
+    """
+
+    name: str
+    shape: Tuple[int, int, int, int] # (volumes, x, y, z) of the whole segment
+    index: int
+    origin: Tuple[int, int, int] # World position of the block at [0, 0, 0]
+    palette: Tuple[Optional[str], ...]
+
+
+def _open_segment(name: str) -> SharedMemory:
+    """
+    Attaches to an existing segment without letting this process' resource tracker own it
+    """
+
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError: # Python < 3.13
+        return SharedMemory(name=name)
+
+
+def _release_segment(shm: SharedMemory) -> None:
+
+    shm.close()
+
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class SharedVolumes:
+    """
+    A shared memory segment holding `count` uint16 block volumes of the same size, indexed `[x, y, z]`,
+    each one with its own palette of namespaced block names.
+
+    The owner fills the volumes and hands their `VolumeDescriptor`s to worker processes,
+    which read them in place with `attach_volume`. The segment is freed by `release`
+    (or when leaving the `with` block), and as a last resort when the owner is garbage collected
+    """
+
+
+    count: int
+    size: Tuple[int, int, int]
+    arrays: Optional[np.ndarray]
+    __shm: SharedMemory
+
+
+    def __init__(
+        self,
+        count: int,
+        size: Tuple[int, int, int]
+    ) -> "SharedVolumes":
+
+        self.count = count
+        self.size = tuple(size)
+
+        shape = (count, *self.size)
+        self.__shm = SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 2))
+        self.__finalizer = weakref.finalize(self, _release_segment, self.__shm)
+
+        self.arrays = np.ndarray(shape, dtype=np.uint16, buffer=self.__shm.buf)
+
+
+    def __enter__(self) -> "SharedVolumes":
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+
+    @property
+    def name(self) -> str:
+        return self.__shm.name
+
+
+    def pack(
+        self,
+        index: int,
+        volume: np.ndarray,
+        palette: List[Optional[str]],
+        origin: Tuple[int, int, int]
+    ) -> VolumeDescriptor:
+        """
+        Copies an already read volume into the given slot
+        """
+
+        self.arrays[index] = volume
+
+        return self.describe(index, palette, origin)
+
+
+    def read(
+        self,
+        world_reader: MappedWorldReader,
+        dim: Dimension,
+        index: int,
+        origin: Tuple[int, int, int]
+    ) -> VolumeDescriptor:
+        """
+        Reads the blocks starting at `origin` straight into the given slot
+        """
+
+        x, y, z = origin
+        sx, sy, sz = self.size
+
+        _volume, palette = world_reader.get_volume(
+            x, y, z,
+            x + sx - 1, y + sy - 1, z + sz - 1,
+            dim,
+            out=self.arrays[index]
+        )
+
+        return self.describe(index, palette, origin)
+
+
+    def describe(
+        self,
+        index: int,
+        palette: List[Optional[str]],
+        origin: Tuple[int, int, int]
+    ) -> VolumeDescriptor:
+
+        return VolumeDescriptor(
+            self.__shm.name,
+            (self.count, *self.size),
+            index,
+            tuple(int(i) for i in origin),
+            tuple(palette)
+        )
+
+
+    def release(self) -> None:
+        """
+        Frees the segment, the volumes attached by the workers must be released first
+        """
+
+        self.arrays = None
+        self.__finalizer()
+
+
+@contextmanager
+def attach_volume(descriptor: VolumeDescriptor) -> Iterator[np.ndarray]:
+    """
+    Maps the described volume without copying it.
+
+    The array is only valid inside the `with` block, copy whatever must outlive it
+    """
+
+    shm = _open_segment(descriptor.name)
+    volume = None
+
+    try:
+        volume = np.ndarray(descriptor.shape, dtype=np.uint16, buffer=shm.buf)[descriptor.index]
+        volume.flags.writeable = False
+
+        yield volume
+
+    finally:
+        # The mapping can't be closed while this view is alive
+        volume = None
+        shm.close()
\ No newline at end of file
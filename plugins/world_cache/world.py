@@ -0,0 +1,483 @@
+from typing import Any, Optional, Dict, List, Tuple
+from pathlib import Path
+from math import floor
+import numpy as np
+import threading
+import gzip
+
+from mconduit import Vec3d, Dimension, Server
+
+from .region import RegionFile, decompress
+from .chunk import Chunk
+from .lru import LRUCache, MISSING
+from .nbt import parse_selected
+
+
+DIMENSION_FOLDERS = {
+    "overworld": "",
+    "the_nether": "DIM-1",
+    "the_end": "DIM1"
+}
+
+
+def get_world_path(server: Server) -> Path:
+    """
+    Returns the world folder of the given server, as set by `level-name` inside server.properties
+    """
+
+    server_path = Path(server.path)
+    level_name = "world"
+
+    properties = server_path / "server.properties"
+
+    if properties.exists():
+
+        for line in properties.read_text(encoding="utf-8").splitlines():
+
+            if line.startswith("level-name="):
+                level_name = line.split("=", 1)[1].strip() or level_name
+
+    return server_path / level_name
+
+
+def get_data_version(world_path: Path) -> Optional[int]:
+    """
+    Returns the data version of the world (the game version that last saved it),
+    or None if it has no level.dat yet
+    """
+
+    level = Path(world_path) / "level.dat"
+
+    if not level.exists():
+        return None
+
+    data = level.read_bytes()
+
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+
+    version = parse_selected(data, {"Data": {"DataVersion": True}}).get("Data", {}).get("DataVersion")
+
+    return None if version is None else int(version)
+
+
+def dimension_name(dim: Dimension) -> str:
+    """
+    Returns the namespaced id of the dimension
+    """
+
+    name = str(getattr(dim, "value", dim))
+
+    return name if ":" in name else f"minecraft:{name}"
+
+
+def get_region_folder(
+    world_path: Path,
+    dim: Dimension
+) -> Path:
+    """
+    Returns the folder holding the region files of the given dimension
+    """
+
+    namespace, _, name = dimension_name(dim).partition(":")
+
+    if namespace == "minecraft" and name in DIMENSION_FOLDERS:
+        return world_path / DIMENSION_FOLDERS[name] / "region"
+
+    return world_path / "dimensions" / namespace / name / "region"
+
+
+def get_region_folders(world_path: Path) -> Dict[str, Path]:
+    """
+    Returns the existing region folders of the world, keyed by the namespaced id of their dimension
+    """
+
+    folders = {}
+
+    for name, folder in DIMENSION_FOLDERS.items():
+
+        path = world_path / folder / "region"
+
+        if path.is_dir():
+            folders[f"minecraft:{name}"] = path
+
+    for path in world_path.glob("dimensions/*/*/region"):
+
+        if path.is_dir():
+            folders[f"{path.parent.parent.name}:{path.parent.name}"] = path
+
+    return folders
+
+
+def get_folder_dimension(
+    world_path: Path,
+    folder: Path
+) -> Optional[str]:
+    """
+    Returns the namespaced id of the dimension stored in the given region folder,
+    or None if the folder doesn't hold regions of this world
+    """
+
+    if folder.name != "region":
+        return None
+
+    parent = folder.parent
+
+    for name, dim_folder in DIMENSION_FOLDERS.items():
+
+        if parent == world_path / dim_folder:
+            return f"minecraft:{name}"
+
+    if parent.parent.parent == world_path / "dimensions":
+        return f"{parent.parent.name}:{parent.name}"
+
+    return None
+
+
+ChunkVersion = Tuple[int, int]
+
+
+class MappedWorldReader:
+    """
+    Reads the world through memory-mapped region files.
+
+    Safe to use from multiple threads, one reader per world is shared by every plugin through
+    the `world_cache` plugin.
+
+    Opening a region only costs its header, chunks are sliced out of the mapping
+    and decoded the first time they are requested.
+
+    Chunks are cached in two tiers: the still compressed payloads (cold, about 10x smaller)
+    and a small tier of decoded chunks (hot). Both are tagged with the location and timestamp
+    of the chunk in its region header, so `refresh` is enough to see the changes made to the world
+    """
+
+
+    world_path: Path
+    regions: LRUCache[Tuple[str, int, int], Optional[RegionFile]]
+    payloads: LRUCache[Tuple[str, int, int], Tuple[ChunkVersion, Tuple[int, bytes]]]
+    chunks: LRUCache[Tuple[str, int, int], Tuple[ChunkVersion, Chunk]]
+
+
+    def __init__(
+        self,
+        world_path: Path,
+        chunk_budget: int = 64 * 1024 * 1024,
+        payload_budget: int = 256 * 1024 * 1024,
+        max_regions: int = 64
+    ) -> "MappedWorldReader":
+
+        self.world_path = Path(world_path)
+        self.__lock = threading.Lock()
+
+        # Evicted regions are unmapped once the last reader using them lets them go
+        self.regions = LRUCache(max_regions * 16 * 1024, max_entries=max_regions)
+        self.payloads = LRUCache(payload_budget)
+        self.chunks = LRUCache(chunk_budget)
+
+
+    @classmethod
+    def from_server(cls, server: Server, **kwargs) -> "MappedWorldReader":
+        return cls(get_world_path(server), **kwargs)
+
+
+    def clean_cache(self) -> None:
+        """
+        Forgets every cached chunk and every mapped region file
+        """
+
+        self.regions.clear()
+        self.payloads.clear()
+        self.chunks.clear()
+
+
+    def refresh(self) -> None:
+        """
+        Re-reads the header of every mapped region, and looks again for the regions that were missing.
+
+        Cached chunks that were saved since are read again the next time they are requested
+        """
+
+        for key, region in self.regions.items():
+
+            if region is None:
+                self.regions.pop(key)
+                continue
+
+            try:
+                region.refresh()
+            except FileNotFoundError:
+                self.regions.pop(key)
+
+
+    def refresh_region(
+        self,
+        region_x: int,
+        region_z: int,
+        dim: Dimension = Dimension.Overworld
+    ) -> None:
+        """
+        Re-reads the header of a single region, or looks for it again if it was missing
+        """
+
+        key = (dimension_name(dim), region_x, region_z)
+        region = self.regions.get(key, None)
+
+        if region is None:
+            self.regions.pop(key)
+            return
+
+        try:
+            region.refresh()
+        except FileNotFoundError:
+            self.regions.pop(key)
+
+
+    def invalidate(
+        self,
+        dim: Optional[Dimension] = None,
+        chunk_x: Optional[int] = None,
+        chunk_z: Optional[int] = None
+    ) -> None:
+        """
+        Forgets the cached copies of a chunk, of a whole dimension, or of every chunk if no dimension is given
+        """
+
+        dim_name = None if dim is None else dimension_name(dim)
+
+        for cache in (self.payloads, self.chunks):
+
+            if dim_name is not None and chunk_x is not None and chunk_z is not None:
+                cache.pop((dim_name, chunk_x, chunk_z))
+                continue
+
+            for key, _value in cache.items():
+
+                if dim_name is None or key[0] == dim_name:
+                    cache.pop(key)
+
+
+    def close(self) -> None:
+        """
+        Unmaps every region file and empties the caches
+        """
+
+        for region in self.regions.values():
+
+            if region is not None:
+                region.close()
+
+        self.clean_cache()
+
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns the hit, miss and eviction counters of the region and chunk caches
+        """
+
+        return {
+            "regions": self.regions.stats(),
+            "payloads": self.payloads.stats(),
+            "chunks": self.chunks.stats()
+        }
+
+
+    def get_region(
+        self,
+        region_x: int,
+        region_z: int,
+        dim: Dimension = Dimension.Overworld
+    ) -> Optional[RegionFile]:
+
+        key = (dimension_name(dim), region_x, region_z)
+
+        with self.__lock:
+
+            region = self.regions.get(key)
+
+            if region is not MISSING:
+                return region
+
+            path = get_region_folder(self.world_path, dim) / f"r.{region_x}.{region_z}.mca"
+            region = RegionFile(path) if path.exists() else None
+
+            self.regions.put(key, region)
+
+            return region
+
+
+    def get_chunk(
+        self,
+        chunk_x: int,
+        chunk_z: int,
+        dim: Dimension = Dimension.Overworld
+    ) -> Optional[Chunk]:
+
+        region = self.get_region(chunk_x >> 5, chunk_z >> 5, dim)
+
+        if region is None or not region.has_chunk(chunk_x, chunk_z):
+            return None
+
+        key = (dimension_name(dim), chunk_x, chunk_z)
+        version = region.chunk_version(chunk_x, chunk_z)
+
+        hot = self.chunks.get(key)
+
+        if hot is not MISSING and hot[0] == version:
+            return hot[1]
+
+        payload = self.get_payload(region, key, version)
+
+        if payload is None:
+            return None
+
+        chunk = Chunk.parse(chunk_x, chunk_z, decompress(*payload))
+        self.chunks.put(key, (version, chunk))
+
+        return chunk
+
+
+    def get_payload(
+        self,
+        region: RegionFile,
+        key: Tuple[str, int, int],
+        version: ChunkVersion
+    ) -> Optional[Tuple[int, bytes]]:
+        """
+        Returns the compression type and the compressed bytes of a chunk, from the cold tier if still up to date
+        """
+
+        cold = self.payloads.get(key)
+
+        if cold is not MISSING and cold[0] == version:
+            return cold[1]
+
+        _dim, chunk_x, chunk_z = key
+        payload = region.read_payload(chunk_x, chunk_z)
+
+        if payload is not None:
+            self.payloads.put(key, (version, payload))
+
+        return payload
+
+
+    def get_chunks(
+        self,
+        x1: int,
+        z1: int,
+        x2: int,
+        z2: int,
+        dim: Dimension = Dimension.Overworld
+    ) -> List[Chunk]:
+        """
+        Returns all the generated chunks between the given chunk coordinates
+        """
+
+        chunks = []
+
+        for cx in range(min(x1, x2), max(x1, x2) + 1):
+            for cz in range(min(z1, z2), max(z1, z2) + 1):
+
+                chunk = self.get_chunk(cx, cz, dim)
+
+                if chunk is not None:
+                    chunks.append(chunk)
+
+        return chunks
+
+
+    def get_block(
+        self,
+        block_pos: Vec3d,
+        dim: Dimension = Dimension.Overworld
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns the block state (`Name` and `Properties`) at the given position
+        """
+
+        x, y, z = (floor(i) for i in block_pos.as_tuple())
+
+        chunk = self.get_chunk(x >> 4, z >> 4, dim)
+
+        if chunk is None:
+            return None
+
+        return chunk.get_block_state(x, y, z)
+
+
+    def get_volume(
+        self,
+        x1: int,
+        y1: int,
+        z1: int,
+        x2: int,
+        y2: int,
+        z2: int,
+        dim: Dimension = Dimension.Overworld,
+        out: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """
+        Reads the blocks between the given (inclusive) block coordinates into an `(x, y, z)` uint16 array
+        of indices into the returned list of namespaced block names.
+
+        Index 0 of the list is always `None` (not generated or outside of the stored sections).
+        The blocks are written into `out` if given, e.g. a view of a shared memory segment
+        """
+
+        shape = (max(0, x2 - x1 + 1), max(0, y2 - y1 + 1), max(0, z2 - z1 + 1))
+
+        if out is None:
+            volume = np.zeros(shape, dtype=np.uint16)
+
+        elif out.shape != shape or out.dtype != np.uint16:
+            raise ValueError(f"Expected an uint16 array of shape {shape}, got {out.dtype} {out.shape}")
+
+        else:
+            volume = out
+            volume[...] = 0
+        palette = [None]
+        indices = {None: 0}
+
+        if volume.size == 0:
+            return volume, palette
+
+        for cx in range(x1 >> 4, (x2 >> 4) + 1):
+            for cz in range(z1 >> 4, (z2 >> 4) + 1):
+
+                chunk = self.get_chunk(cx, cz, dim)
+
+                if chunk is None:
+                    continue
+
+                bx1, bx2 = max(x1, cx * 16), min(x2, cx * 16 + 15)
+                bz1, bz2 = max(z1, cz * 16), min(z2, cz * 16 + 15)
+
+                for sy in range(y1 >> 4, (y2 >> 4) + 1):
+
+                    section = chunk.get_section(sy)
+
+                    if section is None:
+                        continue
+
+                    blocks, names = section
+                    remap = np.empty(len(names), dtype=np.uint16)
+
+                    for i, name in enumerate(names):
+
+                        if name not in indices:
+                            indices[name] = len(palette)
+                            palette.append(name)
+
+                        remap[i] = indices[name]
+
+                    by1, by2 = max(y1, sy * 16), min(y2, sy * 16 + 15)
+
+                    part = blocks[by1 & 15:(by2 & 15) + 1, bz1 & 15:(bz2 & 15) + 1, bx1 & 15:(bx2 & 15) + 1]
+
+                    volume[
+                        bx1 - x1:bx2 - x1 + 1,
+                        by1 - y1:by2 - y1 + 1,
+                        bz1 - z1:bz2 - z1 + 1
+                    ] = remap[part].transpose(2, 0, 1)
+
+        return volume, palette
\ No newline at end of file
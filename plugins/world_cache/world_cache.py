@@ -0,0 +1,177 @@
+from typing import Dict, Tuple
+from pathlib import Path
+import threading
+
+from mconduit import plugins, Context
+
+from .world import MappedWorldReader, get_world_path
+from .changes import RegionChangeFeed
+
+
+class Config(plugins.Config):
+    chunk_budget_mb: int = 64 # Decoded chunks
+    payload_budget_mb: int = 256 # Compressed chunks
+    max_regions: int = 64
+    sweep_interval: float = 10.0 # Seconds between two checks of the region files mtimes
+
+
+class SharedWorld:
+    """
+    The reader and the change feed of a world, shared by every server of this process running it
+    """
+
+
+    reader: MappedWorldReader
+    feed: RegionChangeFeed
+    users: int
+
+
+    def __init__(
+        self,
+        world_path: Path,
+        sweep_interval: float,
+        **reader_kwargs
+    ) -> "SharedWorld":
+
+        self.reader = MappedWorldReader(world_path, **reader_kwargs)
+        self.feed = RegionChangeFeed(world_path, self.reader, sweep_interval)
+        self.users = 0
+
+        self.feed.start()
+
+
+    def close(self) -> None:
+
+        self.feed.stop()
+        self.reader.close()
+
+
+# Keyed by world folder, servers running the same world (e.g. a backup instance) share one entry
+_worlds: Dict[Path, SharedWorld] = {}
+_worlds_lock = threading.Lock()
+
+
+def acquire_world(
+    world_path: Path,
+    sweep_interval: float = 10.0,
+    **reader_kwargs
+) -> SharedWorld:
+    """
+    Returns the shared reader and change feed of the given world, creating them if needed.
+
+    Every call must be paired with `release_world`
+    """
+
+    world_path = Path(world_path).resolve()
+
+    with _worlds_lock:
+
+        world = _worlds.get(world_path)
+
+        if world is None:
+            world = _worlds[world_path] = SharedWorld(world_path, sweep_interval, **reader_kwargs)
+
+        world.users += 1
+
+        return world
+
+
+def release_world(world_path: Path) -> None:
+    """
+    Releases the given world, its reader and feed are closed when their last user releases them
+    """
+
+    world_path = Path(world_path).resolve()
+
+    with _worlds_lock:
+
+        world = _worlds.get(world_path)
+
+        if world is None:
+            return
+
+        world.users -= 1
+
+        if world.users > 0:
+            return
+
+        del _worlds[world_path]
+
+    world.close()
+
+
+class WorldCache(plugins.Plugin[Config, None]):
+    """
+    Fast access to the world region files, shared between plugins
+    """
+
+
+    __world_path: Path
+    __world: SharedWorld
+    cache = plugins.Command.group(
+        name="worldcache",
+        aliases=["wc"],
+        checks=[plugins.check_perms(plugins.Permission.Helper)]
+    )
+
+
+    def on_load(self):
+
+        self.__world_path = get_world_path(self.server)
+        self.__world = acquire_world(
+            self.__world_path,
+            self.config.sweep_interval,
+            chunk_budget=self.config.chunk_budget_mb * 1024 * 1024,
+            payload_budget=self.config.payload_budget_mb * 1024 * 1024,
+            max_regions=self.config.max_regions
+        )
+
+
+    def on_unload(self):
+        release_world(self.__world_path)
+
+
+    def get_reader(self) -> MappedWorldReader:
+        """
+        Returns the reader of this server's world, shared with the other plugins.
+
+        The reader is safe to use from multiple threads, it must not be closed by the caller
+        """
+
+        return self.__world.reader
+
+
+    def get_change_feed(self) -> RegionChangeFeed:
+        """
+        Returns the feed publishing the chunks of this server's world saved on disk
+        """
+
+        return self.__world.feed
+
+
+    @cache.command(name="stats")
+    def _stats(self, ctx: Context):
+        """
+        Shows the size and the hit rate of the world caches
+        """
+
+        for name, stats in self.__world.reader.cache_stats().items():
+
+            lookups = stats["hits"] + stats["misses"]
+            hit_rate = 100 * stats["hits"] / lookups if lookups > 0 else 0
+
+            ctx.info(
+                f"{name}: {stats['entries']} entries, "
+                f"{stats['used_bytes'] / 1024 / 1024:.1f}/{stats['budget'] / 1024 / 1024:.0f} MiB, "
+                f"{hit_rate:.0f}% hits, {stats['evictions']} evictions"
+            )
+
+
+    @cache.command(name="clear")
+    def _clear(self, ctx: Context):
+        """
+        Empties the world caches
+        """
+
+        self.__world.reader.clean_cache()
+        ctx.success("World caches cleared!")
\ No newline at end of file
@@ -0,0 +1,104 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib.util import spec_from_file_location, module_from_spec
+from pathlib import Path
+from io import BytesIO
+import threading
+import pytest
+
+from PIL import Image
+
+
+# Loaded by path, importing the package would run the plugin's `__init__` which needs mconduit
+spec = spec_from_file_location(
+    "picture_loader_fetch",
+    Path(__file__).parent.parent / "plugins" / "picture_loader" / "fetch.py"
+)
+fetch = module_from_spec(spec)
+spec.loader.exec_module(fetch)
+
+ImageFetcher, ImageTooLarge, FetchError = fetch.ImageFetcher, fetch.ImageTooLarge, fetch.FetchError
+
+
+def png_bytes(width: int, height: int) -> bytes:
+
+    buffer = BytesIO()
+    Image.new("RGBA", (width, height), (255, 0, 0, 255)).save(buffer, "PNG")
+
+    return buffer.getvalue()
+
+
+PICTURE = png_bytes(4, 4)
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+
+        if self.path == "/missing":
+            self.send_error(404)
+            return
+
+        body = PICTURE if self.path == "/small" else b"\0" * 4096
+
+        self.send_response(200)
+
+        # Without Content-Length the body is only cut by the streaming cap
+        if self.path != "/chunked":
+            self.send_header("Content-Length", str(len(body)))
+
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    httpd.shutdown()
+
+
+@pytest.fixture
+def fetcher():
+
+    fetcher = ImageFetcher(max_bytes=1024, max_pixels=64, timeout=(2.0, 2.0), workers=1)
+
+    yield fetcher
+
+    fetcher.close()
+
+
+def test_small_picture(server, fetcher):
+    assert fetcher.fetch(f"{server}/small").shape == (4, 4, 4)
+
+
+def test_content_length_cap(server, fetcher):
+
+    with pytest.raises(ImageTooLarge, match="4096 bytes"):
+        fetcher.fetch(f"{server}/large")
+
+
+def test_streamed_bytes_cap(server, fetcher):
+
+    with pytest.raises(ImageTooLarge, match="more than the 1024 bytes"):
+        fetcher.fetch(f"{server}/chunked")
+
+
+def test_http_error(server, fetcher):
+
+    with pytest.raises(FetchError, match="404"):
+        fetcher.fetch(f"{server}/missing")
+
+
+def test_pixels_cap(fetcher):
+
+    image = fetcher.decode(png_bytes(32, 32))
+
+    assert image.shape[0] * image.shape[1] <= fetcher.max_pixels